@@ -0,0 +1,201 @@
+"""NumPy-vectorized fleet generator producing (vehicles x steps x signals) blocks per call"""
+import numpy as np
+
+from engine import Faults, DrivingScenarios, CLAMP_BOUNDS, SIGNAL_NAMES, generate_initial_data
+from faults import ADD, FAULT_EFFECTS
+
+FAULT_NAMES = list(Faults.keys())
+SCENARIO_NAMES = list(DrivingScenarios.keys())
+SIGNAL_INDEX = {name: index for index, name in enumerate(SIGNAL_NAMES)}
+
+# Base row every vehicle starts from
+INITIAL_ROW = np.array([generate_initial_data()[name] for name in SIGNAL_NAMES], dtype=np.float32)
+
+# Vectorized clamp table; unclamped signals get infinite bounds
+LOWER_BOUNDS = np.full(len(SIGNAL_NAMES), -np.inf, dtype=np.float32)
+UPPER_BOUNDS = np.full(len(SIGNAL_NAMES), np.inf, dtype=np.float32)
+for _name, (_low, _high) in CLAMP_BOUNDS.items():
+    LOWER_BOUNDS[SIGNAL_INDEX[_name]] = _low
+    UPPER_BOUNDS[SIGNAL_INDEX[_name]] = _high
+
+# Per-scenario inclusive ranges, indexed like SCENARIO_NAMES
+SCENARIO_RPM = np.array([DrivingScenarios[name]["rpm_range"] for name in SCENARIO_NAMES], dtype=np.float32)
+
+# FAULT_EFFECTS as (len(FAULT_NAMES), max effects per fault) arrays; signal -1 pads shorter effect lists
+MAX_EFFECTS = max(len(FAULT_EFFECTS.get(name, ())) for name in FAULT_NAMES)
+EFFECT_SIGNAL = np.full((len(FAULT_NAMES), MAX_EFFECTS), -1, dtype=np.intp)
+EFFECT_ADD = np.zeros((len(FAULT_NAMES), MAX_EFFECTS), dtype=bool)
+EFFECT_RUNNING = np.zeros((len(FAULT_NAMES), MAX_EFFECTS), dtype=bool)
+EFFECT_LOW = np.zeros((len(FAULT_NAMES), MAX_EFFECTS), dtype=np.float32)
+EFFECT_HIGH = np.zeros((len(FAULT_NAMES), MAX_EFFECTS), dtype=np.float32)
+EFFECT_DECIMALS = np.full((len(FAULT_NAMES), MAX_EFFECTS), -1, dtype=np.int8)  # -1: integer draw
+for _f, _name in enumerate(FAULT_NAMES):
+    for _k, _spec in enumerate(FAULT_EFFECTS.get(_name, ())):
+        EFFECT_SIGNAL[_f, _k] = SIGNAL_INDEX[_spec["signal"]]
+        EFFECT_ADD[_f, _k] = _spec["op"] == ADD
+        EFFECT_RUNNING[_f, _k] = _spec["running"]
+        EFFECT_LOW[_f, _k] = _spec["low"]
+        EFFECT_HIGH[_f, _k] = _spec["high"]
+        EFFECT_DECIMALS[_f, _k] = -1 if _spec["decimals"] is None else _spec["decimals"]
+
+RPM = SIGNAL_INDEX["Engine RPM"]
+FUEL_PRESSURE = SIGNAL_INDEX["Fuel Pressure (kPa)"]
+O2 = SIGNAL_INDEX["O2 Sensor Voltage (V)"]
+BRAKE = SIGNAL_INDEX["Brake Pedal Position (%)"]
+ALTERNATOR = SIGNAL_INDEX["Alternator Output (V)"]
+WHEEL_SPEED = SIGNAL_INDEX["Wheel Speed (km/h)"]
+BATTERY = SIGNAL_INDEX["Battery Voltage (V)"]
+LOAD = SIGNAL_INDEX["Electrical Load (A)"]
+
+
+def resolve_indices(values, names, n_vehicles):
+    """Map a name, a list of names or an index array to one index per vehicle"""
+    if values is None:
+        return np.arange(n_vehicles) % len(names)
+    if isinstance(values, str):
+        values = [values]
+    values = np.asarray([names.index(v) if isinstance(v, str) else v for v in values], dtype=np.intp)
+    return np.resize(values, n_vehicles)
+
+
+def per_tick(value, shape, dtype=bool):
+    """Broadcast a scalar, per-vehicle (N,) or per-tick (N, T) input to (N, T)"""
+    value = np.asarray(value, dtype=dtype)
+    if value.ndim == 1:
+        value = value[:, None]
+    return np.broadcast_to(value, shape)
+
+
+def _uniform(rng, shape, low, high):
+    """Float32 uniform draw in [low, high)"""
+    out = rng.random(shape, dtype=np.float32)
+    out *= high - low
+    out += low
+    return out
+
+
+def _randint(rng, shape, low, high):
+    """Float32 integer draw in [low, high] inclusive, like random.randint"""
+    return np.floor(_uniform(rng, shape, low, high + 1))
+
+
+def fault_ramp(onset_s, ramp_s, shape, dt):
+    """(N, T) fault intensity: 0 before onset_s, rising linearly to 1 over ramp_s (scalars or (N,) arrays)"""
+    elapsed = (np.arange(1, shape[1] + 1) * dt)[None, :]  # like SimulationEngine.elapsed_s
+    onset = np.asarray(onset_s, dtype=float).reshape(-1, 1)
+    ramp = np.asarray(ramp_s, dtype=float).reshape(-1, 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ramped = np.clip((elapsed - onset) / ramp, 0, 1)
+    return np.broadcast_to(np.where(ramp > 0, ramped, elapsed >= onset).astype(np.float32), shape)
+
+
+def apply_fault_effects(data, fault_idx, on, rng, intensity=None):
+    """Vectorized FAULT_EFFECTS, one pass per effect slot regardless of how many faults exist.
+
+    Matches SimulationEngine: set effects replace the signal, add effects
+    offset it, both blended by intensity ((N, T), default 1); running-only
+    effects skip ticks where the car is off.
+    """
+    n_steps = data.shape[1]
+    ticks = np.arange(n_steps)[None, :]
+    for k in range(MAX_EFFECTS):
+        vehicles = np.flatnonzero(EFFECT_SIGNAL[fault_idx, k] >= 0)
+        if not len(vehicles):
+            continue
+        fault = fault_idx[vehicles]
+        signal = EFFECT_SIGNAL[fault, k][:, None]
+        decimals = EFFECT_DECIMALS[fault, k][:, None]
+        low = EFFECT_LOW[fault, k][:, None]
+        high = EFFECT_HIGH[fault, k][:, None]
+        integer = decimals < 0
+        draw = _uniform(rng, (len(vehicles), n_steps), 0, 1) * (high - low + integer) + low
+        scale = np.float32(10) ** np.maximum(decimals, 0)
+        draw = np.where(integer, np.floor(draw), np.round(draw * scale) / scale)
+
+        rows = vehicles[:, None]
+        current = data[rows, ticks, signal]
+        additive = EFFECT_ADD[fault, k][:, None]
+        active = ~EFFECT_RUNNING[fault, k][:, None] | on[vehicles]
+        if intensity is None:
+            updated = np.where(additive, current + draw, draw)
+        else:
+            weight = intensity[vehicles]
+            blended = np.where(additive, current + draw * weight, current + (draw - current) * weight)
+            updated = np.where(additive | (weight < 1), blended, draw)
+            active &= weight > 0
+        data[rows, ticks, signal] = np.where(active, updated, current)
+
+
+def generate_batch(n_vehicles, n_steps, faults=None, scenarios=None, car_on=True, ac_on=False,
+                   brake_applied=False, speed=0, rng=None, physics=False, dt=1.0, onset_s=0.0, ramp_s=0.0):
+    """Generate an (n_vehicles, n_steps, len(SIGNAL_NAMES)) float32 array in one shot.
+
+    faults and scenarios are assigned per vehicle (a name, a list cycled across
+    vehicles, or index arrays; default round-robin over every entry).  car_on,
+    ac_on, brake_applied and speed accept a scalar, an (N,) array or an (N, T)
+    array.  Values follow the same ranges as SimulationEngine.step.
+
+    With physics=True the drivetrain, thermal, fuel and electrical signals come
+    from vehicle.simulate_fleet stepped every dt seconds; speed is then the
+    target speed, and None lets each vehicle cruise within its scenario range.
+
+    Fault effects start at onset_s and ramp in over ramp_s simulated seconds
+    (scalars or (N,) arrays; default: present from the first tick).
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    shape = (n_vehicles, n_steps)
+    fault_idx = resolve_indices(faults, FAULT_NAMES, n_vehicles)
+    scenario_idx = resolve_indices(scenarios, SCENARIO_NAMES, n_vehicles)
+    on = per_tick(car_on, shape)
+    ac = per_tick(ac_on, shape)
+    brake = per_tick(brake_applied, shape)
+
+    data = np.empty(shape + (len(SIGNAL_NAMES),), dtype=np.float32)
+    data[:] = INITIAL_ROW
+
+    # O2 voltage: random while running, held at the last value while off
+    o2 = np.round(_uniform(rng, shape, 0.1, 0.9), 2)
+    hold = ~on
+    if hold.any():
+        # Forward-fill the last drawn value across held ticks
+        source = np.where(hold, 0, np.arange(1, n_steps + 1))
+        np.maximum.accumulate(source, axis=1, out=source)
+        padded = np.concatenate([np.full((n_vehicles, 1), INITIAL_ROW[O2], dtype=np.float32), o2], axis=1)
+        o2 = np.take_along_axis(padded, source, axis=1)
+    data[..., O2] = o2
+
+    # Scenario ranges and car on/off state
+    rpm_low = SCENARIO_RPM[scenario_idx, 0][:, None]
+    rpm_high = SCENARIO_RPM[scenario_idx, 1][:, None]
+    rpm = np.floor(rpm_low + rng.random(shape, dtype=np.float32) * (rpm_high - rpm_low + 1))
+    data[..., RPM] = np.where(on, np.clip(rpm, 600, 5000), 0)
+    data[..., WHEEL_SPEED] = np.where(on, per_tick(speed if speed is not None else 0, shape, np.float32), 0)
+    data[..., FUEL_PRESSURE] = np.where(on, _randint(rng, shape, 2000, 4000), 0)
+    data[..., BATTERY] = np.where(
+        on, np.round(_uniform(rng, shape, 12.5, 14.5), 2), np.round(_uniform(rng, shape, 12.0, 12.5), 2)
+    )
+    load = np.where(on, _randint(rng, shape, 20, 50), 0)
+
+    # AC state: clamp the running alternator or fall back to the idle band
+    running_alternator = np.round(_uniform(rng, shape, 13.5, 14.5), 2)
+    data[..., ALTERNATOR] = np.where(
+        ac, np.clip(np.where(on, running_alternator, 0), 13, 15), _uniform(rng, shape, 12.5, 13.5)
+    )
+    data[..., LOAD] = load + np.where(ac, 10, 0)
+
+    data[..., BRAKE] = np.where(brake, 100, 0)
+
+    if physics:
+        from vehicle import MODELED_INDEX, simulate_fleet
+        fleet = simulate_fleet(
+            n_vehicles, n_steps, dt, scenarios=scenario_idx, target_speed=speed, car_on=on, ac_on=ac,
+            brake_applied=brake, rng=rng,
+        )
+        data[..., MODELED_INDEX] = fleet[..., MODELED_INDEX]
+
+    intensity = None
+    if np.any(onset_s) or np.any(ramp_s):
+        intensity = fault_ramp(onset_s, ramp_s, shape, dt)
+    apply_fault_effects(data, fault_idx, on, rng, intensity)
+    np.clip(data, LOWER_BOUNDS, UPPER_BOUNDS, out=data)
+    return data
@@ -0,0 +1,240 @@
+"""Headless benchmark suite: engine ticks, row memory, export throughput, dashboard cost.
+
+Each benchmark returns metrics as {"value", "unit", "better"} records, where
+better is "higher" or "lower".  run_suite() collects them with host details
+into one JSON-serializable result, and compare() checks a result against a
+saved baseline.  Use `python simulate.py bench` to run it from the command line.
+"""
+import itertools
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from engine import DrivingScenarios, Faults, SimulationEngine
+from exporters import EXPORTERS, open_exporter
+from schema import FrameBlock, Labels
+from sinks import StreamingSink
+
+BENCH_VERSION = 1
+BENCHMARKS = ("engine", "memory", "export", "gui")
+DEFAULT_TICKS = 200  # Timed ticks per fault x scenario x control-state combination
+DEFAULT_EXPORT_ROWS = (10_000, 100_000)
+EXPORT_POOL_ROWS = 1000  # Distinct rows cycled through the exporters
+GUI_FRAMES = 200
+GUI_ROWS_PER_FRAME = 17  # 1 kHz of data at a 60 Hz display
+DEFAULT_TOLERANCE = 0.10
+
+
+def metric(value, unit, better="higher"):
+    return {"value": value, "unit": unit, "better": better}
+
+
+def _states():
+    """Every (car_on, ac_on, brake_applied) control state"""
+    return list(itertools.product((False, True), repeat=3))
+
+
+def bench_engine(ticks=DEFAULT_TICKS, physics=False, seed=0):
+    """Ticks/s (step + row) for every fault x scenario x car/AC/brake combination"""
+    details = []
+    for fault, scenario, (car_on, ac_on, brake_applied) in itertools.product(Faults, DrivingScenarios, _states()):
+        engine = SimulationEngine(fault=fault, scenario=scenario, physics=physics, seed=seed)
+        engine.car_on, engine.ac_on, engine.brake_applied = car_on, ac_on, brake_applied
+        engine.speed = 60 if car_on else 0
+        for _ in range(10):  # warm up
+            engine.step()
+        step, row = engine.step, engine.row
+        started = time.perf_counter()
+        for tick in range(ticks):
+            step()
+            row(tick)
+        details.append({
+            "fault": fault, "scenario": scenario, "car_on": car_on, "ac_on": ac_on, "brake_applied": brake_applied,
+            "ticks_per_s": ticks / (time.perf_counter() - started),
+        })
+    rates = [entry["ticks_per_s"] for entry in details]
+    metrics = {
+        "engine.ticks_per_s.median": metric(statistics.median(rates), "ticks/s"),
+        "engine.ticks_per_s.min": metric(min(rates), "ticks/s"),
+    }
+    return metrics, details
+
+
+def _sample_rows(n_rows, physics=False, seed=0):
+    """n_rows engine rows cycling through the faults, with 1 ms apart timestamps"""
+    faults = list(Faults)
+    engine = SimulationEngine(physics=physics, seed=seed)
+    engine.car_on, engine.speed = True, 60
+    rows = []
+    for index in range(n_rows):
+        engine.selected_fault = faults[index % len(faults)]
+        engine.selected_situation = Faults[engine.selected_fault][0]
+        engine.step()
+        rows.append(engine.row(1_700_000_000_000 + index))
+    return rows
+
+
+def bench_memory(n_rows=10_000):
+    """Bytes per logged sample held as ROW_FIELDS tuples and as packed sink frames"""
+    engine = SimulationEngine(seed=0)
+    engine.car_on, engine.speed = True, 60
+    engine.step()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        rows = []
+        for index in range(n_rows):
+            engine.step()
+            rows.append(engine.row(index))
+        tuple_bytes = (tracemalloc.get_traced_memory()[0] - before) / n_rows
+        before = tracemalloc.get_traced_memory()[0]
+        block = FrameBlock(n_rows, Labels())
+        for row in rows:
+            block.append(row)
+        frame_bytes = (tracemalloc.get_traced_memory()[0] - before) / n_rows
+    finally:
+        tracemalloc.stop()
+    block = FrameBlock(n_rows, Labels())
+    started = time.perf_counter()
+    for row in rows:
+        block.append(row)
+    append_us = (time.perf_counter() - started) / n_rows * 1e6
+    return {
+        "memory.tuple_bytes_per_row": metric(tuple_bytes, "bytes", "lower"),
+        "memory.frame_bytes_per_row": metric(frame_bytes, "bytes", "lower"),
+        "memory.frame_append_us": metric(append_us, "us", "lower"),
+    }, []
+
+
+def _size(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+    return os.path.getsize(path)
+
+
+def bench_export(sizes=DEFAULT_EXPORT_ROWS, formats=None, workdir=None, chunk_rows=10_000):
+    """Rows/s and bytes/s of StreamingSink + exporter for each format and row count"""
+    formats = formats or [name for name in EXPORTERS if _available(name)]
+    pool = _sample_rows(EXPORT_POOL_ROWS)
+    metrics, details = {}, []
+    directory = tempfile.mkdtemp(prefix="obd-bench-", dir=workdir)
+    try:
+        for format, n_rows in itertools.product(formats, sizes):
+            path = os.path.join(directory, f"bench-{n_rows}.{format}")
+            started = time.perf_counter()
+            with StreamingSink(open_exporter(path, format), flush_rows=chunk_rows) as sink:
+                append = sink.append
+                for index in range(n_rows):
+                    row = pool[index % EXPORT_POOL_ROWS]
+                    append((1_700_000_000_000 + index, *row[1:]))
+            elapsed = time.perf_counter() - started
+            size = _size(path)
+            details.append({"format": format, "rows": n_rows, "seconds": elapsed, "bytes": size})
+            metrics[f"export.{format}.{n_rows}.rows_per_s"] = metric(n_rows / elapsed, "rows/s")
+            metrics[f"export.{format}.{n_rows}.bytes_per_s"] = metric(size / elapsed, "bytes/s")
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return metrics, details
+
+
+def _available(format):
+    directory = tempfile.mkdtemp(prefix="obd-bench-")
+    try:
+        open_exporter(os.path.join(directory, "probe." + format), format).close()
+    except RuntimeError:
+        return False
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return True
+
+
+def bench_gui(frames=GUI_FRAMES, rows_per_frame=GUI_ROWS_PER_FRAME):
+    """Dashboard push cost per row and refresh/paint cost per display frame (offscreen Qt)"""
+    if os.environ.setdefault("QT_QPA_PLATFORM", "offscreen") == "offscreen":
+        os.environ.setdefault("QT_LOGGING_RULES", "default.warning=false")  # propagateSizeHints() noise
+    try:
+        from PyQt6.QtWidgets import QApplication
+    except ImportError:
+        return {}, [{"skipped": "PyQt6 is not installed"}]
+    from dashboard import Dashboard
+
+    app = QApplication.instance() or QApplication([])
+    dashboard = Dashboard()
+    dashboard.refresh_timer.stop()
+    dashboard.resize(900, 700)
+    dashboard.show()
+    rows = _sample_rows(frames * rows_per_frame)
+    push = refresh = paint = 0.0
+    for frame in range(frames):
+        batch = rows[frame * rows_per_frame:(frame + 1) * rows_per_frame]
+        started = time.perf_counter()
+        for row in batch:
+            dashboard.push(row)
+        pushed = time.perf_counter()
+        dashboard.refresh()
+        refreshed = time.perf_counter()
+        dashboard.repaint()  # synchronous paint of everything refresh() invalidated
+        app.processEvents()
+        painted = time.perf_counter()
+        push += pushed - started
+        refresh += refreshed - pushed
+        paint += painted - refreshed
+    dashboard.close()
+    return {
+        "gui.push_us_per_row": metric(push / (frames * rows_per_frame) * 1e6, "us", "lower"),
+        "gui.refresh_ms_per_frame": metric(refresh / frames * 1000, "ms", "lower"),
+        "gui.paint_ms_per_frame": metric(paint / frames * 1000, "ms", "lower"),
+    }, []
+
+
+def run_suite(benchmarks=BENCHMARKS, ticks=DEFAULT_TICKS, physics=False, export_rows=DEFAULT_EXPORT_ROWS,
+              formats=None, workdir=None, report=print):
+    """Run the selected benchmarks and return the JSON-serializable result"""
+    runners = {
+        "engine": lambda: bench_engine(ticks, physics),
+        "memory": bench_memory,
+        "export": lambda: bench_export(export_rows, formats, workdir),
+        "gui": bench_gui,
+    }
+    result = {
+        "version": BENCH_VERSION,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "host": {
+            "python": sys.version.split()[0], "platform": platform.platform(),
+            "machine": platform.machine(), "cpu_count": os.cpu_count(),
+        },
+        "config": {"ticks": ticks, "physics": physics, "export_rows": list(export_rows), "formats": formats},
+        "metrics": {},
+        "details": {},
+    }
+    for name in benchmarks:
+        started = time.perf_counter()
+        metrics, details = runners[name]()
+        result["metrics"].update(metrics)
+        result["details"][name] = details
+        if report is not None:
+            report(f"{name}: {len(metrics)} metrics in {time.perf_counter() - started:.1f}s")
+    return result
+
+
+def compare(result, baseline, tolerance=DEFAULT_TOLERANCE):
+    """(name, baseline value, current value, relative change, regressed) for metrics present in both"""
+    rows = []
+    for name, current in result["metrics"].items():
+        previous = baseline.get("metrics", {}).get(name)
+        if previous is None or not previous["value"]:
+            continue
+        change = current["value"] / previous["value"] - 1
+        worse = -change if current["better"] == "higher" else change
+        rows.append((name, previous["value"], current["value"], change, worse > tolerance))
+    return rows
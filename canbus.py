@@ -0,0 +1,341 @@
+"""OBD-II over raw CAN: ISO 15765-4 frames on SocketCAN (e.g. vcan0) or in candump log files.
+
+Each simulated vehicle is an ECU answering on 0x7E8 (+ its index when
+several share one bus, up to the eight ECUs ISO 15765-4 addresses).  It
+broadcasts a schedule of responses, {request: period_ms}, such as Mode 01
+PID 0C every 10 ms.  Payloads come from the same ResponseTable encoders as
+the ELM327 emulator.  Payloads longer than seven bytes (the Mode 03 DTC list,
+the Mode 09 VIN) are split into an ISO-TP first frame and consecutive frames.
+Broadcast transfers send the consecutive frames back to back, as if a tester
+had answered with "continue to send, no block size, no STmin".  On SocketCAN
+the ECU also answers requests on 0x7DF/0x7E0 and honors the tester's flow
+control.
+
+A CanBus serializes frames like the wire does: each frame starts when the
+previous one ends, FRAME_BITS / bitrate later.  A 500 kbit/s bus carries
+about 4000 frames/s.  Each response is segmented once per tick however often
+it repeats.  Queued frames go into preallocated slots and are handed to the
+transport once per tick.  SocketCAN packs them into a preallocated buffer of
+can_frame structs; the candump writer hex-encodes each distinct frame once.
+Transfers that would queue for longer than MAX_BACKLOG_S are dropped and
+counted, like a saturated transmit queue.  When the kernel's own transmit
+queue is full (ENOBUFS on vcan), SocketCAN backs off for SEND_BACKOFF_S and
+retries a few times before the rest of that tick's frames are dropped too.
+"""
+import errno
+import socket
+import struct
+import time
+
+from elm327 import DEFAULT_VIN, ResponseTable
+
+FUNCTIONAL_REQUEST_ID = 0x7DF
+ECU_REQUEST_ID = 0x7E0
+ECU_RESPONSE_ID = 0x7E8
+MAX_ECUS = 8  # 0x7E8-0x7EF
+PAD_BYTE = 0xAA
+DEFAULT_BITRATE = 500_000
+FRAME_BITS = 125  # 11-bit data frame with 8 data bytes, worst-case bit stuffing and interframe space
+MAX_BACKLOG_S = 0.1
+FRAME_CAPACITY = 4096  # Frames packed per transport write
+CAN_FRAME = struct.Struct("=IB3x8s")  # struct can_frame: can_id, can_dlc, padding, data
+SEND_BACKOFF_S = 0.001  # Wait for a full kernel transmit queue to drain...
+SEND_RETRIES = 5  # ...this many times before dropping the frames still queued
+
+# Broadcast schedule: response -> period in ms (about 430 frames/s per vehicle)
+DEFAULT_SCHEDULE = {
+    "010C": 10, "010D": 10,  # RPM, speed
+    "0105": 100, "0106": 20, "0107": 100, "0114": 20, "0123": 20, "012C": 50,
+    "012F": 500, "0132": 100, "013C": 100, "0142": 100, "0146": 1000,
+    "0101": 1000, "03": 1000, "0902": 5000, "090A": 5000,
+}
+
+
+def parse_schedule_spec(spec):
+    """'REQUEST@PERIOD_MS' (e.g. '010C@10') -> (request, period_ms)"""
+    request, _, period = spec.partition("@")
+    request = request.strip().upper()
+    if not period or not request:
+        raise ValueError(f"Frame spec must be REQUEST@PERIOD_MS: {spec}")
+    period_ms = float(period)
+    if period_ms <= 0:
+        raise ValueError(f"Frame period must be positive: {spec}")
+    return request, period_ms
+
+
+def isotp_frames(payload):
+    """ISO 15765-2 segmentation of a response payload into padded 8-byte frames"""
+    size = len(payload)
+    if size <= 7:
+        return [bytes([size, *payload]).ljust(8, bytes([PAD_BYTE]))]
+    frames = [bytes([0x10 | size >> 8, size & 0xFF, *payload[:6]])]
+    for index, start in enumerate(range(6, size, 7), 1):
+        frames.append(bytes([0x20 | index % 16, *payload[start:start + 7]]).ljust(8, bytes([PAD_BYTE])))
+    return frames
+
+
+def _stmin_s(value):
+    """Flow-control STmin byte in seconds (0x00-0x7F ms, 0xF1-0xF9 100-900 us, reserved values as 127 ms)"""
+    if value <= 0x7F:
+        return value / 1000
+    if 0xF1 <= value <= 0xF9:
+        return (value - 0xF0) / 10_000
+    return 0.127
+
+
+class CanBus:
+    """One CAN bus: frame serialization, preallocated frame slots and a transport"""
+
+    def __init__(self, transport, bitrate=DEFAULT_BITRATE, capacity=FRAME_CAPACITY):
+        self.transport = transport
+        self.frame_s = FRAME_BITS / bitrate
+        self.ids = [0] * capacity
+        self.data = [b""] * capacity
+        self.times = [0.0] * capacity
+        self.capacity = capacity
+        self.count = 0
+        self.free_s = 0.0  # When the bus is idle again
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.busy_s = 0.0
+
+    def queue(self, can_id, frames, due_s):
+        """Put a transfer's 8-byte frames on the bus from due_s, or as soon as the bus is free.
+
+        A transfer that would wait longer than MAX_BACKLOG_S is dropped whole.
+        """
+        start = due_s if due_s > self.free_s else self.free_s
+        if start - due_s > MAX_BACKLOG_S:
+            self.frames_dropped += len(frames)
+            return
+        if self.count + len(frames) > self.capacity:
+            self.flush()
+        count, frame_s = self.count, self.frame_s
+        for data in frames:
+            self.ids[count] = can_id
+            self.data[count] = data
+            self.times[count] = start
+            start += frame_s
+            count += 1
+        self.count = count
+        self.free_s = start
+
+    def flush(self):
+        """Hand every queued frame to the transport; frames it could not send are counted as dropped"""
+        if self.count:
+            sent = self.transport.send(self.ids, self.data, self.times, self.count)
+            self.frames_sent += sent
+            self.frames_dropped += self.count - sent
+            self.busy_s += sent * self.frame_s
+            self.count = 0
+
+    def receive(self):
+        return self.transport.receive()
+
+    def close(self):
+        self.flush()
+        self.transport.close()
+
+
+class SocketCANTransport:
+    """Raw SocketCAN socket bound to an interface such as vcan0 (Linux only)"""
+
+    def __init__(self, channel, capacity=FRAME_CAPACITY):
+        if not hasattr(socket, "AF_CAN"):
+            raise RuntimeError("SocketCAN output requires Linux; write a candump log with --log instead")
+        self.channel = channel
+        self.buffer = bytearray(capacity * CAN_FRAME.size)
+        try:
+            self.socket = socket.socket(socket.AF_CAN, socket.SOCK_RAW, socket.CAN_RAW)
+        except OSError as error:
+            raise RuntimeError(f"SocketCAN is not available ({error}); "
+                               "write a candump log with --log instead") from None
+        try:
+            self.socket.bind((channel,))
+        except OSError as error:
+            self.socket.close()
+            raise RuntimeError(f"Cannot open CAN interface {channel} ({error}). Create a virtual one with: "
+                               f"sudo ip link add dev {channel} type vcan && sudo ip link set up {channel}") from None
+
+    def send(self, ids, data, times, count):
+        """Write count frames and return how many the kernel accepted"""
+        buffer, size, pack_into = self.buffer, CAN_FRAME.size, CAN_FRAME.pack_into
+        for index in range(count):
+            pack_into(buffer, index * size, ids[index], 8, data[index])
+        view, send = memoryview(buffer), self.socket.send
+        for index in range(count):
+            offset = index * size
+            for attempt in range(SEND_RETRIES + 1):
+                try:
+                    send(view[offset:offset + size])  # SocketCAN takes one frame per write
+                    break
+                except OSError as error:
+                    if error.errno not in (errno.ENOBUFS, errno.EAGAIN):
+                        raise
+                    if attempt == SEND_RETRIES:
+                        return index  # The queue is not draining: drop this tick's remaining frames
+                    time.sleep(SEND_BACKOFF_S)
+        return count
+
+    def receive(self):
+        """(can_id, data) of every frame waiting on the socket"""
+        frames = []
+        while True:
+            try:
+                frame = self.socket.recv(CAN_FRAME.size, socket.MSG_DONTWAIT)
+            except BlockingIOError:
+                return frames
+            can_id, dlc, data = CAN_FRAME.unpack(frame)
+            frames.append((can_id & socket.CAN_SFF_MASK, data[:dlc]))
+
+    def close(self):
+        self.socket.close()
+
+
+class CandumpTransport:
+    """Writes frames as candump -l lines, '(1700000000.000000) vcan0 7E8#04410C1AF8AAAAAA'"""
+
+    def __init__(self, file, channel):
+        self.file = file
+        self.channel = channel
+        self._prefixes = {}
+
+    def send(self, ids, data, times, count):
+        prefixes, encoded = self._prefixes, {}
+        lines = []
+        for index in range(count):
+            can_id, frame = ids[index], data[index]
+            prefix = prefixes.get(can_id)
+            if prefix is None:
+                prefix = prefixes[can_id] = f") {self.channel} {can_id:03X}#"
+            text = encoded.get(frame)
+            if text is None:
+                text = encoded[frame] = frame.hex().upper() + "\n"
+            lines.append(f"({times[index]:.6f}{prefix}{text}")
+        self.file.write("".join(lines))
+        return count
+
+    def receive(self):
+        return []  # A log has no tester
+
+    def close(self):
+        pass  # The file is shared by every channel and closed by its owner
+
+
+class ObdCanNode:
+    """A simulated vehicle's engine ECU on a CanBus"""
+
+    def __init__(self, engine, bus, ecu=0, schedule=None, vin=DEFAULT_VIN):
+        if not 0 <= ecu < MAX_ECUS:
+            raise ValueError(f"ISO 15765-4 addresses at most {MAX_ECUS} ECUs per bus")
+        self.engine = engine
+        self.bus = bus
+        self.response_id = ECU_RESPONSE_ID + ecu
+        self.request_id = ECU_REQUEST_ID + ecu
+        self.table = ResponseTable(vin)
+        self.schedule = [(request, period_ms / 1000) for request, period_ms in (schedule or DEFAULT_SCHEDULE).items()]
+        self.next_due = [0.0] * len(self.schedule)
+        self.pending = None  # (consecutive frames, index) of a requested transfer awaiting flow control
+        self._cleared_faults = None
+
+    def tick(self, now_s, dt):
+        """Queue every scheduled response due in [now_s, now_s + dt) from the current sensor data"""
+        faults = self.engine.present_faults()
+        if self.table.cleared and faults != self._cleared_faults:
+            self.table.cleared = False
+        end_s, payloads = now_s + dt, None
+        next_due, queue, response_id = self.next_due, self.bus.queue, self.response_id
+        for index, (request, period_s) in enumerate(self.schedule):
+            due = next_due[index]
+            if due < now_s:
+                due = now_s  # First tick, or a period shorter than the backlog we just skipped
+            if due >= end_s:
+                continue
+            if payloads is None:
+                payloads = self.table.payloads(self.engine.sensor_data, faults)
+            payload = payloads.get(request)
+            if payload is None:
+                next_due[index] = end_s  # Not a response this ECU supports
+                continue
+            frames = isotp_frames(payload)
+            while due < end_s:
+                queue(response_id, frames, due)
+                due += period_s
+            next_due[index] = due
+
+    def handle(self, can_id, data, now_s):
+        """Answer a tester request (single frame) or flow control for a pending transfer"""
+        if not data:
+            return
+        kind = data[0] >> 4
+        if can_id == self.request_id and kind == 3 and self.pending is not None:
+            self._continue(data, now_s)
+        elif can_id in (FUNCTIONAL_REQUEST_ID, self.request_id) and kind == 0:
+            request = bytes(data[1:1 + (data[0] & 0x0F)]).hex().upper()
+            if request == "04":
+                self.table.cleared = True
+                self._cleared_faults = self.engine.present_faults()
+                self.bus.queue(self.response_id, isotp_frames([0x44]), now_s)
+                return
+            payload = self.table.payloads(self.engine.sensor_data, self.engine.present_faults()).get(request)
+            if payload is None:
+                return  # Unsupported requests stay unanswered, as on a real ECU
+            frames = isotp_frames(payload)
+            self.bus.queue(self.response_id, frames[:1], now_s)
+            self.pending = (frames, 1) if len(frames) > 1 else None
+
+    def _continue(self, flow_control, now_s):
+        status = flow_control[0] & 0x0F
+        if status == 2:  # Overflow: abort
+            self.pending = None
+            return
+        if status != 0:  # Wait
+            return
+        frames, index = self.pending
+        block_size = flow_control[1] if len(flow_control) > 1 else 0
+        stmin_s = _stmin_s(flow_control[2]) if len(flow_control) > 2 else 0.0
+        stop = len(frames) if not block_size else min(len(frames), index + block_size)
+        due = now_s
+        for frame in frames[index:stop]:
+            self.bus.queue(self.response_id, (frame,), due)
+            due += stmin_s
+        self.pending = (frames, stop) if stop < len(frames) else None
+
+
+class CanSimulator:
+    """Steps every vehicle and puts its frames on its bus, one tick at a time"""
+
+    def __init__(self, nodes, dt):
+        self.nodes = nodes
+        self.dt = dt
+        self.buses = list({id(node.bus): node.bus for node in nodes}.values())
+        self._listeners = {}  # bus -> nodes, for buses that can receive requests
+        for node in nodes:
+            if not isinstance(node.bus.transport, CandumpTransport):
+                self._listeners.setdefault(id(node.bus), []).append(node)
+
+    def tick(self, timestamp_ms):
+        now_s = timestamp_ms / 1000
+        for bus in self.buses:
+            listeners = self._listeners.get(id(bus))
+            if listeners:
+                for can_id, data in bus.receive():
+                    for node in listeners:
+                        node.handle(can_id, data, now_s)
+        dt = self.dt
+        for node in self.nodes:
+            node.engine.step()
+            node.tick(now_s, dt)
+        for bus in self.buses:
+            bus.flush()
+
+    def close(self):
+        for bus in self.buses:
+            bus.close()
+
+    def stats(self, elapsed_s):
+        """(frames sent, frames dropped, mean bus load over elapsed_s of simulated time)"""
+        sent = sum(bus.frames_sent for bus in self.buses)
+        dropped = sum(bus.frames_dropped for bus in self.buses)
+        load = sum(bus.busy_s for bus in self.buses) / (elapsed_s * len(self.buses)) if elapsed_s else 0.0
+        return sent, dropped, min(load, 1.0)  # The last tick's frames may run past elapsed_s
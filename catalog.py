@@ -0,0 +1,89 @@
+"""DTC catalog loaded from an external JSON/YAML file with precomputed indexes.
+
+The catalog file lists {"name": "P0217 - Engine Over Temperature",
+"situations": [...]} entries; a fault can have several situations and a
+situation can belong to several faults.  Forward (fault -> situations),
+code (P0217 -> fault) and reverse (situation -> faults) indexes are built
+once at load, so lookups never scan the table.  Descriptions, severity and
+recommended fixes live in a separate, larger file that is only read the
+first time describe() is called.
+"""
+import json
+import os
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+CATALOG_PATH = os.environ.get("OBD_FAULT_CATALOG", os.path.join(_HERE, "fault_catalog.json"))
+DESCRIPTIONS_PATH = os.environ.get("OBD_FAULT_DESCRIPTIONS", os.path.join(_HERE, "fault_descriptions.json"))
+CATALOG_VERSION = 1
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as file:
+        if path.endswith((".yaml", ".yml")):
+            if yaml is None:
+                raise RuntimeError("YAML fault catalogs require PyYAML: pip install pyyaml")
+            return yaml.safe_load(file)
+        return json.load(file)
+
+
+def fault_code(name):
+    """'P0217 - Engine Over Temperature' -> 'P0217'"""
+    return name.partition(" - ")[0]
+
+
+class FaultCatalog:
+    def __init__(self, entries, descriptions_path=None):
+        self.faults = {}  # name -> situations, in catalog order
+        self.by_code = {}  # DTC -> name
+        self.by_situation = {}  # situation -> names, in catalog order
+        for entry in entries:
+            name, situations = entry["name"], list(entry["situations"])
+            if name in self.faults:
+                raise ValueError(f"Duplicate fault in catalog: {name}")
+            self.faults[name] = situations
+            self.by_code.setdefault(fault_code(name), name)
+            for situation in situations:
+                self.by_situation.setdefault(situation, []).append(name)
+        self.descriptions_path = descriptions_path
+        self._descriptions = None
+
+    @classmethod
+    def load(cls, path=CATALOG_PATH, descriptions_path=DESCRIPTIONS_PATH):
+        catalog = _read(path)
+        if catalog.get("version") != CATALOG_VERSION:
+            raise ValueError(f"Unsupported fault catalog version: {catalog.get('version')}")
+        return cls(catalog["faults"], descriptions_path)
+
+    def __len__(self):
+        return len(self.faults)
+
+    def __contains__(self, name):
+        return name in self.faults
+
+    def resolve(self, text):
+        """Full fault name for a name or a bare DTC like 'P0217'"""
+        return text if text in self.faults else self.by_code.get(text.strip().upper(), text)
+
+    def faults_for(self, situation):
+        """Every fault the situation can cause"""
+        return self.by_situation.get(situation, [])
+
+    def describe(self, name):
+        """{"description", "severity", "fix"} for a fault, empty when the catalog has none"""
+        if self._descriptions is None:
+            path = self.descriptions_path
+            self._descriptions = _read(path) if path and os.path.exists(path) else {}
+        return self._descriptions.get(name, {})
+
+    def search(self, text):
+        """Fault names containing text, case-insensitively"""
+        text = text.lower()
+        return [name for name in self.faults if text in name.lower()]
+
+
+CATALOG = FaultCatalog.load()
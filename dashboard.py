@@ -0,0 +1,327 @@
+"""Incremental telemetry dashboard: gauges, value labels and sparklines per signal.
+
+push() only records ROW_FIELDS rows into fixed-size ring buffers and marks the
+signal dirty; nothing touches a widget until refresh(), which a timer runs
+at the display refresh rate.  A refresh re-sets only the labels whose text
+changed and schedules repaints only for the sparklines and gauges that got
+new samples, so the cost per frame does not grow with the update rate and
+bursts of samples between two frames collapse into one repaint.
+
+Given a history.HistoryStore, every pushed row is also recorded there, and
+set_span() switches the sparklines from the live ring buffers to a
+long-horizon view of the store (min/max band around the mean), redrawn
+once a second.
+
+StatsPanel shows a metrics.Metrics registry (tick timing, buffered rows,
+flushes) as text, refreshed once a second.
+"""
+import time
+
+from PyQt6.QtWidgets import QGridLayout, QHBoxLayout, QLabel, QVBoxLayout, QWidget
+from PyQt6.QtCore import QPointF, QRectF, QTimer, Qt
+from PyQt6.QtGui import QColor, QFont, QGuiApplication, QPainter, QPen, QPolygonF
+
+from scheduler import format_timestamp
+from schema import SIGNALS, SIGNAL_NAMES, Signal
+
+SPARKLINE_SAMPLES = 120  # History kept per signal
+DASHBOARD_COLUMNS = 3
+DEFAULT_REFRESH_HZ = 60.0  # When the screen does not report its refresh rate
+STATS_INTERVAL_MS = 1000
+HISTORY_REPAINT_S = 1.0  # Long-horizon sparklines change slowly; redraw them at most this often
+
+# Signals drawn as dial gauges, scaled to their schema bounds
+GAUGES = (Signal.ENGINE_RPM, Signal.WHEEL_SPEED, Signal.COOLANT_TEMP, Signal.FUEL_LEVEL)
+
+BACKGROUND = QColor("#3B4252")
+TRACK = QColor("#4C566A")
+LINE = QColor("#88C0D0")
+BAND = QColor("#5E81AC")
+TEXT = "#ECEFF4"
+
+
+def format_value(value):
+    return f"{value:.2f}" if isinstance(value, float) else str(value)
+
+
+class RingBuffer:
+    """Fixed-size sample history; append overwrites the oldest sample and never allocates"""
+
+    def __init__(self, size):
+        self.data = [0.0] * size
+        self.size = size
+        self.head = 0  # Next slot to write
+        self.count = 0
+
+    def append(self, value):
+        self.data[self.head] = value
+        self.head = (self.head + 1) % self.size
+        if self.count < self.size:
+            self.count += 1
+
+    def values(self):
+        """Samples oldest first"""
+        if self.count < self.size:
+            return self.data[:self.count]
+        return self.data[self.head:] + self.data[:self.head]
+
+
+class Sparkline(QWidget):
+    """Rolling line chart of a RingBuffer, auto-scaled to its current min/max.
+
+    With a history store and span set, it charts the last span seconds of the
+    store instead: the mean as a line over the min..max range as a band.
+    """
+
+    def __init__(self, buffer, parent=None, store=None, name=None):
+        super().__init__(parent)
+        self.buffer = buffer
+        self.store = store
+        self.name = name
+        self.span_ms = None
+        self.setMinimumSize(120, 28)
+        self.setAttribute(Qt.WidgetAttribute.WA_OpaquePaintEvent)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), BACKGROUND)
+        if self.span_ms is not None and self.store is not None:
+            self._paint_history(painter)
+            return
+        values = self.buffer.values()
+        if len(values) < 2:
+            return
+        low, high = min(values), max(values)
+        scale = (self.height() - 4) / ((high - low) or 1)
+        step = (self.width() - 1) / (self.buffer.size - 1)
+        x0 = (self.buffer.size - len(values)) * step  # Newest sample stays on the right edge
+        bottom = self.height() - 2
+        painter.setPen(QPen(LINE, 1.5))
+        painter.drawPolyline(QPolygonF(
+            [QPointF(x0 + i * step, bottom - (value - low) * scale) for i, value in enumerate(values)]
+        ))
+
+    def _paint_history(self, painter):
+        end_ms = self.store.last_ms
+        if end_ms is None:
+            return
+        start_ms = end_ms - self.span_ms
+        result = self.store.query(self.name, start_ms, end_ms, max_points=max(2, self.width()))
+        columns = result["signals"][self.name]
+        means = columns["value"] if "value" in columns else columns["mean"]
+        lows, highs = columns.get("min", means), columns.get("max", means)
+        if len(means) < 2:
+            return
+        low, high = min(lows), max(highs)
+        scale = (self.height() - 4) / ((high - low) or 1)
+        x_scale = (self.width() - 1) / self.span_ms
+        xs = [(timestamp - start_ms) * x_scale for timestamp in result["timestamp_ms"]]
+        bottom = self.height() - 2
+        if lows is not means:
+            painter.setPen(QPen(BAND, 1))
+            for x, lo, hi in zip(xs, lows, highs):
+                painter.drawLine(QPointF(x, bottom - (lo - low) * scale), QPointF(x, bottom - (hi - low) * scale))
+        painter.setPen(QPen(LINE, 1.5))
+        painter.drawPolyline(QPolygonF([QPointF(x, bottom - (value - low) * scale) for x, value in zip(xs, means)]))
+
+
+class Gauge(QWidget):
+    """240° dial showing a value within a fixed (min, max) range"""
+
+    def __init__(self, low, high, parent=None):
+        super().__init__(parent)
+        self.low, self.high = low, high
+        self.value = low
+        self.setMinimumSize(110, 110)
+
+    def set_value(self, value):
+        if value != self.value:
+            self.value = value
+            self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        side = min(self.width(), self.height()) - 12
+        rect = QRectF((self.width() - side) / 2, (self.height() - side) / 2, side, side)
+        fraction = min(1.0, max(0.0, (self.value - self.low) / ((self.high - self.low) or 1)))
+        painter.setPen(QPen(TRACK, 8, cap=Qt.PenCapStyle.RoundCap))
+        painter.drawArc(rect, 210 * 16, -240 * 16)
+        painter.setPen(QPen(LINE, 8, cap=Qt.PenCapStyle.RoundCap))
+        painter.drawArc(rect, 210 * 16, round(-240 * 16 * fraction))
+
+
+class Dashboard(QWidget):
+    """Per-signal telemetry view fed by push() and repainted at most once per display frame.
+
+    Callables added with add_source() are polled at the start of every frame
+    for the rows produced since the previous one.  Pass a metrics.Metrics
+    registry to time every frame, and a history.HistoryStore to record every
+    row for set_span().
+    """
+
+    def __init__(self, signals=SIGNAL_NAMES, history=SPARKLINE_SAMPLES, parent=None, metrics=None, store=None):
+        super().__init__(parent)
+        self.store = store
+        self.span_ms = None
+        self.history_painted = 0.0
+        self.frame_seconds = None if metrics is None else metrics.histogram(
+            "frame_seconds", "Time to poll the sources and update the dashboard widgets for one display frame"
+        )
+        self.buffers = {name: RingBuffer(history) for name in signals}
+        self.latest = {}  # Newest value per signal, waiting for the next refresh
+        self.dirty = set()  # Signals with samples not yet on screen
+        self.shown = {}  # Label text currently displayed per signal
+        self.status_row = None  # Newest row, for the timestamp/fault line
+        self.sources = []
+        self.value_labels = {}
+        self.sparklines = {}
+        self.gauges = {}
+
+        layout = QVBoxLayout(self)
+        self.status_label = QLabel()
+        self.status_label.setFont(QFont("Arial", 12, QFont.Weight.Bold))
+        self.status_label.setStyleSheet(f"color: {TEXT};")
+        layout.addWidget(self.status_label)
+
+        gauge_layout = QHBoxLayout()
+        for signal in GAUGES:
+            name, low, high = SIGNALS[signal].name, SIGNALS[signal].low, SIGNALS[signal].high
+            if name not in self.buffers:
+                continue
+            box = QVBoxLayout()
+            self.gauges[name] = Gauge(low, high)
+            box.addWidget(self.gauges[name])
+            label = QLabel(name)
+            label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+            label.setStyleSheet(f"color: {TEXT};")
+            box.addWidget(label)
+            gauge_layout.addLayout(box)
+        layout.addLayout(gauge_layout)
+
+        grid = QGridLayout()
+        for index, name in enumerate(signals):
+            row, column = divmod(index, DASHBOARD_COLUMNS)
+            tile = QVBoxLayout()
+            header = QHBoxLayout()
+            title = QLabel(name)
+            title.setStyleSheet("color: #D8DEE9;")
+            header.addWidget(title)
+            value = QLabel("-")
+            value.setFont(QFont("Arial", 12, QFont.Weight.Bold))
+            value.setAlignment(Qt.AlignmentFlag.AlignRight)
+            value.setStyleSheet(f"color: {TEXT};")
+            header.addWidget(value)
+            tile.addLayout(header)
+            self.value_labels[name] = value
+            self.sparklines[name] = Sparkline(self.buffers[name], store=store, name=name)
+            tile.addWidget(self.sparklines[name])
+            grid.addLayout(tile, row, column)
+        layout.addLayout(grid)
+
+        screen = QGuiApplication.primaryScreen()
+        refresh_hz = screen.refreshRate() if screen is not None and screen.refreshRate() > 0 else DEFAULT_REFRESH_HZ
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_timer.start(max(1, round(1000 / refresh_hz)))
+
+    def add_source(self, source):
+        """Poll source() for an iterable of new rows on every frame"""
+        self.sources.append(source)
+
+    def push(self, row):
+        """Record one ROW_FIELDS row; cheap enough to call for every simulated tick"""
+        if self.store is not None:
+            self.store.append(row)
+        buffers, latest, dirty = self.buffers, self.latest, self.dirty
+        for name, value in zip(SIGNAL_NAMES, row[1:-2]):
+            buffer = buffers.get(name)
+            if buffer is not None:
+                buffer.append(value)
+                latest[name] = value
+                dirty.add(name)
+        self.status_row = row
+
+    def clear(self):
+        """Forget the history and the values on screen, e.g. before replaying a different log"""
+        for buffer in self.buffers.values():
+            buffer.count = buffer.head = 0
+        if self.store is not None:
+            self.store.clear()
+        self.latest.clear()
+        self.shown.clear()
+        self.status_row = None
+        self.status_label.setText("")
+        for label in self.value_labels.values():
+            label.setText("-")
+        for gauge in self.gauges.values():
+            gauge.set_value(gauge.low)
+        self.dirty.update(self.buffers)
+
+    def set_span(self, seconds):
+        """Chart the last seconds of the history store in the sparklines, or the live buffers for None"""
+        self.span_ms = None if seconds is None or self.store is None else round(seconds * 1000)
+        for sparkline in self.sparklines.values():
+            sparkline.span_ms = self.span_ms
+            sparkline.update()
+
+    def refresh(self):
+        """Bring the widgets up to date with the samples pushed since the last frame"""
+        if self.frame_seconds is None:
+            self._refresh()
+            return
+        started = time.perf_counter()
+        self._refresh()
+        self.frame_seconds.observe(time.perf_counter() - started)
+
+    def _refresh(self):
+        for source in self.sources:
+            for row in source():
+                self.push(row)
+        if not self.dirty:
+            return
+        if self.status_row is not None:
+            self.status_label.setText(f"{format_timestamp(self.status_row[0])} | {self.status_row[-2]}")
+        for name in self.dirty:
+            if name in self.latest:
+                text = format_value(self.latest[name])
+                if self.shown.get(name) != text:
+                    self.shown[name] = text
+                    self.value_labels[name].setText(text)
+                if name in self.gauges:
+                    self.gauges[name].set_value(self.latest[name])
+            if self.span_ms is None:
+                self.sparklines[name].update()
+        if self.span_ms is not None and time.monotonic() - self.history_painted >= HISTORY_REPAINT_S:
+            self.history_painted = time.monotonic()
+            for name in self.dirty:
+                self.sparklines[name].update()
+        self.dirty.clear()
+
+
+class StatsPanel(QLabel):
+    """Text view of a Metrics registry: values, and count/p50/p99 for histograms"""
+
+    def __init__(self, metrics, parent=None):
+        super().__init__(parent)
+        self.metrics = metrics
+        self.setFont(QFont("Monospace", 10))
+        self.setStyleSheet(f"color: {TEXT};")
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(STATS_INTERVAL_MS)
+        self.refresh()
+
+    def refresh(self):
+        if not self.isVisible():
+            return
+        lines = []
+        for name, metric in list(self.metrics.metrics.items()):
+            name = name[len(self.metrics.prefix):]
+            if metric.kind == "histogram":
+                p50, p99 = metric.quantile(0.5), metric.quantile(0.99)
+                quantiles = "-" if p50 is None else f"p50 <= {p50 * 1000:g} ms, p99 <= {p99 * 1000:g} ms"
+                lines.append(f"{name}: {metric.count} ({quantiles})")
+            else:
+                lines.append(f"{name}: {metric.value:,}")
+        self.setText("\n".join(lines))
@@ -0,0 +1,220 @@
+"""Balanced, labelled ML dataset builder: stratified splits of fixed-length windows in parallel shards.
+
+A stratum is one fault x situation x driving scenario combination, and each
+gets an exact target count of windows (sequences of `window` ticks from one
+simulated vehicle).  Every stratum is divided between the splits in the
+requested proportions, so train/val/test share the same class balance, and
+each split is shuffled as a whole before it is cut into shards of
+shard_windows windows.  The plan is fixed by the seed and written to
+dataset.json before any shard is generated.
+
+Shards are generated by a process pool with generate_batch, each from its
+own SeedSequence(seed, spawn_key=(split, shard)) stream, so the output does
+not depend on the worker count or on which shards a resumed run still had
+to make.  A shard is written into <split>/shard-NNNNN.tmp and renamed when
+complete; rerunning the same build skips finished shards.  Each window's
+speed label is its cruise speed, which the physics model uses as its
+target speed.
+"""
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from batch import FAULT_NAMES, SCENARIO_NAMES, generate_batch
+from catalog import CATALOG
+from engine import DrivingScenarios, Faults, SIGNAL_NAMES
+from exporters import NpyAppender
+from fleet import SHARD_BYTES
+
+DATASET_VERSION = 2
+DATASET_MANIFEST = "dataset.json"
+SPLIT_NAMES = ("train", "val", "test")
+DEFAULT_SPLITS = (0.8, 0.1, 0.1)
+DEFAULT_WINDOW = 60
+DEFAULT_SHARD_WINDOWS = 4096
+HEALTHY_FAULT = "No Faults Detected"
+SITUATION_NAMES = list(CATALOG.by_situation)
+PROGRESS_INTERVAL_S = 0.5
+
+
+def strata(faults=None, scenarios=None):
+    """Every (fault, situation, scenario) combination the catalog allows, as name triples"""
+    return [(fault, situation, scenario)
+            for fault in faults or FAULT_NAMES for situation in Faults[fault]
+            for scenario in scenarios or SCENARIO_NAMES]
+
+
+def resolve_targets(combinations, default, overrides=()):
+    """Window count per stratum: default, then every override that matches it, in order.
+
+    An override is {"fault", "situation", "scenario", "count"}; a missing key
+    matches anything, and faults may be given by bare DTC.
+    """
+    counts = [default] * len(combinations)
+    for override in overrides:
+        fault = CATALOG.resolve(override["fault"]) if "fault" in override else None
+        for index, (name, situation, scenario) in enumerate(combinations):
+            if (fault in (None, name) and override.get("situation") in (None, situation)
+                    and override.get("scenario") in (None, scenario)):
+                counts[index] = int(override["count"])
+    return counts
+
+
+def allocate(counts, fractions):
+    """(strata, splits) window counts: each stratum's count divided between the splits in proportion.
+
+    Windows are dealt in stratum order, each to the split furthest below its
+    share of the windows dealt so far.  Every stratum and the split totals
+    thus stay within a window or two of the fractions, and the rounding does
+    not favour one split the way rounding every stratum on its own would.
+    """
+    fractions = [fraction / sum(fractions) for fraction in fractions]
+    dealt = [0] * len(fractions)
+    sizes = np.zeros((len(counts), len(fractions)), dtype=np.int64)
+    total = 0
+    for stratum, count in enumerate(counts):
+        for _ in range(count):
+            total += 1
+            split = max(range(len(fractions)), key=lambda i: fractions[i] * total - dealt[i])
+            dealt[split] += 1
+            sizes[stratum, split] += 1
+    return sizes
+
+
+def plan_dataset(combinations, counts, fractions, seed, shard_windows):
+    """Per split, the shuffled stratum index of every window, cut into shards"""
+    sizes = allocate(counts, fractions)
+    empty = [name for name, fraction, size in zip(SPLIT_NAMES, fractions, sizes.sum(axis=0)) if fraction and not size]
+    if empty:
+        raise ValueError(f"Too few windows for a {'/'.join(empty)} split; raise the per-stratum counts")
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(0xDA7A,)))
+    members = [[] for _ in fractions]
+    for stratum, row in enumerate(sizes):
+        for split, size in enumerate(row):
+            members[split].extend([stratum] * int(size))
+    plan = []
+    for windows in members:
+        order = rng.permutation(np.asarray(windows, dtype=np.int64))
+        plan.append([order[first:first + shard_windows].tolist() for first in range(0, len(order), shard_windows)])
+    return plan
+
+
+def shard_dir(output_dir, split, shard):
+    return os.path.join(output_dir, split, f"shard-{shard:05d}")
+
+
+def run_shard(output_dir, split_index, shard, strata_ids, combinations, window, seed, physics, dt, ac_fraction):
+    """Worker entry point: generate one shard's windows into a temp directory and rename it into place"""
+    began = time.perf_counter()
+    final = shard_dir(output_dir, SPLIT_NAMES[split_index], shard)
+    path = final + ".tmp"
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(split_index, shard)))
+    ids = np.asarray(strata_ids, dtype=np.int64)
+    fault = np.array([FAULT_NAMES.index(combinations[i][0]) for i in ids], dtype=np.int32)
+    situation = np.array([SITUATION_NAMES.index(combinations[i][1]) for i in ids], dtype=np.int32)
+    scenario = np.array([SCENARIO_NAMES.index(combinations[i][2]) for i in ids], dtype=np.int32)
+    ranges = np.array([DrivingScenarios[name]["speed_range"] for name in SCENARIO_NAMES])
+    speed = np.floor(rng.uniform(ranges[scenario, 0], ranges[scenario, 1] + 1))
+    ac_on = rng.random(len(ids)) < ac_fraction
+    labels = {
+        "stratum": ids, "fault": fault, "situation": situation, "scenario": scenario,
+        "anomaly": fault != FAULT_NAMES.index(HEALTHY_FAULT), "speed": speed, "ac_on": ac_on,
+    }
+    for name, values in labels.items():
+        np.save(os.path.join(path, f"{name}.npy"), values)
+
+    signals = NpyAppender(os.path.join(path, "signals.npy"), np.float32, (window, len(SIGNAL_NAMES)))
+    chunk = max(1, SHARD_BYTES // (window * len(SIGNAL_NAMES) * 4))
+    for first in range(0, len(ids), chunk):
+        last = min(len(ids), first + chunk)
+        signals.append(generate_batch(
+            last - first, window, faults=fault[first:last], scenarios=scenario[first:last], car_on=True,
+            ac_on=ac_on[first:last], speed=speed[first:last], rng=rng, physics=physics, dt=dt,
+        ))
+    signals.close()
+    os.replace(path, final)
+    return {"split": SPLIT_NAMES[split_index], "shard": shard, "windows": len(ids),
+            "seconds": time.perf_counter() - began}
+
+
+def _format_eta(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+
+def _progress(done, total, rate, stream):
+    eta = _format_eta((total - done) / rate) if rate else "?"
+    stream.write(f"\r{done}/{total} windows ({done / max(total, 1):.0%}), {rate:.0f} windows/s, ETA {eta}   ")
+    stream.flush()
+
+
+def build_dataset(output_dir, per_stratum=100, overrides=(), faults=None, scenarios=None, window=DEFAULT_WINDOW,
+                  fractions=DEFAULT_SPLITS, seed=0, workers=None, shard_windows=DEFAULT_SHARD_WINDOWS,
+                  physics=False, dt=1.0, ac_fraction=0.3, progress=sys.stderr):
+    """Generate (or resume) a balanced dataset under output_dir and return its dataset.json contents.
+
+    Reports windows done, throughput and ETA on progress (None for silence).
+    A resumed build must use the same settings; its finished shards are kept.
+    """
+    combinations = strata(faults, scenarios)
+    counts = resolve_targets(combinations, per_stratum, overrides)
+    config = {
+        "version": DATASET_VERSION, "seed": seed, "window": window, "dt": dt, "physics": physics,
+        "ac_fraction": ac_fraction, "splits": dict(zip(SPLIT_NAMES, fractions)), "shard_windows": shard_windows,
+        "strata": [{"fault": fault, "situation": situation, "scenario": scenario, "count": count}
+                   for (fault, situation, scenario), count in zip(combinations, counts)],
+    }
+    manifest_path = os.path.join(output_dir, DATASET_MANIFEST)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as file:
+            previous = json.load(file)
+        if {key: previous.get(key) for key in config} != config:
+            raise ValueError(f"{output_dir} holds a dataset built with other settings; use a new directory")
+    plan = plan_dataset(combinations, counts, fractions, seed, shard_windows)
+    manifest = dict(
+        config, signal_names=SIGNAL_NAMES, fault_names=FAULT_NAMES, situation_names=SITUATION_NAMES,
+        scenario_names=SCENARIO_NAMES, shards={split: len(shards) for split, shards in zip(SPLIT_NAMES, plan)},
+        windows={split: sum(map(len, shards)) for split, shards in zip(SPLIT_NAMES, plan)},
+    )
+    os.makedirs(output_dir, exist_ok=True)
+    with open(manifest_path + ".tmp", "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=1)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+    total = sum(manifest["windows"].values())
+    done = 0
+    pending = []
+    for split_index, shards in enumerate(plan):
+        os.makedirs(os.path.join(output_dir, SPLIT_NAMES[split_index]), exist_ok=True)
+        for shard, ids in enumerate(shards):
+            if os.path.isdir(shard_dir(output_dir, SPLIT_NAMES[split_index], shard)):
+                done += len(ids)  # finished by an earlier run
+            else:
+                pending.append((split_index, shard, ids))
+    began, resumed, shown = time.perf_counter(), done, 0.0
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        futures = [pool.submit(run_shard, output_dir, split_index, shard, ids, combinations, window, seed, physics,
+                               dt, ac_fraction) for split_index, shard, ids in pending]
+        try:
+            for future in as_completed(futures):
+                done += future.result()["windows"]
+                now = time.perf_counter()
+                if progress is not None and (now - shown >= PROGRESS_INTERVAL_S or done == total):
+                    shown = now
+                    _progress(done, total, (done - resumed) / (now - began), progress)
+        except BaseException:
+            pool.shutdown(cancel_futures=True)  # stop at the shards already running; a rerun resumes
+            raise
+    if progress is not None:
+        progress.write("\n")
+    manifest["seconds"] = time.perf_counter() - began
+    manifest["resumed_windows"] = resumed
+    return manifest
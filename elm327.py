@@ -0,0 +1,304 @@
+"""ELM327-compatible emulator serving live simulator data over TCP and a pseudo-terminal.
+
+Responses are encoded once per simulation tick into a ResponseTable, so
+answering a request is a single dict lookup regardless of how many clients
+are connected.  The emulated adapter reports ISO 15765-4 CAN (11 bit,
+500 kbaud) and answers AT commands plus Mode 01 (live data), Mode 03
+(stored DTCs), Mode 04 (clear DTCs) and Mode 09 (vehicle information).
+"""
+import asyncio
+import os
+import time
+import tty
+
+ELM_VERSION = "ELM327 v1.5"
+PROTOCOL = "ISO 15765-4 (CAN 11/500)"
+ECU_HEADER = "7E8"
+DEFAULT_VIN = "1HGCM82633A004352"
+ECU_NAME = "ECM-EngineControl"
+
+
+def _u8(value):
+    return max(0, min(255, int(round(value))))
+
+
+def _u16(value):
+    value = max(0, min(0xFFFF, int(round(value))))
+    return [value >> 8, value & 0xFF]
+
+
+def _s16(value):
+    value = max(-0x8000, min(0x7FFF, int(round(value)))) & 0xFFFF
+    return [value >> 8, value & 0xFF]
+
+
+# Mode 01 PID -> encoder from sensor_data to data bytes (SAE J1979 scalings).  Fuel pressure is served as
+# rail gauge pressure (0x23, up to 655 MPa) only: the simulated 2000-4000 kPa is beyond 0x0A's 765 kPa range.
+MODE01_ENCODERS = {
+    0x05: lambda d: [_u8(d["Coolant Temp (°C)"] + 40)],
+    0x06: lambda d: [_u8(d["Short Term Fuel Trim (%)"] * 1.28 + 128)],
+    0x07: lambda d: [_u8(d["Long Term Fuel Trim (%)"] * 1.28 + 128)],
+    0x0C: lambda d: _u16(d["Engine RPM"] * 4),
+    0x0D: lambda d: [_u8(d["Wheel Speed (km/h)"])],
+    0x14: lambda d: [_u8(d["O2 Sensor Voltage (V)"] * 200), 0xFF],
+    0x23: lambda d: _u16(d["Fuel Pressure (kPa)"] / 10),
+    0x2C: lambda d: [_u8(d["EGR Flow (%)"] * 2.55)],
+    0x2F: lambda d: [_u8(d["Fuel Level (%)"] * 2.55)],
+    0x32: lambda d: _s16(d["Evap System Vapor Pressure (kPa)"] * 1000 * 4),
+    0x3C: lambda d: _u16((d["Catalyst Temp (°C)"] + 40) * 10),
+    0x42: lambda d: _u16(d["Battery Voltage (V)"] * 1000),
+    0x46: lambda d: [_u8(d["Ambient Air Temp (°C)"] + 40)],
+}
+
+
+def _supported_bitmap(pids, base):
+    """4-byte 'PIDs supported [base+1 - base+0x20]' bitmap"""
+    bits = 0
+    for pid in pids:
+        if base < pid <= base + 0x20:
+            bits |= 1 << (0x20 - (pid - base))
+    return list(bits.to_bytes(4, "big"))
+
+
+def encode_dtc(code):
+    """Encode a DTC such as 'P0217' into its two-byte SAE J2012 form"""
+    system = "PCBU".index(code[0])
+    digits = [int(ch, 16) for ch in code[1:5]]
+    return [(system << 6) | (digits[0] << 4) | digits[1], (digits[2] << 4) | digits[3]]
+
+
+def fault_dtcs(faults):
+    """DTC codes ('P0217', ...) for fault names like 'P0217 - Engine Over Temperature'"""
+    codes = []
+    for fault in faults:
+        code = fault.split(" - ", 1)[0]
+        if len(code) == 5 and code[0] in "PCBU":
+            codes.append(code)
+    return codes
+
+
+def _hex(data, spaces):
+    return (" " if spaces else "").join(f"{byte:02X}" for byte in data)
+
+
+def format_message(payload, headers, spaces):
+    """Render one ECU message as the ELM327 prints it with CAN auto-formatting on"""
+    sep = " " if spaces else ""
+    if len(payload) <= 7:
+        if headers:
+            return sep.join([ECU_HEADER, f"{len(payload):02X}", _hex(payload, spaces)])
+        return _hex(payload, spaces)
+
+    # ISO-TP multi-frame: first frame carries 6 bytes, consecutive frames 7 each
+    chunks = [payload[:6]] + [payload[i:i + 7] for i in range(6, len(payload), 7)]
+    if headers:
+        lines = [sep.join([ECU_HEADER, f"1{len(payload) >> 8:X}", f"{len(payload) & 0xFF:02X}", _hex(chunks[0], spaces)])]
+        lines += [sep.join([ECU_HEADER, f"2{i % 16:X}", _hex(chunk, spaces)]) for i, chunk in enumerate(chunks[1:], 1)]
+    else:
+        lines = [f"{len(payload):03X}"]
+        lines += [f"{i % 16:X}:{sep}{_hex(chunk, spaces)}" for i, chunk in enumerate(chunks)]
+    return "\r".join(lines)
+
+
+class ResponseTable:
+    """Per-tick cache of every OBD response, pre-rendered for each headers/spaces combination"""
+
+    def __init__(self, vin=DEFAULT_VIN):
+        self.vin = vin
+        self.responses = {}
+        self.battery_voltage = 12.5
+        self.cleared = False
+
+    def payloads(self, sensor_data, faults):
+        """Raw response payloads keyed by the normalized request ('010C', '03', ...)"""
+        dtcs = [] if self.cleared else fault_dtcs(faults)
+        supported = sorted(MODE01_ENCODERS) + [0x01, 0x20, 0x40]
+        payloads = {
+            "0100": [0x41, 0x00] + _supported_bitmap(supported, 0x00),
+            "0120": [0x41, 0x20] + _supported_bitmap(supported, 0x20),
+            "0140": [0x41, 0x40] + _supported_bitmap(supported, 0x40),
+            # MIL on when a DTC is stored; spark ignition, continuous monitors available
+            "0101": [0x41, 0x01, (0x80 if dtcs else 0) | len(dtcs), 0x07, 0x65, 0x00],
+            "03": [0x43, len(dtcs)] + [byte for code in dtcs for byte in encode_dtc(code)],
+            "0900": [0x49, 0x00] + _supported_bitmap([0x02, 0x0A], 0x00),
+            "0902": [0x49, 0x02, 0x01] + list(self.vin.encode("ascii")),
+            "090A": [0x49, 0x0A, 0x01] + list(ECU_NAME.encode("ascii").ljust(20, b"\0")),
+        }
+        for pid, encoder in MODE01_ENCODERS.items():
+            payloads[f"01{pid:02X}"] = [0x41, pid] + encoder(sensor_data)
+        return payloads
+
+    def update(self, sensor_data, faults):
+        """Re-encode every response for the current tick"""
+        responses = {}
+        for request, payload in self.payloads(sensor_data, faults).items():
+            responses[request] = {
+                (headers, spaces): format_message(payload, headers, spaces)
+                for headers in (False, True) for spaces in (False, True)
+            }
+        self.responses = responses
+        self.battery_voltage = sensor_data["Battery Voltage (V)"]
+
+
+class ELM327Session:
+    """AT-command state and request handling for one connected client"""
+
+    def __init__(self, emulator):
+        self.emulator = emulator
+        self.reset()
+
+    def reset(self):
+        self.echo = True
+        self.linefeeds = False
+        self.spaces = True
+        self.headers = False
+
+    def handle(self, line):
+        """Answer one command line, returning the full reply including the '>' prompt"""
+        command = line.strip().upper().replace(" ", "")
+        reply = self._dispatch(command) if command else ""
+        eol = "\r\n" if self.linefeeds else "\r"
+        text = (line.strip() + eol if self.echo else "") + reply.replace("\r", eol)
+        return text + eol + eol + ">" if reply else text + ">"
+
+    def _dispatch(self, command):
+        if command.startswith("AT"):
+            return self._at(command[2:])
+        if len(command) % 2 == 1:  # trailing response-count hint, e.g. '010C1'
+            command = command[:-1]
+        if command == "04":
+            self.emulator.clear_dtcs()
+            return "44"
+        table = self.emulator.table.responses
+        response = table.get(command)
+        if response is None:
+            return "NO DATA" if all(ch in "0123456789ABCDEF" for ch in command) else "?"
+        return response[(self.headers, self.spaces)]
+
+    def _at(self, command):
+        if command in ("Z", "WS"):
+            self.reset()
+            return ELM_VERSION
+        if command == "I":
+            return ELM_VERSION
+        if command == "@1":
+            return "OBDII Simulator"
+        if command == "RV":
+            return f"{self.emulator.table.battery_voltage:.1f}V"
+        if command == "DP":
+            return PROTOCOL
+        if command == "DPN":
+            return "A6"
+        if command == "D":
+            self.reset()
+            return "OK"
+        flags = {"E": "echo", "L": "linefeeds", "S": "spaces", "H": "headers"}
+        if len(command) == 2 and command[0] in flags and command[1] in "01":
+            setattr(self, flags[command[0]], command[1] == "1")
+            return "OK"
+        if command[:2] in ("SP", "TP", "ST", "AT", "SH", "CA", "CF", "CM", "M0", "M1", "AL", "NL"):
+            return "OK"  # accepted for compatibility; the emulated bus has no timing or filters to tune
+        return "?"
+
+
+class ELM327Emulator:
+    """Steps a SimulationEngine on a fixed rate and serves its data to ELM327 clients"""
+
+    def __init__(self, engine, rate_hz=10.0, vin=DEFAULT_VIN):
+        self.engine = engine
+        self.rate_hz = rate_hz
+        self.table = ResponseTable(vin)
+        self.clients = 0
+        self._cleared_faults = None
+        self._ptys = []
+        self._refresh()
+
+    def _refresh(self):
+        self.table.update(self.engine.sensor_data, self.engine.present_faults())
+
+    def clear_dtcs(self):
+        """Mode 04: report no stored DTCs until the set of simulated faults changes"""
+        self.table.cleared = True
+        self._cleared_faults = self.engine.present_faults()
+        self._refresh()
+
+    async def simulate(self, stop_event=None):
+        """Advance the engine every 1/rate_hz seconds and re-encode the response table"""
+        period = 1 / self.rate_hz
+        start = time.perf_counter()
+        ticks = 0
+        while stop_event is None or not stop_event.is_set():
+            self.engine.step()
+            if self.table.cleared and self.engine.present_faults() != self._cleared_faults:
+                self.table.cleared = False
+            self._refresh()
+            ticks += 1
+            await asyncio.sleep(max(0.0, start + ticks * period - time.perf_counter()))
+
+    async def handle_client(self, reader, writer):
+        """Serve one TCP client until it disconnects"""
+        session = ELM327Session(self)
+        self.clients += 1
+        try:
+            writer.write(b">")
+            buffer = b""
+            while True:
+                data = await reader.read(4096)
+                if not data:
+                    break
+                buffer += data
+                *lines, buffer = buffer.replace(b"\n", b"").split(b"\r")
+                if lines:
+                    writer.write("".join(session.handle(line.decode("ascii", "replace")) for line in lines).encode())
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.clients -= 1
+            writer.close()
+
+    async def serve_tcp(self, host="127.0.0.1", port=35000, backlog=1024):
+        """Start the TCP listener (the usual Wi-Fi adapter port is 35000).
+
+        The accept backlog is sized for hundreds of clients connecting at once;
+        asyncio's default of 100 silently stalls the overflow.
+        """
+        return await asyncio.start_server(self.handle_client, host, port, backlog=backlog)
+
+    def open_pty(self):
+        """Expose the emulator on a pseudo-terminal and return the slave device path"""
+        loop = asyncio.get_running_loop()
+        master, slave = os.openpty()
+        tty.setraw(slave)
+        os.set_blocking(master, False)
+        session = ELM327Session(self)
+        state = {"buffer": b"", "pending": b""}
+
+        def on_writable():
+            # The master is non-blocking: write what the pty takes now, wait for writability for the rest
+            try:
+                written = os.write(master, state["pending"])
+            except BlockingIOError:
+                written = 0
+            except OSError:
+                written = len(state["pending"])  # slave side gone; nobody is reading the reply
+            state["pending"] = state["pending"][written:]
+            if not state["pending"]:
+                loop.remove_writer(master)
+
+        def on_readable():
+            try:
+                data = os.read(master, 4096)
+            except (BlockingIOError, OSError):
+                return
+            state["buffer"] += data
+            *lines, state["buffer"] = state["buffer"].replace(b"\n", b"").split(b"\r")
+            if lines:
+                idle = not state["pending"]
+                state["pending"] += "".join(session.handle(line.decode("ascii", "replace")) for line in lines).encode()
+                if idle:
+                    loop.add_writer(master, on_writable)
+
+        loop.add_reader(master, on_readable)
+        self._ptys.append((master, slave))  # keep the slave open so the master never sees EOF
+        return os.ttyname(slave)
@@ -0,0 +1,384 @@
+"""Qt-free OBD-II simulation engine shared by the GUI and the headless CLI"""
+import hashlib
+import operator
+import random
+
+from catalog import CATALOG
+from cycles import load_cycle
+from faults import COMPILED_EFFECTS, fault_intensity
+from scheduler import now_ms
+from schema import SIGNALS, SIGNAL_NAMES, Signal
+
+# Fault code -> possible situations, loaded from fault_catalog.json (see catalog.py)
+Faults = CATALOG.faults
+
+DrivingScenarios = {
+    "City Road": {"speed_range": (0, 60), "rpm_range": (600, 3000)},
+    "Highway": {"speed_range": (60, 120), "rpm_range": (2000, 4000)},
+    "Off-Road": {"speed_range": (0, 40), "rpm_range": (1000, 3500)},
+}
+
+
+# CSV export layout (matches obd-II_data.csv)
+CSV_COLUMNS = [
+    "Timestamp", "Engine RPM", "Coolant Temp (°C)", "Fuel Pressure (kPa)", "O2 Sensor Voltage (V)",
+    "Catalyst Temp (°C)", "EGR Flow (%)", "Short Term Fuel Trim (%)", "Long Term Fuel Trim (%)",
+    "Evap System Vapor Pressure (kPa)", "Transmission Temp (°C)", "Fuel Level (%)", "Ambient Air Temp (°C)",
+    "Oil Pressure (psi)", "Brake Pedal Position (%)", "Steering Angle (°)", "Tire Pressure (psi)",
+    "Alternator Output (V)", "Fuel Injector Pulse Width (ms)", "Knock Sensor Voltage (V)", "Wheel Speed (km/h)",
+    "Clutch Pedal Position (%)", "Exhaust Gas Temp (°C)", "Road Conditions", "Weather", "Traffic Conditions",
+    "Vehicle Load", "Time Since Last Maintenance (days)", "Coolant Temp Rate of Change (°C/min)",
+    "Fuel Trim Stability", "Battery Health Indicator", "Transmission Temp Anomaly Score",
+    "Excessive Engine Load Detection", "Fault Code", "Fault Description", "Severity Level", "Recommended Fix"
+]
+
+# Realistic (min, max) ranges enforced after every tick
+CLAMP_BOUNDS = {spec.name: (spec.low, spec.high) for spec in SIGNALS if spec.clamp}
+
+
+def generate_initial_data():
+    """Generate initial sensor data with realistic base values"""
+    return {
+        "Engine RPM": 700,  # Idle RPM
+        "Coolant Temp (°C)": 90,  # Normal operating temperature
+        "Fuel Pressure (kPa)": 3000,  # Typical fuel pressure
+        "O2 Sensor Voltage (V)": 0.45,  # Ideal O2 sensor voltage
+        "Catalyst Temp (°C)": 500,  # Normal catalyst temperature
+        "EGR Flow (%)": 10,  # Moderate EGR flow
+        "Short Term Fuel Trim (%)": 0,  # Ideal fuel trim
+        "Long Term Fuel Trim (%)": 0,  # Ideal fuel trim
+        "Evap System Vapor Pressure (kPa)": -0.5,  # Slight vacuum
+        "Transmission Temp (°C)": 85,  # Normal transmission temperature
+        "Fuel Level (%)": 80,  # Partially full fuel tank
+        "Ambient Air Temp (°C)": 25,  # Moderate ambient temperature
+        "Oil Pressure (psi)": 40,  # Healthy oil pressure
+        "Brake Pedal Position (%)": 0,  # Brake pedal released
+        "Steering Angle (°)": 0,  # Straight steering
+        "Tire Pressure (psi)": 32,  # Normal tire pressure
+        "Alternator Output (V)": 14.0,  # Ideal alternator output
+        "Fuel Injector Pulse Width (ms)": 3,  # Normal injector pulse width
+        "Knock Sensor Voltage (V)": 0.2,  # Low knock sensor voltage
+        "Wheel Speed (km/h)": 0,  # Stationary
+        "Clutch Pedal Position (%)": 0,  # Clutch pedal released
+        "Exhaust Gas Temp (°C)": 400,  # Normal exhaust temperature
+        "Battery Voltage (V)": 12.5,  # Normal battery voltage
+        "Electrical Load (A)": 20,  # Normal electrical load
+        "Fault Code": "No Faults Detected"
+    }
+
+
+_get_signals = operator.itemgetter(*SIGNAL_NAMES)
+
+# Field order of the compact log rows produced by SimulationEngine.row
+ROW_FIELDS = ["Timestamp", *SIGNAL_NAMES, "Fault Code", "Fault Description"]
+
+UNIFORM_STD = 12 ** -0.5  # Standard deviation of a uniform draw, per unit of range
+
+# Ticks between RNG reseeds and state checkpoints; replaying any slice re-simulates at most one block
+SEED_BLOCK_TICKS = 3600
+
+# Engine inputs recorded in the run manifest whenever they change
+CONTROL_FIELDS = (
+    "selected_fault", "selected_situation", "selected_scenario", "car_on", "ac_on", "brake_applied", "speed", "dt",
+    "active_faults", "drive_cycle", "cycle_start_s", "ambient_temp",
+)
+_get_controls = operator.attrgetter(*CONTROL_FIELDS)
+
+
+def derive_seed(seed, *keys):
+    """Independent 63-bit seed for a sub-stream (run, vehicle, tick block, ...) of a parent seed"""
+    text = ":".join(str(part) for part in (seed, *keys))
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "big") >> 1
+
+
+class SimulationEngine:
+    """Single-vehicle signal generator driven by plain attributes instead of widgets.
+
+    All randomness comes from generators owned by the engine and reseeded
+    from (seed, block) every block_ticks ticks, when the state is also
+    checkpointed.  Together with the control timeline this makes any slice of
+    a run reproducible from manifest() without re-simulating from tick 0.
+    Both grow with the run, so live engines that never write a manifest
+    pass record=False to keep neither.
+    """
+
+    def __init__(self, fault="No Faults Detected", situation=None, scenario="City Road", physics=False, dt=1.0,
+                 seed=None, block_ticks=SEED_BLOCK_TICKS, noise=None, record=True):
+        self.seed = seed if seed is not None else random.SystemRandom().getrandbits(63)
+        self.block_ticks = block_ticks
+        self.record = record
+        self.rng = random.Random(self.seed)
+        self.tick = 0
+        self.timeline = []  # control snapshots, one per change
+        self.checkpoints = []  # engine state at the start of every block
+        self._last_controls = None
+        self.sensor_data = generate_initial_data()
+        self.selected_fault = fault
+        self.selected_situation = situation if situation is not None else Faults[fault][0]
+        self.selected_scenario = scenario
+        self.car_on = False
+        self.ac_on = False
+        self.brake_applied = False
+        self.speed = 0
+        self.dt = dt
+        self.active_faults = ()  # extra (code, onset_s, ramp_s) faults on top of selected_fault
+        self.ambient_temp = None  # °C; None leaves the ambient temperature as it is
+        self._cycle = None
+        self.cycle_start_s = 0.0
+        self.elapsed_s = 0.0  # simulated seconds, counting the current tick
+        self._pre_fault = {}  # signal values from before this tick's fault effects and sensor noise
+        self.model = None
+        if physics:
+            # Stateful drivetrain/thermal model instead of independent random draws
+            from vehicle import VehicleModel
+            self.model = VehicleModel(1, dt)
+        self.noise_profile = noise
+        self.noise = None
+        if noise is not None:
+            # Correlated OU sensor noise (noise.py) instead of independent uniform draws
+            from noise import NoiseModel, NoiseProfile
+            self.noise = NoiseModel(NoiseProfile.load(noise))
+
+    @property
+    def drive_cycle(self):
+        """Name of the cycles.py script driving the controls, or None for manual control"""
+        return self._cycle.name if self._cycle is not None else None
+
+    @drive_cycle.setter
+    def drive_cycle(self, name):
+        # Starting a cycle (again) plays it from its beginning
+        self._cycle = load_cycle(name) if name is not None else None
+        self.cycle_start_s = self.elapsed_s
+
+    def step(self):
+        """Advance the simulation by one tick and return the updated sensor data"""
+        if self.tick % self.block_ticks == 0:
+            self._begin_block()
+        controls = _get_controls(self)
+        if controls != self._last_controls:
+            if self.record:
+                self.timeline.append({"tick": self.tick, **dict(zip(CONTROL_FIELDS, controls))})
+            self._last_controls = controls
+        if self._cycle is not None:
+            self._cycle.compile(self.dt).apply(self, self.elapsed_s - self.cycle_start_s)
+            # Inputs the cycle sets are re-derived from it on replay, so they are not recorded
+            self._last_controls = _get_controls(self)
+        self.tick += 1
+        self.elapsed_s += self.dt
+
+        # Fault effects are applied to fault-free values, so they never accumulate or outlive the fault
+        self.sensor_data.update(self._pre_fault)
+        self._pre_fault.clear()
+        if self.noise is not None:
+            self.noise.next(self.dt)
+        self.sensor_data["Fault Code"] = self.selected_fault
+        if self.ambient_temp is not None:
+            self.sensor_data["Ambient Air Temp (°C)"] = self.ambient_temp
+
+        if self.model is not None:
+            return self._step_physics()
+
+        # Apply driving scenario effects
+        scenario = DrivingScenarios.get(self.selected_scenario)
+        if scenario is not None:
+            self.sensor_data["Engine RPM"] = self._randint(*scenario["rpm_range"], Signal.ENGINE_RPM)
+            self.sensor_data["Wheel Speed (km/h)"] = self._randint(*scenario["speed_range"], Signal.WHEEL_SPEED)
+
+        # Apply car state adjustments
+        if self.car_on:
+            # Car is on: simulate normal operation
+            self.sensor_data["Engine RPM"] = max(600, min(5000, self.sensor_data["Engine RPM"]))
+            self.sensor_data["Wheel Speed (km/h)"] = self.speed
+            self.sensor_data["Fuel Pressure (kPa)"] = self._randint(2000, 4000, Signal.FUEL_PRESSURE)
+            self.sensor_data["O2 Sensor Voltage (V)"] = self._o2_voltage()
+
+            # Simulate electrical and voltage levels
+            self.sensor_data["Battery Voltage (V)"] = round(self._uniform(12.5, 14.5, Signal.BATTERY_VOLTAGE), 2)
+            self.sensor_data["Alternator Output (V)"] = round(self._uniform(13.5, 14.5, Signal.ALTERNATOR_OUTPUT), 2)
+            self.sensor_data["Electrical Load (A)"] = self._randint(20, 50, Signal.ELECTRICAL_LOAD)  # Normal load
+        else:
+            # Car is off: set engine RPM, wheel speed, and fuel pressure to zero
+            self.sensor_data["Engine RPM"] = 0
+            self.sensor_data["Wheel Speed (km/h)"] = 0
+            self.sensor_data["Fuel Pressure (kPa)"] = 0
+
+            # Simulate electrical and voltage levels when car is off
+            self.sensor_data["Battery Voltage (V)"] = round(self._uniform(12.0, 12.5, Signal.BATTERY_VOLTAGE), 2)
+            self.sensor_data["Alternator Output (V)"] = 0  # Alternator not running
+            self.sensor_data["Electrical Load (A)"] = 0  # No electrical load
+
+        # Apply AC state adjustments
+        if self.ac_on:
+            self.sensor_data["Alternator Output (V)"] = max(13, min(15, self.sensor_data["Alternator Output (V)"]))
+            self.sensor_data["Electrical Load (A)"] += 10  # Increased load due to AC
+        else:
+            self.sensor_data["Alternator Output (V)"] = self._uniform(12.5, 13.5, Signal.ALTERNATOR_OUTPUT)
+
+        # Apply brake state adjustments
+        if self.brake_applied:
+            self.sensor_data["Brake Pedal Position (%)"] = 100
+        else:
+            self.sensor_data["Brake Pedal Position (%)"] = 0
+
+        self._apply_fault_effects()
+        self._apply_noise()
+        self._clamp()
+        return self.sensor_data
+
+    def _uniform(self, low, high, signal):
+        """Uniform draw, or the signal's OU process spread over the same range under a noise model"""
+        if self.noise is None:
+            return self.rng.uniform(low, high)
+        # Same standard deviation as the uniform draw, but autocorrelated and correlated across signals
+        value = (low + high) / 2 + (high - low) * UNIFORM_STD * self.noise.value(signal)
+        return max(low, min(high, value))
+
+    def _randint(self, low, high, signal):
+        if self.noise is None:
+            return self.rng.randint(low, high)
+        return round(self._uniform(low, high, signal))
+
+    def _o2_voltage(self):
+        if self.noise is None:
+            return round(self.rng.uniform(0.1, 0.9), 2)
+        return self.noise.o2_voltage(self.dt)
+
+    def _apply_noise(self):
+        """Measurement noise and quantization on top of this tick's values (restored next tick)"""
+        if self.noise is not None:
+            self.noise.apply(self.sensor_data, self._pre_fault)
+
+    def controls(self):
+        """Current engine inputs as a CONTROL_FIELDS dict"""
+        return dict(zip(CONTROL_FIELDS, _get_controls(self)))
+
+    def apply_controls(self, controls):
+        """Set engine inputs from a controls() dict or timeline entry"""
+        for name in CONTROL_FIELDS:
+            if name in controls:  # Manifests written before a field existed keep its default
+                setattr(self, name, controls[name])
+
+    def _begin_block(self):
+        """Checkpoint the state and reseed every generator for the block starting at this tick"""
+        if self.record and (not self.checkpoints or self.checkpoints[-1]["tick"] < self.tick):
+            self.checkpoints.append(self.checkpoint())
+        block_seed = derive_seed(self.seed, self.tick // self.block_ticks)
+        self.rng.seed(block_seed)
+        if self.model is not None:
+            self.model.reseed(block_seed)
+        if self.noise is not None:
+            self.noise.reseed(derive_seed(block_seed, "noise"))
+
+    def checkpoint(self):
+        """JSON-serializable snapshot of everything a tick depends on besides controls and RNG"""
+        return {
+            "tick": self.tick,
+            "sensor_data": dict(self.sensor_data),
+            "elapsed_s": self.elapsed_s,
+            "pre_fault": dict(self._pre_fault),
+            "model": self.model.state() if self.model is not None else None,
+            "noise": self.noise.state() if self.noise is not None else None,
+        }
+
+    def restore(self, checkpoint):
+        """Resume from a block-start checkpoint taken by the same seed"""
+        self.tick = checkpoint["tick"]
+        self.sensor_data.clear()
+        self.sensor_data.update(checkpoint["sensor_data"])
+        self.elapsed_s = checkpoint["elapsed_s"]
+        self._pre_fault = dict(checkpoint["pre_fault"])
+        if self.model is not None:
+            self.model.load_state(checkpoint["model"])
+        if self.noise is not None:
+            self.noise.load_state(checkpoint["noise"])
+        self.checkpoints = [checkpoint]
+        self._last_controls = None
+
+    def manifest(self):
+        """Seed, control timeline and checkpoints needed to replay this run"""
+        if not self.record:
+            raise RuntimeError("This engine was created with record=False and cannot be replayed")
+        return {
+            "seed": self.seed,
+            "physics": self.model is not None,
+            "noise": self.noise_profile,
+            "block_ticks": self.block_ticks,
+            "ticks": self.tick,
+            "timeline": self.timeline,
+            "checkpoints": self.checkpoints,
+        }
+
+    def _apply_fault_effects(self):
+        """Apply the compiled effects of the selected fault and of every active fault past its onset"""
+        self._apply_effects(self.selected_fault, 1.0)
+        for code, onset_s, ramp_s in self._scheduled_faults():
+            intensity = fault_intensity(self.elapsed_s, onset_s, ramp_s)
+            if intensity > 0:
+                self._apply_effects(code, intensity)
+
+    def _apply_effects(self, code, intensity):
+        data, saved = self.sensor_data, self._pre_fault
+        for apply in COMPILED_EFFECTS.get(code, ()):
+            if apply.signal not in saved:
+                saved[apply.signal] = data[apply.signal]
+            apply(data, self.rng, intensity, self.car_on)
+
+    def present_faults(self):
+        """Codes of the selected fault and every active fault past its onset (the stored DTCs)"""
+        scheduled = self._scheduled_faults()
+        return [self.selected_fault] + [code for code, onset_s, _ in scheduled if self.elapsed_s >= onset_s]
+
+    def _scheduled_faults(self):
+        """active_faults plus the drive cycle's faults, with onsets in engine time"""
+        if self._cycle is None or not self._cycle.faults:
+            return self.active_faults
+        start = self.cycle_start_s
+        return (*self.active_faults, *((code, start + onset_s, ramp_s) for code, onset_s, ramp_s in self._cycle.faults))
+
+    def _clamp(self):
+        """Ensure values stay within realistic ranges"""
+        for key, (low, high) in CLAMP_BOUNDS.items():
+            self.sensor_data[key] = max(low, min(high, self.sensor_data[key]))
+
+    def _step_physics(self):
+        """Physics-model tick: modeled signals first, then fault effects on top"""
+        model = self.model
+        model.dt = self.dt
+        model.target_speed[0] = self.speed
+        model.car_on[0] = self.car_on
+        model.ac_on[0] = self.ac_on
+        model.brake_applied[0] = self.brake_applied
+        if self.ambient_temp is not None:
+            model.ambient[0] = self.ambient_temp
+        model.set_scenario(self.selected_scenario)
+        model.step()
+        for name, value in zip(model.modeled_signals, model.modeled_row()):
+            self.sensor_data[name] = value
+        if self.car_on:
+            self.sensor_data["O2 Sensor Voltage (V)"] = self._o2_voltage()
+
+        self._apply_fault_effects()
+        self.sensor_data["Brake Pedal Position (%)"] = 100 if self.brake_applied else 0
+        self._apply_noise()
+        self._clamp()
+        return self.sensor_data
+
+    def row(self, timestamp_ms=None):
+        """Snapshot the current sensor data as a ROW_FIELDS tuple with an epoch-ms timestamp"""
+        if timestamp_ms is None:
+            timestamp_ms = now_ms()
+        return (timestamp_ms, *_get_signals(self.sensor_data), self.selected_fault, self.selected_situation)
+
+    def run(self, n_steps, clock=None):
+        """Yield n_steps ROW_FIELDS rows, stepping as fast as the CPU allows.
+
+        With a scheduler.SimClock the rows carry simulated timestamps instead of
+        wall-clock time.
+        """
+        for _ in range(n_steps):
+            self.step()
+            if clock is None:
+                yield self.row()
+            else:
+                yield self.row(clock.now_ms)
+                clock.advance()
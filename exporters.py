@@ -0,0 +1,564 @@
+"""Pluggable export writers: CSV, rotating compressed CSV shards, Parquet (pyarrow) and NumPy .npy/.npz.
+
+Every writer consumes blocks of ROW_FIELDS tuples through write_rows(rows),
+converts them column-wise without building per-row dicts, and exposes
+flush()/close() so it can sit behind sinks.StreamingSink.  The columnar
+writers also take the sink's packed schema.FrameBlock blocks directly
+through write_frames(block), and dictionary-encode fault code and fault
+description.
+"""
+import csv
+import gzip
+import json
+import os
+import shutil
+import struct
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from engine import CSV_COLUMNS, ROW_FIELDS, SIGNAL_NAMES
+from features import FEATURE_COLUMNS, FeatureState
+from scheduler import format_timestamp, parse_timestamp
+
+try:
+    import numpy as np
+except ImportError:  # CSV export works without NumPy
+    np = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet is optional
+    pa = pq = None
+
+try:
+    import zstandard
+except ImportError:  # sharded logs fall back to gzip
+    zstandard = None
+
+N_SIGNALS = len(SIGNAL_NAMES)
+
+# Sharded CSV logs: rotation limits, compression and the manifest listing finished shards
+SHARD_MANIFEST = "shards.json"
+SHARD_VERSION = 1
+DEFAULT_SHARD_BYTES = 64 << 20  # uncompressed
+DEFAULT_SHARD_SECONDS = 3600
+SHARD_SUFFIXES = {"zstd": ".zst", "gzip": ".gz", "none": ""}
+GZIP_LEVEL = 6
+COPY_CHUNK = 1 << 20
+
+
+class CSVWriter:
+    """Append rows to a CSV file laid out like obd-II_data.csv, filling the derived feature columns as it goes.
+
+    truncate=True starts the file over instead of appending to it.  durable=True
+    fsyncs on every flush, so an OS crash or power cut loses at most one flush
+    interval; otherwise a flush only hands the rows to the OS.
+    """
+
+    def __init__(self, path, truncate=False, durable=False):
+        self.path = path
+        self.durable = durable
+        file_exists = not truncate and os.path.isfile(path) and os.path.getsize(path) > 0
+        self.file = open(path, mode="w" if truncate else "a", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file)
+        self.features = FeatureState()
+        # Position of every CSV column inside a row tuple extended by its features (None for placeholder columns)
+        fields = ROW_FIELDS + FEATURE_COLUMNS
+        self.positions = [fields.index(name) if name in fields else None for name in CSV_COLUMNS]
+        if not file_exists:
+            self.writer.writerow(CSV_COLUMNS)
+
+    def write_rows(self, rows):
+        positions = self.positions
+        update = self.features.update
+        lines = []
+        for row in rows:
+            row = (*row, *update(row))
+            line = ["" if i is None else row[i] for i in positions]
+            if not isinstance(line[0], str):  # epoch-ms timestamp from the simulated clock
+                line[0] = format_timestamp(line[0])
+            lines.append(line)
+        self.writer.writerows(lines)
+
+    def flush(self):
+        self.file.flush()
+        if self.durable:
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+
+class _TimestampConverter:
+    """Convert log timestamps (epoch ms or 'YYYY-MM-DD HH:MM:SS[.mmm]' strings) to int64 epoch ms"""
+
+    def __init__(self):
+        self.last_text = None
+        self.last_ms = 0
+
+    def __call__(self, value):
+        if not isinstance(value, str):
+            return int(value)
+        if value != self.last_text:  # consecutive rows usually share a second
+            self.last_text = value
+            self.last_ms = parse_timestamp(value)
+        return self.last_ms
+
+
+class _Dictionary:
+    """Incremental string -> int32 code dictionary"""
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def encode(self, items):
+        codes = self.codes
+        out = np.empty(len(items), dtype=np.int32)
+        for i, item in enumerate(items):
+            code = codes.get(item)
+            if code is None:
+                code = codes[item] = len(self.values)
+                self.values.append(item)
+            out[i] = code
+        return out
+
+
+def _split_columns(rows, to_ms):
+    """Transpose a block of ROW_FIELDS tuples into typed NumPy columns"""
+    columns = list(zip(*rows))
+    timestamps = np.fromiter((to_ms(value) for value in columns[0]), dtype=np.int64, count=len(rows))
+    signals = np.array(columns[1:1 + N_SIGNALS], dtype=np.float32).T.copy()
+    return timestamps, signals, columns[-2], columns[-1]
+
+
+def _frame_labels(indices, labels):
+    """Remap a column of schema.Labels indices to (int32 codes, values) over the labels it uses"""
+    used, codes = np.unique(indices, return_inverse=True)
+    return codes.astype(np.int32), [labels[index] for index in used.tolist()]
+
+
+class NpyAppender:
+    """Append-only .npy file whose header is rewritten with the row count on flush (fsynced if durable)"""
+
+    HEADER_SIZE = 128  # fixed so the header can be rewritten in place; 64-byte aligned
+
+    def __init__(self, path, dtype, row_shape=(), durable=False):
+        self.path = path
+        self.durable = durable
+        self.dtype = np.dtype(dtype)
+        self.row_shape = tuple(row_shape)
+        self.rows = 0
+        self.file = open(path, "wb")
+        self._write_header()
+
+    def _write_header(self):
+        header = {
+            "descr": np.lib.format.dtype_to_descr(self.dtype),
+            "fortran_order": False,
+            "shape": (self.rows, *self.row_shape),
+        }
+        text = repr(header).ljust(self.HEADER_SIZE - 10 - 1) + "\n"
+        self.file.write(b"\x93NUMPY\x01\x00" + struct.pack("<H", len(text)) + text.encode("latin1"))
+
+    def append(self, array):
+        array = np.ascontiguousarray(array, dtype=self.dtype)
+        self.file.write(array.data)
+        self.rows += len(array)
+
+    def flush(self):
+        self.file.seek(0)
+        self._write_header()
+        self.file.seek(0, os.SEEK_END)
+        self.file.flush()
+        if self.durable:
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+class NpyWriter:
+    """Directory of memory-mappable .npy columns.
+
+    signals.npy is an (n, len(SIGNAL_NAMES)) float32 matrix, timestamp_ms.npy
+    holds int64 epoch milliseconds and fault_code.npy / fault_description.npy
+    hold int32 codes into the *_categories.npy dictionaries.  Headers are
+    rewritten on every flush, so the directory is readable after a crash;
+    durable=True also fsyncs them, to survive an OS crash or power cut.
+    """
+
+    def __init__(self, path, durable=False):
+        if np is None:
+            raise RuntimeError("NumPy is required for .npy export")
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.timestamps = NpyAppender(os.path.join(path, "timestamp_ms.npy"), np.int64, durable=durable)
+        self.signals = NpyAppender(os.path.join(path, "signals.npy"), np.float32, (N_SIGNALS,), durable=durable)
+        self.fault_codes = NpyAppender(os.path.join(path, "fault_code.npy"), np.int32, durable=durable)
+        self.descriptions = NpyAppender(os.path.join(path, "fault_description.npy"), np.int32, durable=durable)
+        self.fault_dictionary = _Dictionary()
+        self.description_dictionary = _Dictionary()
+        self.to_ms = _TimestampConverter()
+        self._save_array("signal_names.npy", np.array(SIGNAL_NAMES))
+
+    def _save_array(self, name, array):
+        """Atomically replace a small metadata array"""
+        target = os.path.join(self.path, name)
+        with open(target + ".tmp", "wb") as file:
+            np.save(file, array)
+        os.replace(target + ".tmp", target)
+
+    def save_extra(self, name, array):
+        """Store an extra array beside the columns as <name>.npy, e.g. derived tables"""
+        self._save_array(f"{name}.npy", array)
+
+    def write_rows(self, rows):
+        timestamps, signals, fault_codes, descriptions = _split_columns(rows, self.to_ms)
+        self.write_columns(timestamps, signals, fault_codes, descriptions)
+
+    def write_frames(self, block):
+        """Append a schema.FrameBlock straight from its packed columns"""
+        frames = block.frames()
+        self.timestamps.append(frames["timestamp_ms"])
+        self.signals.append(frames["signals"])
+        for appender, dictionary, field in (
+            (self.fault_codes, self.fault_dictionary, "fault_code"),
+            (self.descriptions, self.description_dictionary, "description"),
+        ):
+            codes, values = _frame_labels(frames[field], block.labels.values)
+            appender.append(dictionary.encode(values)[codes])
+
+    def write_columns(self, timestamps, signals, fault_codes, descriptions):
+        """Append pre-split columns (used directly by vectorized producers)"""
+        self.timestamps.append(timestamps)
+        self.signals.append(signals)
+        self.fault_codes.append(self.fault_dictionary.encode(fault_codes))
+        self.descriptions.append(self.description_dictionary.encode(descriptions))
+
+    def flush(self):
+        self._save_array("fault_code_categories.npy", np.array(self.fault_dictionary.values, dtype=str))
+        self._save_array("fault_description_categories.npy", np.array(self.description_dictionary.values, dtype=str))
+        for appender in (self.timestamps, self.signals, self.fault_codes, self.descriptions):
+            appender.flush()
+
+    def close(self):
+        self.flush()
+        for appender in (self.timestamps, self.signals, self.fault_codes, self.descriptions):
+            appender.close()
+
+
+class NpzWriter(NpyWriter):
+    """Stream .npy columns into a side directory and pack them into one .npz on close"""
+
+    def __init__(self, path):
+        self.archive_path = path
+        super().__init__(path + ".parts")
+
+    def close(self):
+        super().close()
+        with zipfile.ZipFile(self.archive_path + ".tmp", "w", zipfile.ZIP_STORED) as archive:
+            for name in sorted(os.listdir(self.path)):
+                archive.write(os.path.join(self.path, name), arcname=name)
+        os.replace(self.archive_path + ".tmp", self.archive_path)
+        shutil.rmtree(self.path)
+        self.path = self.archive_path
+
+
+class ParquetWriter:
+    """Typed Parquet export via pyarrow, one row group per row_group_rows rows.
+
+    Parquet only becomes readable once close() writes the footer, so flush()
+    does not cut a short row group; rows wait until a full group is pending
+    or the file is closed.  Use CSV or .npy for crash-tolerant streaming logs.
+    """
+
+    def __init__(self, path, row_group_rows=100_000):
+        if pa is None:
+            raise RuntimeError("pyarrow is required for Parquet export")
+        self.path = path
+        self.row_group_rows = row_group_rows
+        self.schema = pa.schema(
+            [pa.field("Timestamp", pa.timestamp("ms"))]
+            + [pa.field(name, pa.float32()) for name in SIGNAL_NAMES]
+            + [
+                pa.field("Fault Code", pa.dictionary(pa.int32(), pa.string())),
+                pa.field("Fault Description", pa.dictionary(pa.int32(), pa.string())),
+            ]
+        )
+        self.writer = pq.ParquetWriter(path, self.schema)
+        self.to_ms = _TimestampConverter()
+        self._pending = []
+        self._pending_rows = 0
+
+    def write_rows(self, rows):
+        columns = list(zip(*rows))
+        arrays = [pa.array([self.to_ms(value) for value in columns[0]], type=pa.timestamp("ms"))]
+        arrays += [pa.array(column, type=pa.float32()) for column in columns[1:1 + N_SIGNALS]]
+        arrays += [pa.array(column, type=pa.string()).dictionary_encode() for column in columns[-2:]]
+        self._append(pa.record_batch(arrays, schema=self.schema))
+
+    def write_frames(self, block):
+        """Append a schema.FrameBlock straight from its packed columns"""
+        frames = block.frames()
+        signals = frames["signals"]
+        arrays = [pa.array(frames["timestamp_ms"], type=pa.timestamp("ms"))]
+        arrays += [pa.array(signals[:, index]) for index in range(N_SIGNALS)]
+        for field in ("fault_code", "description"):
+            codes, values = _frame_labels(frames[field], block.labels.values)
+            arrays.append(pa.DictionaryArray.from_arrays(codes, pa.array(values, type=pa.string())))
+        self._append(pa.record_batch(arrays, schema=self.schema))
+
+    def _append(self, batch):
+        self._pending.append(batch)
+        self._pending_rows += batch.num_rows
+        if self._pending_rows >= self.row_group_rows:
+            self._write_pending()
+
+    def _write_pending(self):
+        if self._pending:
+            self.writer.write_table(pa.Table.from_batches(self._pending, schema=self.schema))
+            self._pending = []
+            self._pending_rows = 0
+
+    def flush(self):
+        pass  # _append writes each full row group as soon as it is pending
+
+    def close(self):
+        self._write_pending()
+        self.writer.close()
+
+
+def default_compression():
+    """zstd when the zstandard package is installed, gzip otherwise"""
+    return "zstd" if zstandard is not None else "gzip"
+
+
+def _fsync_dir(path):
+    """Make a rename inside path durable (a no-op where directories cannot be opened)"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _replace_json(path, value):
+    """Write a JSON file through a temp file and an atomic rename"""
+    with open(path + ".tmp", "w", encoding="utf-8") as file:
+        json.dump(value, file, indent=1)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(path + ".tmp", path)
+    _fsync_dir(os.path.dirname(path) or ".")
+
+
+def _compress(source, target, compression):
+    """Compress source into target through a temp file and an atomic rename"""
+    with open(source, "rb") as raw, open(target + ".tmp", "wb") as out:
+        if compression == "zstd":
+            zstandard.ZstdCompressor().copy_stream(raw, out)
+        elif compression == "gzip":
+            with gzip.GzipFile(fileobj=out, mode="wb", compresslevel=GZIP_LEVEL, mtime=0) as packed:
+                shutil.copyfileobj(raw, packed, COPY_CHUNK)
+        else:
+            shutil.copyfileobj(raw, out, COPY_CHUNK)
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(target + ".tmp", target)
+
+
+def _scan_part(path):
+    """Trim a torn trailing row off an unfinished shard and return (rows, start_ms, end_ms)"""
+    with open(path, "rb+") as file:
+        data = file.read()
+        end = data.rfind(b"\n") + 1
+        file.truncate(end)
+    lines = data[:end].decode("utf-8").splitlines()[1:]  # skip the header
+    timestamps = [parse_timestamp(record[0]) for record in csv.reader(lines) if record]
+    return len(timestamps), min(timestamps, default=None), max(timestamps, default=None)
+
+
+class ShardedWriter:
+    """Directory of CSV shards rotated by size or time and compressed on a background thread.
+
+    The open shard is a plain NNNNNN.csv.part file, fsynced on every flush.  A
+    finished shard is compressed (zstd, gzip or none) into a temp file that is
+    renamed into place, then listed in shards.json with its time range and
+    row count; the manifest is replaced atomically as well.  Size rotation
+    happens after the write that crosses max_bytes.  Time rotation cuts at
+    multiples of max_seconds of the row timestamps, so shards line up with
+    clock hours by default, and also whenever the timestamps jump back out of
+    the open shard's window (e.g. the next run of a generated dataset), so
+    every shard covers one contiguous time range.  Reopening a directory continues it: a .part
+    left by a crash has its torn last row trimmed and is finished like any
+    other shard, so readers only ever see whole shards.
+    """
+
+    def __init__(self, path, max_bytes=DEFAULT_SHARD_BYTES, max_seconds=DEFAULT_SHARD_SECONDS, compression=None):
+        compression = compression or default_compression()
+        if compression not in SHARD_SUFFIXES:
+            raise ValueError(f"Unknown shard compression: {compression}")
+        if compression == "zstd" and zstandard is None:
+            raise RuntimeError("zstd shards require zstandard: pip install zstandard")
+        self.path = path
+        self.max_bytes = max_bytes
+        self.period_ms = int(max_seconds * 1000) if max_seconds else None
+        self.compression = compression
+        os.makedirs(path, exist_ok=True)
+        self.manifest_path = os.path.join(path, SHARD_MANIFEST)
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, encoding="utf-8") as file:
+                self.manifest = json.load(file)
+            if self.manifest.get("version") != SHARD_VERSION:
+                raise ValueError(f"Unsupported shard manifest version: {self.manifest.get('version')}")
+        else:
+            self.manifest = {"version": SHARD_VERSION, "format": "csv", "shards": []}
+        self.features = FeatureState()  # one feature history across shard boundaries
+        self._lock = threading.Lock()
+        self._compressor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ShardCompressor")
+        self._jobs = []
+        self._writer = None
+        self._recover()
+
+    def _recover(self):
+        """Finish shards a crashed writer left behind and pick the next shard number"""
+        listed = {entry["file"] for entry in self.manifest["shards"]}
+        numbers = [int(name.partition(".")[0]) for name in listed]
+        for name in sorted(os.listdir(self.path)):
+            full = os.path.join(self.path, name)
+            if name.endswith(".tmp"):
+                os.remove(full)  # compression or manifest write that never got renamed
+            elif name.endswith(".csv.part"):
+                number = int(name.partition(".")[0])
+                numbers.append(number)
+                rows, start_ms, end_ms = _scan_part(full)
+                if not rows or any(entry.startswith(name[:-len(".part")]) for entry in listed):
+                    os.remove(full)  # empty, or already compressed and listed before the crash
+                else:
+                    self._submit(number, full, rows, start_ms, end_ms)
+        self._number = max(numbers, default=-1) + 1
+
+    def _open(self, first_ms):
+        self._part = os.path.join(self.path, f"{self._number:06d}.csv.part")
+        self._writer = CSVWriter(self._part, durable=True)
+        self._writer.features = self.features
+        self._rows = 0
+        self._start_ms = self._end_ms = first_ms
+        if self.period_ms:
+            self._window = (first_ms - first_ms % self.period_ms, first_ms - first_ms % self.period_ms + self.period_ms)
+
+    def write_rows(self, rows):
+        timestamps = [row[0] for row in rows]
+        start, n = 0, len(rows)
+        while start < n:
+            if self._writer is None:
+                self._open(timestamps[start])
+            stop = n
+            if self.period_ms:
+                low, high = self._window
+                if min(timestamps[start:]) < low or max(timestamps[start:]) >= high:
+                    # Cut at the first row outside the shard's time window, including jumps back in time
+                    stop = next(i for i in range(start, n) if not low <= timestamps[i] < high)
+            if stop > start:
+                self._writer.write_rows(rows[start:stop] if start or stop < n else rows)
+                self._rows += stop - start
+                self._start_ms = min(self._start_ms, min(timestamps[start:stop]))
+                self._end_ms = max(self._end_ms, max(timestamps[start:stop]))
+            if stop < n or self._writer.file.tell() >= self.max_bytes:
+                self._rotate()
+            start = stop
+
+    def _rotate(self):
+        """Close the open shard and hand it to the compressor thread"""
+        writer, self._writer = self._writer, None
+        writer.close()
+        if self._rows:
+            self._submit(self._number, self._part, self._rows, self._start_ms, self._end_ms)
+        else:
+            os.remove(self._part)
+        self._number += 1
+
+    def _submit(self, number, part, rows, start_ms, end_ms):
+        entry = {"file": f"{number:06d}.csv{SHARD_SUFFIXES[self.compression]}", "start_ms": start_ms,
+                 "end_ms": end_ms, "rows": rows, "bytes": os.path.getsize(part)}
+        self._jobs.append(self._compressor.submit(self._finish, part, entry))
+
+    def _finish(self, part, entry):
+        _compress(part, os.path.join(self.path, entry["file"]), self.compression)
+        with self._lock:
+            shards = self.manifest["shards"]
+            shards.append(entry)
+            shards.sort(key=lambda shard: shard["file"])
+            _replace_json(self.manifest_path, self.manifest)
+        os.remove(part)
+
+    def _check(self):
+        """Re-raise the first compression failure in the producer's thread"""
+        done = [job for job in self._jobs if job.done()]
+        self._jobs = [job for job in self._jobs if not job.done()]
+        for job in done:
+            job.result()
+
+    def flush(self):
+        if self._writer is not None:
+            self._writer.flush()
+        self._check()
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.flush()
+            self._rotate()
+        self._compressor.shutdown(wait=True)
+        self._check()
+
+
+EXPORTERS = {
+    "csv": CSVWriter,
+    "shards": ShardedWriter,
+    "parquet": ParquetWriter,
+    "npy": NpyWriter,
+    "npz": NpzWriter,
+}
+
+_EXTENSIONS = {
+    ".csv": "csv", ".shards": "shards", ".parquet": "parquet", ".pq": "parquet", ".npz": "npz", ".npy": "npy",
+}
+
+
+def columnar_format():
+    """Best available typed columnar format: Parquet if pyarrow is installed, .npy otherwise"""
+    return "parquet" if pa is not None else "npy"
+
+
+def infer_format(path):
+    """Pick an export format from the output path's extension"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in _EXTENSIONS:
+        return _EXTENSIONS[extension]
+    if os.path.isfile(os.path.join(path, SHARD_MANIFEST)):
+        return "shards"
+    if os.path.isdir(path):
+        return "npy"
+    raise ValueError(f"Cannot infer export format from {path!r}; pass one of {sorted(EXPORTERS)}")
+
+
+def open_exporter(path, format=None, **options):
+    """Create the writer for path, inferring the format from its extension when not given.
+
+    options go to the writer, e.g. max_bytes, max_seconds and compression for "shards".
+    """
+    if format == "columnar":
+        format = columnar_format()
+    format = format or infer_format(path)
+    if format not in EXPORTERS:
+        raise ValueError(f"Unknown export format: {format}")
+    return EXPORTERS[format](path, **options)
@@ -0,0 +1,162 @@
+"""Declarative fault-effect registry compiled once into per-signal effect functions.
+
+FAULT_EFFECTS maps each DTC to a list of effect specs.  A "set" effect
+replaces a signal with a draw from [low, high] and an "add" effect offsets
+it; decimals=None draws integers like random.randint, otherwise the draw is
+rounded to that many decimals.  running=True limits an effect to ticks where
+the engine is running.  Effects are blended by an intensity in [0, 1], so a
+fault can develop with an onset time and a linear ramp, and several faults
+can be active at once.  A lookup is a single dict access, so the per-tick
+cost depends only on the active faults, not on the catalog size.
+"""
+
+SET = "set"
+ADD = "add"
+
+
+def effect(signal, op, low, high, decimals=None, running=False):
+    """One declarative effect spec"""
+    if op not in (SET, ADD):
+        raise ValueError(f"Unknown fault effect op: {op}")
+    return {"signal": signal, "op": op, "low": low, "high": high, "decimals": decimals, "running": running}
+
+
+def _lean(o2_low, o2_high):
+    return [
+        effect("O2 Sensor Voltage (V)", SET, o2_low, o2_high, 2),
+        effect("Short Term Fuel Trim (%)", SET, 6, 10, 1, running=True),
+        effect("Long Term Fuel Trim (%)", SET, 3, 5, 1, running=True),
+    ]
+
+
+def _rich(o2_low, o2_high):
+    return [
+        effect("O2 Sensor Voltage (V)", SET, o2_low, o2_high, 2),
+        effect("Short Term Fuel Trim (%)", SET, -10, -6, 1, running=True),
+        effect("Long Term Fuel Trim (%)", SET, -5, -3, 1, running=True),
+    ]
+
+
+def _injector():
+    return [
+        effect("Short Term Fuel Trim (%)", SET, 4, 8, 1, running=True),
+        effect("Knock Sensor Voltage (V)", SET, 0.6, 1.2, 2, running=True),
+        effect("Engine RPM", ADD, -50, 50, running=True),
+    ]
+
+
+def _misfire(rpm_jitter):
+    return [
+        effect("Engine RPM", ADD, -rpm_jitter, rpm_jitter, running=True),
+        effect("Knock Sensor Voltage (V)", SET, 0.5, 1.0, 2, running=True),
+    ]
+
+
+def _catalyst():
+    # A worn catalyst stores no oxygen: the downstream O2 sensor switches like the upstream one, and it runs cooler
+    return [
+        effect("O2 Sensor Voltage (V)", SET, 0.1, 0.9, 2, running=True),
+        effect("Catalyst Temp (°C)", SET, 400, 450),
+    ]
+
+
+def _transmission(rpm_low, rpm_high, heat_low, heat_high):
+    return [
+        effect("Engine RPM", ADD, rpm_low, rpm_high, running=True),
+        effect("Transmission Temp (°C)", ADD, heat_low, heat_high, 1),
+    ]
+
+
+FAULT_EFFECTS = {
+    "P0217 - Engine Over Temperature": [effect("Coolant Temp (°C)", SET, 110, 120)],
+    "P0128 - Coolant Thermostat Malfunction": [effect("Coolant Temp (°C)", SET, 70, 80)],  # stuck open: runs cold
+    "P0087 - Fuel Rail/System Pressure Too Low": [effect("Fuel Pressure (kPa)", SET, 200, 500, running=True)],
+    "P0193 - Fuel Rail Pressure Sensor High Input": [effect("Fuel Pressure (kPa)", SET, 4500, 5000)],
+    "P0300 - Random/Multiple Cylinder Misfire Detected": _misfire(100),
+    "No Faults Detected": [],
+    "P0171 - System Too Lean (Bank 1)": _lean(0.1, 0.3),
+    "P0172 - System Too Rich (Bank 1)": _rich(0.7, 0.9),
+    # One O2 sensor and one set of trims stand in for both banks
+    "P0174 - System Too Lean (Bank 2)": _lean(0.1, 0.3),
+    "P0175 - System Too Rich (Bank 2)": _rich(0.7, 0.9),
+    "P0201 - Injector Circuit Malfunction (Cylinder 1)": _injector(),
+    "P0202 - Injector Circuit Malfunction (Cylinder 2)": _injector(),
+    "P0203 - Injector Circuit Malfunction (Cylinder 3)": _injector(),
+    "P0204 - Injector Circuit Malfunction (Cylinder 4)": _injector(),
+    "P0301 - Cylinder 1 Misfire Detected": _misfire(60),
+    "P0302 - Cylinder 2 Misfire Detected": _misfire(60),
+    "P0303 - Cylinder 3 Misfire Detected": _misfire(60),
+    "P0304 - Cylinder 4 Misfire Detected": _misfire(60),
+    "P0401 - Exhaust Gas Recirculation Flow Insufficient": [effect("EGR Flow (%)", SET, 0, 3, 1)],
+    "P0402 - Exhaust Gas Recirculation Flow Excessive": [
+        effect("EGR Flow (%)", SET, 15, 20, 1),
+        effect("Engine RPM", ADD, -80, 0, running=True),  # rough idle from too much dilution
+    ],
+    "P0420 - Catalyst System Efficiency Below Threshold (Bank 1)": _catalyst(),
+    "P0430 - Catalyst System Efficiency Below Threshold (Bank 2)": _catalyst(),
+    "P0442 - Evaporative Emission Control System Leak Detected (Small Leak)": [
+        effect("Evap System Vapor Pressure (kPa)", SET, -0.2, 0.2, 2),  # system cannot hold vacuum
+    ],
+    "P0446 - Evaporative Emission Control System Vent Control Circuit Malfunction": [
+        effect("Evap System Vapor Pressure (kPa)", SET, -5, -3, 2),  # vent stuck closed
+    ],
+    "P0507 - Idle Air Control System RPM Higher Than Expected": [effect("Engine RPM", ADD, 200, 400, running=True)],
+    "P0606 - ECM/PCM Processor Fault": [
+        effect("Short Term Fuel Trim (%)", ADD, -3, 3, 1, running=True),
+        effect("Fuel Injector Pulse Width (ms)", ADD, -0.5, 0.5, 2, running=True),
+    ],
+    "P0700 - Transmission Control System Malfunction": [effect("Transmission Temp (°C)", SET, 100, 110, 1)],
+    # Speed sensor faults break the RPM/wheel speed coupling the gearbox normally enforces
+    "P0715 - Input/Turbine Speed Sensor Circuit Malfunction": _transmission(-300, 300, 0, 2),
+    "P0720 - Output Speed Sensor Circuit Malfunction": [
+        effect("Wheel Speed (km/h)", ADD, -15, 0, running=True),
+        effect("Transmission Temp (°C)", ADD, 0, 2, 1),
+    ],
+    "P0741 - Torque Converter Clutch Circuit Performance or Stuck Off": _transmission(200, 400, 5, 10),
+    "P0750 - Shift Solenoid A Malfunction": _transmission(500, 900, 3, 8),  # held in a lower gear
+    "P0775 - Pressure Control Solenoid B Malfunction": _transmission(-150, 150, 5, 10),
+}
+
+
+def _compile(spec):
+    """Turn one effect spec into apply(data, rng, intensity, car_on)"""
+    name, low, high, decimals, running = spec["signal"], spec["low"], spec["high"], spec["decimals"], spec["running"]
+    additive = spec["op"] == ADD
+
+    def apply(data, rng, intensity, car_on):
+        if running and not car_on:
+            return
+        value = rng.randint(low, high) if decimals is None else round(rng.uniform(low, high), decimals)
+        if additive:
+            data[name] += value if intensity >= 1 else value * intensity
+        elif intensity >= 1:
+            data[name] = value
+        else:
+            data[name] += (value - data[name]) * intensity
+
+    apply.signal = name
+    return apply
+
+
+def compile_effects(table):
+    """Compile a code -> specs table into code -> tuple of effect functions"""
+    return {code: tuple(_compile(spec) for spec in specs) for code, specs in table.items()}
+
+
+COMPILED_EFFECTS = compile_effects(FAULT_EFFECTS)
+
+
+def fault_intensity(elapsed_s, onset_s=0.0, ramp_s=0.0):
+    """0 before onset, rising linearly to 1 over ramp_s seconds"""
+    if elapsed_s < onset_s:
+        return 0.0
+    if ramp_s <= 0:
+        return 1.0
+    return min(1.0, (elapsed_s - onset_s) / ramp_s)
+
+
+def parse_fault_spec(text):
+    """Parse 'CODE[@ONSET_S[+RAMP_S]]' into a (code, onset_s, ramp_s) active-fault entry"""
+    code, _, timing = text.partition("@")
+    onset, _, ramp = timing.partition("+")
+    return (code.strip(), float(onset or 0), float(ramp or 0))
@@ -0,0 +1,206 @@
+"""Derived ML features for the placeholder CSV columns, computed online or in one vectorized pass.
+
+Each numeric feature is a statistic over a rolling window of the last few
+samples, so FeatureState.update() costs O(1) per row (running sums over a
+ring buffer) and batch_features() is a handful of cumulative sums over whole
+columns.  Both give the same values.  The history restarts whenever the
+timestamps jump backwards or by more than MAX_GAP_MS, e.g. between the runs
+of one generated dataset.  Severity and recommended fix come from the fault
+catalog.  CSV logs do not record the battery voltage, so a batch pass over
+one sees the default 12.5 V instead of the value the online writer saw.
+
+  Coolant Temp Rate of Change (°C/min)  slope over COOLANT_RATE_WINDOW samples
+  Fuel Trim Stability                   1 minus the rolling std of total fuel trim over FUEL_TRIM_UNSTABLE_PCT,
+                                        floored at 0 (1 = steady)
+  Battery Health Indicator              rolling mean battery voltage between BATTERY_EMPTY_V and BATTERY_FULL_V, in %
+  Transmission Temp Anomaly Score       |z-score| of the transmission temperature against its rolling window
+  Excessive Engine Load Detection       1 when the rolling mean RPM or injector pulse width is above its limit
+"""
+import functools
+from collections import deque
+
+from catalog import CATALOG
+from schema import Signal
+
+try:
+    import numpy as np
+except ImportError:  # the online pipeline works without NumPy
+    np = None
+
+NUMERIC_FEATURES = [
+    "Coolant Temp Rate of Change (°C/min)", "Fuel Trim Stability", "Battery Health Indicator",
+    "Transmission Temp Anomaly Score", "Excessive Engine Load Detection",
+]
+FEATURE_COLUMNS = [*NUMERIC_FEATURES, "Severity Level", "Recommended Fix"]
+
+# Rolling window lengths, in samples
+COOLANT_RATE_WINDOW = 60
+FUEL_TRIM_WINDOW = 30
+BATTERY_WINDOW = 30
+TRANS_TEMP_WINDOW = 300
+LOAD_WINDOW = 10
+HISTORY = max(COOLANT_RATE_WINDOW + 1, FUEL_TRIM_WINDOW, BATTERY_WINDOW, TRANS_TEMP_WINDOW, LOAD_WINDOW)
+
+MAX_GAP_MS = 60_000  # A longer pause between samples starts a fresh history
+FUEL_TRIM_UNSTABLE_PCT = 5.0
+BATTERY_EMPTY_V, BATTERY_FULL_V = 11.8, 12.6
+TRANS_TEMP_MIN_STD = 0.5  # °C; keeps a perfectly flat history from turning noise into huge scores
+EXCESSIVE_RPM = 4000
+EXCESSIVE_INJECTOR_MS = 7.0
+DECIMALS = 3
+
+# Signal positions inside a ROW_FIELDS tuple (after the timestamp)
+_COOLANT = 1 + Signal.COOLANT_TEMP
+_STFT, _LTFT = 1 + Signal.SHORT_TERM_FUEL_TRIM, 1 + Signal.LONG_TERM_FUEL_TRIM
+_TRANS = 1 + Signal.TRANSMISSION_TEMP
+_RPM = 1 + Signal.ENGINE_RPM
+_INJECTOR = 1 + Signal.INJECTOR_PULSE_WIDTH
+_BATTERY = 1 + Signal.BATTERY_VOLTAGE
+_FAULT = -2
+
+
+@functools.lru_cache(maxsize=None)
+def fault_details(fault):
+    """(severity, recommended fix) of a fault from the catalog, empty strings when it has none"""
+    description = CATALOG.describe(fault)
+    return description.get("severity", ""), description.get("fix", "")
+
+
+class _Window:
+    """Running sum and sum of squares over the last size values"""
+
+    def __init__(self, size):
+        self.values = deque(maxlen=size)
+        self.total = 0.0
+        self.squares = 0.0
+
+    def push(self, value):
+        values = self.values
+        if len(values) == values.maxlen:
+            old = values[0]
+            self.total -= old
+            self.squares -= old * old
+        values.append(value)
+        self.total += value
+        self.squares += value * value
+
+    def mean(self):
+        return self.total / len(self.values)
+
+    def std(self):
+        n = len(self.values)
+        mean = self.total / n
+        return max(0.0, self.squares / n - mean * mean) ** 0.5
+
+
+class FeatureState:
+    """Online feature pipeline: feed ROW_FIELDS rows in time order, get FEATURE_COLUMNS values back"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.last_ms = None
+        self.coolant = deque(maxlen=COOLANT_RATE_WINDOW + 1)  # (timestamp_ms, °C)
+        self.fuel_trim = _Window(FUEL_TRIM_WINDOW)
+        self.battery = _Window(BATTERY_WINDOW)
+        self.trans_temp = _Window(TRANS_TEMP_WINDOW)
+        self.rpm = _Window(LOAD_WINDOW)
+        self.injector = _Window(LOAD_WINDOW)
+
+    def update(self, row):
+        timestamp_ms = row[0]
+        if self.last_ms is not None and not 0 <= timestamp_ms - self.last_ms <= MAX_GAP_MS:
+            self.reset()
+        self.last_ms = timestamp_ms
+        coolant = self.coolant
+        coolant.append((timestamp_ms, row[_COOLANT]))
+        first_ms, first_temp = coolant[0]
+        span_ms = timestamp_ms - first_ms
+        rate = (row[_COOLANT] - first_temp) * 60_000 / span_ms if span_ms else 0.0
+        self.fuel_trim.push(row[_STFT] + row[_LTFT])
+        self.battery.push(row[_BATTERY])
+        trans = self.trans_temp
+        trans.push(row[_TRANS])
+        trans_z = abs(row[_TRANS] - trans.mean()) / max(trans.std(), TRANS_TEMP_MIN_STD)
+        self.rpm.push(row[_RPM])
+        self.injector.push(row[_INJECTOR])
+        stability = max(0.0, 1.0 - self.fuel_trim.std() / FUEL_TRIM_UNSTABLE_PCT)
+        health = (self.battery.mean() - BATTERY_EMPTY_V) / (BATTERY_FULL_V - BATTERY_EMPTY_V) * 100
+        excessive = self.rpm.mean() > EXCESSIVE_RPM or self.injector.mean() > EXCESSIVE_INJECTOR_MS
+        return (
+            round(rate, DECIMALS), round(stability, DECIMALS), round(min(100.0, max(0.0, health)), DECIMALS),
+            round(trans_z, DECIMALS), int(excessive), *fault_details(row[_FAULT]),
+        )
+
+
+def _segment_starts(timestamps):
+    """Index of the first sample of the history each sample belongs to"""
+    steps = np.diff(timestamps)
+    breaks = np.flatnonzero((steps < 0) | (steps > MAX_GAP_MS)) + 1
+    starts = np.zeros(len(timestamps), dtype=np.int64)
+    starts[breaks] = breaks
+    return np.maximum.accumulate(starts)
+
+
+def _rolling(values, size, starts):
+    """Rolling mean and std over the last size values of each segment"""
+    offset = values[0] if len(values) else 0.0  # centre the sums so long columns keep their precision
+    centred = values - offset
+    sums = np.concatenate(([0.0], np.cumsum(centred)))
+    squares = np.concatenate(([0.0], np.cumsum(centred * centred)))
+    stop = np.arange(1, len(values) + 1)
+    begin = np.maximum(stop - size, starts)
+    n = stop - begin
+    mean = (sums[stop] - sums[begin]) / n
+    variance = np.maximum(0.0, (squares[stop] - squares[begin]) / n - mean * mean)
+    return mean + offset, np.sqrt(variance)
+
+
+def batch_features(timestamps, signals):
+    """(n, len(NUMERIC_FEATURES)) float64 features of a whole log in one vectorized pass.
+
+    timestamps are epoch ms and signals an (n, len(SIGNAL_NAMES)) array, e.g.
+    the columns of an .npy export.  Matches FeatureState.update() row by row.
+    """
+    if np is None:
+        raise RuntimeError("Batch feature computation requires NumPy: pip install numpy")
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    signals = np.asarray(signals, dtype=np.float64)
+    if not len(timestamps):
+        return np.empty((0, len(NUMERIC_FEATURES)))
+    starts = _segment_starts(timestamps)
+    index = np.arange(len(timestamps))
+    first = np.maximum(index - COOLANT_RATE_WINDOW, starts)
+    coolant = signals[:, Signal.COOLANT_TEMP]
+    span_ms = timestamps - timestamps[first]
+    rate = np.divide((coolant - coolant[first]) * 60_000, span_ms, out=np.zeros(len(index)), where=span_ms != 0)
+    trims = signals[:, Signal.SHORT_TERM_FUEL_TRIM] + signals[:, Signal.LONG_TERM_FUEL_TRIM]
+    _, trim_std = _rolling(trims, FUEL_TRIM_WINDOW, starts)
+    battery_mean, _ = _rolling(signals[:, Signal.BATTERY_VOLTAGE], BATTERY_WINDOW, starts)
+    trans = signals[:, Signal.TRANSMISSION_TEMP]
+    trans_mean, trans_std = _rolling(trans, TRANS_TEMP_WINDOW, starts)
+    trans_z = np.abs(trans - trans_mean) / np.maximum(trans_std, TRANS_TEMP_MIN_STD)
+    rpm_mean, _ = _rolling(signals[:, Signal.ENGINE_RPM], LOAD_WINDOW, starts)
+    injector_mean, _ = _rolling(signals[:, Signal.INJECTOR_PULSE_WIDTH], LOAD_WINDOW, starts)
+    stability = np.maximum(0.0, 1.0 - trim_std / FUEL_TRIM_UNSTABLE_PCT)
+    health = np.clip((battery_mean - BATTERY_EMPTY_V) / (BATTERY_FULL_V - BATTERY_EMPTY_V) * 100, 0.0, 100.0)
+    excessive = (rpm_mean > EXCESSIVE_RPM) | (injector_mean > EXCESSIVE_INJECTOR_MS)
+    features = np.column_stack((rate, stability, health, trans_z, excessive))
+    features[:, :4] = np.round(features[:, :4], DECIMALS)
+    return features
+
+
+class BatchFeatures:
+    """batch_features() over a log split into consecutive chunks, carrying HISTORY rows between calls"""
+
+    def __init__(self):
+        self.timestamps = np.empty(0, dtype=np.int64)
+        self.signals = np.empty((0, len(Signal)))
+
+    def __call__(self, timestamps, signals):
+        timestamps = np.concatenate((self.timestamps, np.asarray(timestamps, dtype=np.int64)))
+        signals = np.concatenate((self.signals, np.asarray(signals, dtype=np.float64)))
+        carried = len(self.timestamps)
+        self.timestamps, self.signals = timestamps[-HISTORY:], signals[-HISTORY:]
+        return batch_features(timestamps, signals)[carried:]
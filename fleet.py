@@ -0,0 +1,127 @@
+"""Multi-process fleet runner: shards vehicles across CPU cores with deterministic RNG streams.
+
+Every vehicle gets its own fault, scenario, AC state and cruise speed from
+the fleet seed.  Vehicles are split into contiguous shards; each shard runs
+in a worker process with a NumPy generator derived from
+SeedSequence(seed, spawn_key=(shard,)), so results depend only on the seed
+and shard layout, never on worker count or scheduling order.  Shards are written as memory-mappable .npy
+directories and can be merged into one ordered array afterwards.
+"""
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from batch import FAULT_NAMES, SCENARIO_NAMES, generate_batch
+from engine import DrivingScenarios, SIGNAL_NAMES
+from exporters import NpyAppender
+
+SHARD_VEHICLES = 1000  # default shard size; fixed so output never depends on the worker count
+SHARD_BYTES = 64 * 1024 * 1024  # upper bound for one in-memory vehicle chunk
+
+
+def fleet_config(n_vehicles, seed, ac_fraction=0.3, brake_fraction=0.0):
+    """Per-vehicle fault, scenario, AC/brake state and cruise speed, reproducible from seed"""
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(0xF1EE7,)))
+    fault = rng.integers(0, len(FAULT_NAMES), n_vehicles)
+    scenario = rng.integers(0, len(SCENARIO_NAMES), n_vehicles)
+    ranges = np.array([DrivingScenarios[name]["speed_range"] for name in SCENARIO_NAMES])
+    speed = np.floor(rng.uniform(ranges[scenario, 0], ranges[scenario, 1] + 1))
+    ac_on = rng.random(n_vehicles) < ac_fraction
+    brake_applied = rng.random(n_vehicles) < brake_fraction
+    return {"fault": fault, "scenario": scenario, "speed": speed, "ac_on": ac_on, "brake_applied": brake_applied}
+
+
+def shard_bounds(n_vehicles, n_shards):
+    """Contiguous [start, stop) vehicle ranges, one per shard"""
+    edges = np.linspace(0, n_vehicles, n_shards + 1).astype(int)
+    return [(int(a), int(b)) for a, b in zip(edges[:-1], edges[1:]) if b > a]
+
+
+def shard_path(output_dir, shard):
+    return os.path.join(output_dir, f"shard-{shard:05d}")
+
+
+def run_shard(shard, start, stop, n_vehicles, n_steps, seed, output_dir, physics=False, dt=1.0,
+              ac_fraction=0.3, brake_fraction=0.0):
+    """Worker entry point: simulate vehicles [start, stop) and write them to one shard directory"""
+    began = time.perf_counter()
+    config = fleet_config(n_vehicles, seed, ac_fraction, brake_fraction)  # cheap, and identical in every worker
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(shard,)))
+    path = shard_path(output_dir, shard)
+    os.makedirs(path, exist_ok=True)
+    for name in ("fault", "scenario", "speed", "ac_on", "brake_applied"):
+        np.save(os.path.join(path, f"{name}.npy"), config[name][start:stop])
+    np.save(os.path.join(path, "vehicle_id.npy"), np.arange(start, stop))
+
+    signals = NpyAppender(os.path.join(path, "signals.npy"), np.float32, (n_steps, len(SIGNAL_NAMES)))
+    chunk = max(1, SHARD_BYTES // (n_steps * len(SIGNAL_NAMES) * 4))
+    for first in range(start, stop, chunk):
+        last = min(stop, first + chunk)
+        data = generate_batch(
+            last - first, n_steps, faults=config["fault"][first:last], scenarios=config["scenario"][first:last],
+            car_on=True, ac_on=config["ac_on"][first:last], brake_applied=config["brake_applied"][first:last],
+            speed=None if physics else config["speed"][first:last], rng=rng, physics=physics, dt=dt,
+        )
+        signals.append(data)
+    signals.close()
+    return {"shard": shard, "vehicles": stop - start, "seconds": time.perf_counter() - began, "path": path}
+
+
+def run_fleet(n_vehicles, n_steps, output_dir, seed=0, workers=None, shards=None, physics=False, dt=1.0,
+              ac_fraction=0.3, brake_fraction=0.0):
+    """Simulate a fleet across a process pool and return a throughput report.
+
+    vehicle_hz is the capacity figure: vehicle-ticks produced per wall-clock
+    second, i.e. how many vehicles could be served at 1 Hz in real time.
+    """
+    workers = workers or os.cpu_count() or 1
+    shards = shards or -(-n_vehicles // SHARD_VEHICLES)
+    os.makedirs(output_dir, exist_ok=True)
+    bounds = shard_bounds(n_vehicles, shards)
+    began = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(run_shard, shard, start, stop, n_vehicles, n_steps, seed, output_dir, physics, dt,
+                        ac_fraction, brake_fraction)
+            for shard, (start, stop) in enumerate(bounds)
+        ]
+        results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - began
+
+    report = {
+        "vehicles": n_vehicles,
+        "steps": n_steps,
+        "dt": dt,
+        "seed": seed,
+        "physics": physics,
+        "ac_fraction": ac_fraction,
+        "brake_fraction": brake_fraction,
+        "workers": workers,
+        "shards": len(results),
+        "seconds": elapsed,
+        "vehicle_hz": n_vehicles * n_steps / elapsed,
+        "samples_per_second": n_vehicles * n_steps * len(SIGNAL_NAMES) / elapsed,
+        "signal_names": SIGNAL_NAMES,
+        "fault_names": FAULT_NAMES,
+        "scenario_names": SCENARIO_NAMES,
+        "shard_paths": [os.path.basename(result["path"]) for result in results],
+    }
+    with open(os.path.join(output_dir, "fleet.json"), "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    return report
+
+
+def merge_shards(output_dir, path):
+    """Concatenate shard directories in vehicle order into one memory-mappable .npy"""
+    with open(os.path.join(output_dir, "fleet.json"), encoding="utf-8") as file:
+        report = json.load(file)
+    merged = NpyAppender(path, np.float32, (report["steps"], len(report["signal_names"])))
+    for name in report["shard_paths"]:
+        shard = np.load(os.path.join(output_dir, name, "signals.npy"), mmap_mode="r")
+        for first in range(0, len(shard), 1024):
+            merged.append(shard[first:first + 1024])
+    merged.close()
+    return path
@@ -1,74 +1,95 @@
 from PyQt6.QtWidgets import (
-    QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QComboBox, QTextEdit, QSlider, QGroupBox, QScrollArea
+    QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QComboBox, QSlider, QGroupBox, QScrollArea,
+    QFileDialog, QLineEdit, QCompleter
 )
-from PyQt6.QtCore import QTimer, Qt
+from PyQt6.QtCore import QStringListModel, QTimer, Qt
 from PyQt6.QtGui import QFont
-import random
+import functools
 import sys
-import csv
-from datetime import datetime
-import os  # Import os module for file existence check
-
-# Sample Data
-Faults = {
-    # Existing Faults
-    "P0217 - Engine Over Temperature": ["Engine Overheating", "Coolant Leak", "Radiator Fan Failure"],
-    "P0128 - Coolant Thermostat Malfunction": ["Thermostat Stuck Open", "Engine Overheating"],
-    "P0087 - Fuel Rail/System Pressure Too Low": ["Low Fuel Pressure", "Fuel Pump Failure"],
-    "P0193 - Fuel Rail Pressure Sensor High Input": ["Fuel Pressure Sensor Fault"],
-    "P0300 - Random/Multiple Cylinder Misfire Detected": ["Random/Multiple Misfire", "Ignition Coil Failure"],
-    "No Faults Detected": ["Normal Driving"],
-
-    # New Faults (25 Additional Fault Codes)
-    "P0171 - System Too Lean (Bank 1)": ["Vacuum Leak", "Faulty Oxygen Sensor", "Fuel Injector Issue"],
-    "P0172 - System Too Rich (Bank 1)": ["Faulty Oxygen Sensor", "Fuel Pressure Regulator Issue", "Clogged Air Filter"],
-    "P0174 - System Too Lean (Bank 2)": ["Vacuum Leak", "Faulty Oxygen Sensor", "Fuel Injector Issue"],
-    "P0175 - System Too Rich (Bank 2)": ["Faulty Oxygen Sensor", "Fuel Pressure Regulator Issue", "Clogged Air Filter"],
-    "P0201 - Injector Circuit Malfunction (Cylinder 1)": ["Faulty Fuel Injector", "Wiring Issue"],
-    "P0202 - Injector Circuit Malfunction (Cylinder 2)": ["Faulty Fuel Injector", "Wiring Issue"],
-    "P0203 - Injector Circuit Malfunction (Cylinder 3)": ["Faulty Fuel Injector", "Wiring Issue"],
-    "P0204 - Injector Circuit Malfunction (Cylinder 4)": ["Faulty Fuel Injector", "Wiring Issue"],
-    "P0301 - Cylinder 1 Misfire Detected": ["Ignition Coil Failure", "Spark Plug Issue"],
-    "P0302 - Cylinder 2 Misfire Detected": ["Ignition Coil Failure", "Spark Plug Issue"],
-    "P0303 - Cylinder 3 Misfire Detected": ["Ignition Coil Failure", "Spark Plug Issue"],
-    "P0304 - Cylinder 4 Misfire Detected": ["Ignition Coil Failure", "Spark Plug Issue"],
-    "P0401 - Exhaust Gas Recirculation Flow Insufficient": ["Clogged EGR Valve", "Faulty EGR Sensor"],
-    "P0402 - Exhaust Gas Recirculation Flow Excessive": ["Stuck EGR Valve", "Faulty EGR Sensor"],
-    "P0420 - Catalyst System Efficiency Below Threshold (Bank 1)": ["Faulty Catalytic Converter", "Oxygen Sensor Issue"],
-    "P0430 - Catalyst System Efficiency Below Threshold (Bank 2)": ["Faulty Catalytic Converter", "Oxygen Sensor Issue"],
-    "P0442 - Evaporative Emission Control System Leak Detected (Small Leak)": ["Loose Gas Cap", "Leaking EVAP Hose"],
-    "P0446 - Evaporative Emission Control System Vent Control Circuit Malfunction": ["Faulty EVAP Vent Valve", "Wiring Issue"],
-    "P0507 - Idle Air Control System RPM Higher Than Expected": ["Dirty Throttle Body", "Faulty Idle Air Control Valve"],
-    "P0606 - ECM/PCM Processor Fault": ["Faulty Engine Control Module", "Software Glitch"],
-    "P0700 - Transmission Control System Malfunction": ["Faulty Transmission Control Module", "Wiring Issue"],
-    "P0715 - Input/Turbine Speed Sensor Circuit Malfunction": ["Faulty Speed Sensor", "Wiring Issue"],
-    "P0720 - Output Speed Sensor Circuit Malfunction": ["Faulty Speed Sensor", "Wiring Issue"],
-    "P0741 - Torque Converter Clutch Circuit Performance or Stuck Off": ["Faulty Torque Converter", "Transmission Fluid Issue"],
-    "P0750 - Shift Solenoid A Malfunction": ["Faulty Shift Solenoid", "Wiring Issue"],
-    "P0775 - Pressure Control Solenoid B Malfunction": ["Faulty Pressure Control Solenoid", "Wiring Issue"],
-}
-
-DrivingScenarios = {
-    "City Road": {"speed_range": (0, 60), "rpm_range": (600, 3000)},
-    "Highway": {"speed_range": (60, 120), "rpm_range": (2000, 4000)},
-    "Off-Road": {"speed_range": (0, 40), "rpm_range": (1000, 3500)},
-}
+import os
+import time
+from catalog import CATALOG
+from cycles import CYCLES
+from dashboard import Dashboard, StatsPanel
+from engine import Faults, DrivingScenarios, SimulationEngine
+from exporters import open_exporter
+from history import HistoryStore, serve as serve_history
+from metrics import Metrics, serve
+from noise import DEFAULT_PROFILE
+from playback import open_log
+from pubsub import TelemetryHub
+from scheduler import parse_timestamp
+from sinks import StreamingSink
+from worker import SimulationWorker
+
+# Streaming log settings; the format follows the extension (.csv, .shards, .parquet, .npz, .npy)
+LOG_PATH = os.environ.get("OBD_LOG_PATH", "session.csv")
+LOG_FLUSH_ROWS = 100  # Hand rows to the writer thread every K rows...
+LOG_FLUSH_INTERVAL = 5.0  # ...or every T seconds, whichever comes first
+LOG_MAX_ROWS = 100_000  # Memory cap; oldest unwritten rows are dropped beyond this
+
+# Set to serve Prometheus metrics on http://127.0.0.1:<port>/metrics and enable the stats panel
+METRICS_PORT = os.environ.get("OBD_METRICS_PORT")
+
+# Set either to publish the live rows as vehicle 0 to WebSocket / MQTT subscribers on 127.0.0.1
+STREAM_WS_PORT = os.environ.get("OBD_STREAM_WS_PORT")
+STREAM_MQTT_PORT = os.environ.get("OBD_STREAM_MQTT_PORT")
+
+# Set to serve the dashboard's signal history as JSON on http://127.0.0.1:<port>/history
+HISTORY_PORT = os.environ.get("OBD_HISTORY_PORT")
+
+# Sparkline time spans: the live sample buffers, or the rollups of the history store
+SPARKLINE_SPANS = {"Live": None, "10 min": 600, "1 h": 3600, "6 h": 6 * 3600, "24 h": 86400, "7 d": 7 * 86400}
+
+# Real-time update rates offered in the UI (simulated clock ticks per wall-clock second)
+UPDATE_RATES = {"0.2 Hz": 0.2, "1 Hz": 1.0, "10 Hz": 10.0, "50 Hz": 50.0, "100 Hz": 100.0, "1 kHz": 1000.0}
+DEFAULT_UPDATE_RATE = "0.2 Hz"  # Update every 5 seconds
+
+MANUAL_DRIVING = "Manual"  # Drive cycle entry for driving with the buttons and slider
+
+# Log playback: speed relative to the recorded timestamps ("Max" shows PLAYBACK_MAX_ROWS rows per refresh)
+PLAYBACK_SPEEDS = {"1x": 1.0, "10x": 10.0, "100x": 100.0, "Max": None}
+PLAYBACK_INTERVAL_MS = 50
+PLAYBACK_MAX_ROWS = 1000
+
+
 
 class OBDSimulator(QWidget):
     def __init__(self):
         super().__init__()
+        self.update_rate = UPDATE_RATES[DEFAULT_UPDATE_RATE]
+        # No registry, no instrumentation: the hot paths only check for None
+        self.metrics = None
+        if METRICS_PORT:
+            self.metrics = Metrics()
+            serve(self.metrics, int(METRICS_PORT))
+        self.history = HistoryStore()
+        if HISTORY_PORT:
+            serve_history(self.history, int(HISTORY_PORT))
+        publish = None
+        if STREAM_WS_PORT or STREAM_MQTT_PORT:
+            hub = TelemetryHub()
+            hub.start_in_thread(ws_port=int(STREAM_WS_PORT) if STREAM_WS_PORT else None,
+                                mqtt_port=int(STREAM_MQTT_PORT) if STREAM_MQTT_PORT else None)
+            publish = functools.partial(hub.publish, 0)
+        # The engine belongs to the worker thread from here on; controls reach it as posted commands
+        self.engine = SimulationEngine(physics=True, dt=1 / self.update_rate, noise=DEFAULT_PROFILE, record=False)
+        self.worker = SimulationWorker(
+            self.engine, self.update_rate, open_sink=self.open_log_sink, metrics=self.metrics, publish=publish,
+        )
         self.initUI()
-        self.sensor_data = self.generate_initial_data()
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update_sensor_data)
+        self.dashboard.add_source(self.update_sensor_data)
         self.is_running = False
         self.car_on = False
         self.ac_on = False
         self.brake_applied = False
         self.speed = 0
         self.selected_scenario = "City Road"
-        self.data_log = []  # To store collected data for saving
-        self.previous_coolant_temp = self.sensor_data["Coolant Temp (°C)"]  # For rate of change calculation
+        self.playback_timer = QTimer()
+        self.playback_timer.timeout.connect(self.update_playback)
+        self.playback_rows = None  # Row iterator of the log being replayed
+        self.playback_next = None
+        self.playback_origin = None  # (wall time, log timestamp) the pacing is anchored to
 
     def initUI(self):
         self.setWindowTitle("Dynamic OBD-II Simulator")
@@ -112,8 +133,17 @@ class OBDSimulator(QWidget):
         fault_layout = QHBoxLayout()
         fault_label = QLabel("Select Fault Code:")
         fault_label.setFont(QFont("Arial", 12))
+        # Editable combo over a list model: one bulk insert, typing filters by substring
         self.fault_select = QComboBox()
-        self.fault_select.addItems(Faults.keys())
+        self.fault_select.setEditable(True)
+        self.fault_select.setInsertPolicy(QComboBox.InsertPolicy.NoInsert)
+        self.fault_select.setModel(QStringListModel(list(Faults), self.fault_select))
+        fault_completer = QCompleter(self.fault_select.model(), self.fault_select)
+        fault_completer.setFilterMode(Qt.MatchFlag.MatchContains)
+        fault_completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        fault_completer.setCompletionMode(QCompleter.CompletionMode.PopupCompletion)
+        self.fault_select.setCompleter(fault_completer)
+        self.fault_rows = {name: row for row, name in enumerate(Faults)}
         self.fault_select.setFont(QFont("Arial", 12))
         self.fault_select.setStyleSheet("""
             QComboBox {
@@ -284,25 +314,142 @@ class OBDSimulator(QWidget):
         scenario_layout.addWidget(scenario_label)
         scenario_layout.addWidget(self.scenario_select)
 
+        rate_label = QLabel("Update Rate:")
+        rate_label.setFont(QFont("Arial", 12))
+        self.rate_select = QComboBox()
+        self.rate_select.addItems(UPDATE_RATES.keys())
+        self.rate_select.setCurrentText(DEFAULT_UPDATE_RATE)
+        self.rate_select.setFont(QFont("Arial", 12))
+        self.rate_select.setStyleSheet("""
+            QComboBox {
+                background-color: #4C566A;
+                color: #ECEFF4;
+                border: 1px solid #4C566A;
+                padding: 5px;
+                border-radius: 3px;
+            }
+        """)
+        self.rate_select.currentIndexChanged.connect(self.update_rate_changed)
+        scenario_layout.addWidget(rate_label)
+        scenario_layout.addWidget(self.rate_select)
+
+        cycle_label = QLabel("Drive Cycle:")
+        cycle_label.setFont(QFont("Arial", 12))
+        self.cycle_select = QComboBox()
+        self.cycle_select.addItems([MANUAL_DRIVING, *CYCLES])
+        self.cycle_select.setFont(QFont("Arial", 12))
+        self.cycle_select.setStyleSheet("""
+            QComboBox {
+                background-color: #4C566A;
+                color: #ECEFF4;
+                border: 1px solid #4C566A;
+                padding: 5px;
+                border-radius: 3px;
+            }
+        """)
+        self.cycle_select.currentIndexChanged.connect(self.update_drive_cycle)
+        scenario_layout.addWidget(cycle_label)
+        scenario_layout.addWidget(self.cycle_select)
+
         scenario_group.setLayout(scenario_layout)
         main_layout.addWidget(scenario_group)
 
-        # OBD Data Display
-        self.result_display = QTextEdit()
-        self.result_display.setReadOnly(True)
-        self.result_display.setFont(QFont("Arial", 12))
-        self.result_display.setStyleSheet("""
-            QTextEdit {
-                background-color: #3B4252;
+        # Log Playback Section
+        playback_group = QGroupBox("Log Playback")
+        playback_group.setFont(QFont("Arial", 14, QFont.Weight.Bold))
+        playback_group.setStyleSheet("""
+            QGroupBox {
+                border: 2px solid #4C566A;
+                border-radius: 5px;
+                margin-top: 10px;
+                padding-top: 15px;
+            }
+            QGroupBox::title {
+                color: #88C0D0;
+            }
+        """)
+        playback_layout = QHBoxLayout()
+
+        self.playback_speed = QComboBox()
+        self.playback_speed.addItems(PLAYBACK_SPEEDS.keys())
+        self.playback_speed.setFont(QFont("Arial", 12))
+        self.playback_speed.setStyleSheet("""
+            QComboBox {
+                background-color: #4C566A;
+                color: #ECEFF4;
+                border: 1px solid #4C566A;
+                padding: 5px;
+                border-radius: 3px;
+            }
+        """)
+        self.playback_speed.currentIndexChanged.connect(self.reset_playback_clock)
+        playback_layout.addWidget(self.playback_speed)
+
+        self.playback_start = QLineEdit()
+        self.playback_start.setPlaceholderText("Start at YYYY-MM-DD HH:MM:SS (optional)")
+        self.playback_start.setFont(QFont("Arial", 12))
+        self.playback_start.setStyleSheet("""
+            QLineEdit {
+                background-color: #4C566A;
                 color: #ECEFF4;
                 border: 1px solid #4C566A;
+                padding: 5px;
+                border-radius: 3px;
+            }
+        """)
+        playback_layout.addWidget(self.playback_start)
+
+        self.playback_button = QPushButton("Replay Log...")
+        self.playback_button.setFont(QFont("Arial", 12))
+        self.playback_button.setStyleSheet("""
+            QPushButton {
+                background-color: #5E81AC;
+                color: #ECEFF4;
+                border: none;
                 padding: 10px;
                 border-radius: 5px;
-                min-height: 300px;
+            }
+            QPushButton:hover {
+                background-color: #81A1C1;
             }
         """)
-        main_layout.addWidget(QLabel("OBD-II Data:"))
-        main_layout.addWidget(self.result_display)
+        self.playback_button.clicked.connect(self.toggle_playback)
+        playback_layout.addWidget(self.playback_button)
+
+        playback_group.setLayout(playback_layout)
+        main_layout.addWidget(playback_group)
+
+        # OBD Data Display: per-signal widgets repainted at the display refresh rate
+        self.dashboard = Dashboard(metrics=self.metrics, store=self.history)
+        self.dashboard.setStyleSheet("background-color: #3B4252; border-radius: 5px;")
+        data_header = QHBoxLayout()
+        data_header.addWidget(QLabel("OBD-II Data:"))
+        data_header.addStretch()
+        span_label = QLabel("Chart Span:")
+        span_label.setFont(QFont("Arial", 12))
+        data_header.addWidget(span_label)
+        self.span_select = QComboBox()
+        self.span_select.addItems(SPARKLINE_SPANS.keys())
+        self.span_select.setFont(QFont("Arial", 12))
+        self.span_select.setStyleSheet("""
+            QComboBox {
+                background-color: #4C566A;
+                color: #ECEFF4;
+                border: 1px solid #4C566A;
+                padding: 5px;
+                border-radius: 3px;
+            }
+        """)
+        self.span_select.currentIndexChanged.connect(self.update_span)
+        data_header.addWidget(self.span_select)
+        main_layout.addLayout(data_header)
+        main_layout.addWidget(self.dashboard)
+        self.stats_panel = None
+        if self.metrics is not None:
+            self.stats_panel = StatsPanel(self.metrics)
+            self.stats_panel.setStyleSheet("background-color: #3B4252; color: #ECEFF4; padding: 5px;")
+            self.stats_panel.hide()
+            main_layout.addWidget(self.stats_panel)
 
         # Start/Stop Simulation
         sim_controls_layout = QHBoxLayout()
@@ -359,6 +506,25 @@ class OBDSimulator(QWidget):
         self.save_button.clicked.connect(self.save_data_to_csv)
         sim_controls_layout.addWidget(self.save_button)
 
+        # Stats Button (only with OBD_METRICS_PORT set)
+        if self.stats_panel is not None:
+            self.stats_button = QPushButton("Show Stats")
+            self.stats_button.setFont(QFont("Arial", 12))
+            self.stats_button.setStyleSheet("""
+                QPushButton {
+                    background-color: #5E81AC;
+                    color: #ECEFF4;
+                    border: none;
+                    padding: 10px;
+                    border-radius: 5px;
+                }
+                QPushButton:hover {
+                    background-color: #81A1C1;
+                }
+            """)
+            self.stats_button.clicked.connect(self.toggle_stats)
+            sim_controls_layout.addWidget(self.stats_button)
+
         main_layout.addLayout(sim_controls_layout)
 
         # Set the scroll area as the main widget
@@ -367,153 +533,111 @@ class OBDSimulator(QWidget):
 
         self.update_situations()
 
-    def generate_initial_data(self):
-        """Generate initial sensor data with realistic base values"""
-        return {
-            "Engine RPM": 700,  # Idle RPM
-            "Coolant Temp (°C)": 90,  # Normal operating temperature
-            "Fuel Pressure (kPa)": 3000,  # Typical fuel pressure
-            "O2 Sensor Voltage (V)": 0.45,  # Ideal O2 sensor voltage
-            "Catalyst Temp (°C)": 500,  # Normal catalyst temperature
-            "EGR Flow (%)": 10,  # Moderate EGR flow
-            "Short Term Fuel Trim (%)": 0,  # Ideal fuel trim
-            "Long Term Fuel Trim (%)": 0,  # Ideal fuel trim
-            "Evap System Vapor Pressure (kPa)": -0.5,  # Slight vacuum
-            "Transmission Temp (°C)": 85,  # Normal transmission temperature
-            "Fuel Level (%)": 80,  # Partially full fuel tank
-            "Ambient Air Temp (°C)": 25,  # Moderate ambient temperature
-            "Oil Pressure (psi)": 40,  # Healthy oil pressure
-            "Brake Pedal Position (%)": 0,  # Brake pedal released
-            "Steering Angle (°)": 0,  # Straight steering
-            "Tire Pressure (psi)": 32,  # Normal tire pressure
-            "Alternator Output (V)": 14.0,  # Ideal alternator output
-            "Fuel Injector Pulse Width (ms)": 3,  # Normal injector pulse width
-            "Knock Sensor Voltage (V)": 0.2,  # Low knock sensor voltage
-            "Wheel Speed (km/h)": 0,  # Stationary
-            "Clutch Pedal Position (%)": 0,  # Clutch pedal released
-            "Exhaust Gas Temp (°C)": 400,  # Normal exhaust temperature
-            "Battery Voltage (V)": 12.5,  # Normal battery voltage
-            "Electrical Load (A)": 20,  # Normal electrical load
-            "Fault Code": "No Faults Detected"
-        }
+    def open_log_sink(self):
+        """Streaming log the worker writes every row to, opened on its first tick"""
+        return StreamingSink(
+            open_exporter(LOG_PATH), flush_rows=LOG_FLUSH_ROWS, flush_interval=LOG_FLUSH_INTERVAL,
+            max_rows=LOG_MAX_ROWS, overflow="drop", metrics=self.metrics,
+        )
 
     def update_sensor_data(self):
-        """Update sensor data dynamically with realistic constraints"""
-        selected_fault = self.fault_select.currentText()
-        selected_situation = self.situation_select.currentText()
-        self.sensor_data["Fault Code"] = selected_fault
-
-        # Apply fault code effects
-        if selected_fault == "P0217 - Engine Over Temperature":
-            self.sensor_data["Coolant Temp (°C)"] = random.randint(110, 120)  # Overheating
-        elif selected_fault == "P0087 - Fuel Rail/System Pressure Too Low":
-            self.sensor_data["Fuel Pressure (kPa)"] = random.randint(200, 500)  # Low fuel pressure
-        elif selected_fault == "P0300 - Random/Multiple Cylinder Misfire Detected":
-            self.sensor_data["Engine RPM"] += random.randint(-100, 100)  # RPM fluctuations
-        elif selected_fault == "P0171 - System Too Lean (Bank 1)":
-            self.sensor_data["O2 Sensor Voltage (V)"] = round(random.uniform(0.1, 0.3), 2)  # Lean condition
-        elif selected_fault == "P0172 - System Too Rich (Bank 1)":
-            self.sensor_data["O2 Sensor Voltage (V)"] = round(random.uniform(0.7, 0.9), 2)  # Rich condition
-
-        # Apply driving scenario effects
-        if self.selected_scenario == "City Road":
-            self.sensor_data["Engine RPM"] = random.randint(600, 3000)
-            self.sensor_data["Wheel Speed (km/h)"] = random.randint(0, 60)
-        elif self.selected_scenario == "Highway":
-            self.sensor_data["Engine RPM"] = random.randint(2000, 4000)
-            self.sensor_data["Wheel Speed (km/h)"] = random.randint(60, 120)
-        elif self.selected_scenario == "Off-Road":
-            self.sensor_data["Engine RPM"] = random.randint(1000, 3500)
-            self.sensor_data["Wheel Speed (km/h)"] = random.randint(0, 40)
-
-        # Apply car state adjustments
-        if self.car_on:
-            # Car is on: simulate normal operation
-            self.sensor_data["Engine RPM"] = max(600, min(5000, self.sensor_data["Engine RPM"]))
-            self.sensor_data["Wheel Speed (km/h)"] = self.speed
-            self.sensor_data["Fuel Pressure (kPa)"] = random.randint(2000, 4000)
-            self.sensor_data["O2 Sensor Voltage (V)"] = round(random.uniform(0.1, 0.9), 2)
-
-            # Simulate electrical and voltage levels
-            self.sensor_data["Battery Voltage (V)"] = round(random.uniform(12.5, 14.5), 2)  # Normal range
-            self.sensor_data["Alternator Output (V)"] = round(random.uniform(13.5, 14.5), 2)  # Normal range
-            self.sensor_data["Electrical Load (A)"] = random.randint(20, 50)  # Normal load
-        else:
-            # Car is off: set engine RPM, wheel speed, and fuel pressure to zero
-            self.sensor_data["Engine RPM"] = 0
-            self.sensor_data["Wheel Speed (km/h)"] = 0
-            self.sensor_data["Fuel Pressure (kPa)"] = 0
-
-            # Simulate electrical and voltage levels when car is off
-            self.sensor_data["Battery Voltage (V)"] = round(random.uniform(12.0, 12.5), 2)  # Lower voltage
-            self.sensor_data["Alternator Output (V)"] = 0  # Alternator not running
-            self.sensor_data["Electrical Load (A)"] = 0  # No electrical load
-
-        # Apply AC state adjustments
-        if self.ac_on:
-            self.sensor_data["Alternator Output (V)"] = max(13, min(15, self.sensor_data["Alternator Output (V)"]))
-            self.sensor_data["Electrical Load (A)"] += 10  # Increased load due to AC
-        else:
-            self.sensor_data["Alternator Output (V)"] = random.uniform(12.5, 13.5)
-
-        # Apply brake state adjustments
-        if self.brake_applied:
-            self.sensor_data["Brake Pedal Position (%)"] = 100
-        else:
-            self.sensor_data["Brake Pedal Position (%)"] = 0
-
-        # Ensure values stay within realistic ranges
-        self.sensor_data["Coolant Temp (°C)"] = max(70, min(120, self.sensor_data["Coolant Temp (°C)"]))
-        self.sensor_data["Catalyst Temp (°C)"] = max(400, min(800, self.sensor_data["Catalyst Temp (°C)"]))
-        self.sensor_data["EGR Flow (%)"] = max(0, min(20, self.sensor_data["EGR Flow (%)"]))
-        self.sensor_data["Short Term Fuel Trim (%)"] = max(-10, min(10, self.sensor_data["Short Term Fuel Trim (%)"]))
-        self.sensor_data["Long Term Fuel Trim (%)"] = max(-5, min(5, self.sensor_data["Long Term Fuel Trim (%)"]))
-        self.sensor_data["Evap System Vapor Pressure (kPa)"] = max(-5, min(5, self.sensor_data["Evap System Vapor Pressure (kPa)"]))
-        self.sensor_data["Transmission Temp (°C)"] = max(70, min(110, self.sensor_data["Transmission Temp (°C)"]))
-        self.sensor_data["Fuel Level (%)"] = max(0, min(100, self.sensor_data["Fuel Level (%)"]))
-        self.sensor_data["Oil Pressure (psi)"] = max(20, min(60, self.sensor_data["Oil Pressure (psi)"]))
-        self.sensor_data["Steering Angle (°)"] = max(-180, min(180, self.sensor_data["Steering Angle (°)"]))
-        self.sensor_data["Tire Pressure (psi)"] = max(28, min(35, self.sensor_data["Tire Pressure (psi)"]))
-        self.sensor_data["Fuel Injector Pulse Width (ms)"] = max(1, min(10, self.sensor_data["Fuel Injector Pulse Width (ms)"]))
-        self.sensor_data["Knock Sensor Voltage (V)"] = max(0, min(5, self.sensor_data["Knock Sensor Voltage (V)"]))
-        self.sensor_data["Clutch Pedal Position (%)"] = max(0, min(100, self.sensor_data["Clutch Pedal Position (%)"]))
-        self.sensor_data["Exhaust Gas Temp (°C)"] = max(200, min(1000, self.sensor_data["Exhaust Gas Temp (°C)"]))
-        self.sensor_data["Fault Code"] = selected_fault
-
-        # Update the display
-        display_text = "\n".join([f"{key}: {value}" for key, value in self.sensor_data.items()])
-        self.result_display.setText(display_text)
-
-        # Log data for saving (with timestamp)
-        self.data_log.append({
-            **self.sensor_data,
-            "Timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),  # Add timestamp here
-            "Fault Description": self.situation_select.currentText(),
-            "Fault Code": self.fault_select.currentText()
-        })
+        """Rows the worker produced since the last frame (none while a log is replayed)"""
+        rows = self.worker.drain()
+        return () if self.playback_rows is not None else rows
+
+    def toggle_playback(self):
+        """Replay a recorded log into the data view, or stop the running replay"""
+        if self.playback_rows is not None:
+            self.stop_playback()
+            return
+        path, _ = QFileDialog.getOpenFileName(self, "Replay Log", "", "OBD-II logs (*.csv *.parquet *.npz *.npy)")
+        if path:
+            self.start_playback(path)
+
+    def start_playback(self, path):
+        """Open a log (seeking to the optional start time) and replay it at the selected speed"""
+        start_text = self.playback_start.text().strip()
+        try:
+            log = open_log(path)
+            start_ms = parse_timestamp(start_text) if start_text else None
+        except (OSError, ValueError, RuntimeError) as error:
+            print(f"Cannot replay {path}: {error}")
+            return
+        self.stop_simulation()
+        self.playback_rows = log.rows(start_ms)
+        self.playback_next = next(self.playback_rows, None)
+        self.playback_origin = None
+        self.dashboard.clear()
+        self.playback_timer.start(PLAYBACK_INTERVAL_MS)
+        self.playback_button.setText("Stop Replay")
+        self.start_sim_button.setEnabled(False)
+
+    def reset_playback_clock(self):
+        """Re-anchor playback pacing, e.g. after a speed change"""
+        self.playback_origin = None
+
+    def update_playback(self):
+        """Show the latest recorded row that is due at the current playback speed"""
+        speed = PLAYBACK_SPEEDS[self.playback_speed.currentText()]
+        row = self.playback_next
+        if row is not None and speed is not None and self.playback_origin is None:
+            self.playback_origin = (time.perf_counter(), row[0])
+        shown = None
+        for _ in range(PLAYBACK_MAX_ROWS if speed is None else sys.maxsize):
+            if row is None:
+                break
+            if speed is not None:
+                wall_start, log_start = self.playback_origin
+                if row[0] > log_start + (time.perf_counter() - wall_start) * 1000 * speed:
+                    break
+            shown, row = row, next(self.playback_rows, None)
+            if row is not None and row[0] < shown[0]:
+                self.playback_origin = None  # next run of a multi-run dataset: restart the pacing
+                break
+        self.playback_next = row
+        if shown is not None:
+            self.dashboard.push(shown)
+        if row is None:
+            self.stop_playback()
+
+    def stop_playback(self):
+        """Stop replaying and hand the view back to the simulation"""
+        self.playback_timer.stop()
+        self.playback_rows = self.playback_next = None
+        self.playback_button.setText("Replay Log...")
+        self.start_sim_button.setEnabled(True)
+
+    def selected_fault(self):
+        """The chosen catalog entry, ignoring any half-typed search text"""
+        return self.fault_select.itemText(self.fault_select.currentIndex())
 
     def update_situations(self):
         """Update the list of possible situations based on the selected fault"""
-        selected_fault = self.fault_select.currentText()
-        situations = Faults[selected_fault]
+        self.worker.set("selected_fault", self.selected_fault())
         self.situation_select.clear()
-        self.situation_select.addItems(situations)
+        self.situation_select.addItems(Faults[self.selected_fault()])
 
     def update_fault_code(self):
         """Update the fault code based on the selected situation"""
         selected_situation = self.situation_select.currentText()
-        for fault, situations in Faults.items():
-            if selected_situation in situations:
-                self.fault_select.setCurrentText(fault)
-                break
+        if selected_situation:
+            self.worker.set("selected_situation", selected_situation)
+        # Situations shared by several faults keep the fault the user picked
+        if selected_situation in Faults[self.selected_fault()]:
+            return
+        faults = CATALOG.faults_for(selected_situation)
+        if faults:
+            self.fault_select.setCurrentIndex(self.fault_rows[faults[0]])
 
     def update_scenario(self):
         """Update the driving scenario"""
         self.selected_scenario = self.scenario_select.currentText()
+        self.worker.set("selected_scenario", self.selected_scenario)
 
     def toggle_car(self):
         """Toggle car on/off"""
         self.car_on = not self.car_on
+        self.worker.set("car_on", self.car_on)
         self.start_button.setText("Stop Car" if self.car_on else "Start Car")
         self.speed_slider.setEnabled(self.car_on)
         if not self.car_on:
@@ -523,21 +647,46 @@ class OBDSimulator(QWidget):
     def toggle_ac(self):
         """Toggle AC on/off"""
         self.ac_on = not self.ac_on
+        self.worker.set("ac_on", self.ac_on)
         self.ac_button.setText("Turn AC Off" if self.ac_on else "Turn AC On")
 
     def toggle_brake(self):
         """Toggle brake on/off"""
         self.brake_applied = not self.brake_applied
+        self.worker.set("brake_applied", self.brake_applied)
         self.brake_button.setText("Release Brake" if self.brake_applied else "Apply Brake")
 
     def update_speed(self):
         """Update car speed based on slider value"""
         self.speed = self.speed_slider.value()
+        self.worker.set("speed", self.speed)
+
+    def update_drive_cycle(self):
+        """Let a scripted drive cycle take over the car controls, or hand them back to the user"""
+        name = self.cycle_select.currentText()
+        scripted = name != MANUAL_DRIVING
+        for control in (self.start_button, self.ac_button, self.brake_button, self.speed_slider, self.scenario_select):
+            control.setEnabled(not scripted)
+        self.worker.set("drive_cycle", name if scripted else None)
+        if not scripted:
+            # Restore the inputs the buttons and slider show
+            for attribute in ("car_on", "ac_on", "brake_applied", "speed", "selected_scenario"):
+                self.worker.set(attribute, getattr(self, attribute))
+            self.speed_slider.setEnabled(self.car_on)
+
+    def update_rate_changed(self):
+        """Switch the real-time update rate, keeping the simulated clock continuous"""
+        self.update_rate = UPDATE_RATES[self.rate_select.currentText()]
+        self.worker.set_rate(self.update_rate)
+
+    def update_span(self):
+        """Chart the live samples or a longer stretch of the signal history in the sparklines"""
+        self.dashboard.set_span(SPARKLINE_SPANS[self.span_select.currentText()])
 
     def start_simulation(self):
         """Start the dynamic simulation"""
         if not self.is_running:
-            self.timer.start(5000)  # Update every 5 seconds
+            self.worker.resume()
             self.is_running = True
             self.start_sim_button.setEnabled(False)
             self.stop_sim_button.setEnabled(True)
@@ -545,93 +694,31 @@ class OBDSimulator(QWidget):
     def stop_simulation(self):
         """Stop the dynamic simulation"""
         if self.is_running:
-            self.timer.stop()
+            self.worker.pause()
             self.is_running = False
             self.start_sim_button.setEnabled(True)
             self.stop_sim_button.setEnabled(False)
 
     def save_data_to_csv(self):
-        """Save collected data to the specified CSV file, appending new records if the file exists."""
-        if not self.data_log:
+        """Hand everything logged so far to the writer thread without waiting for the disk."""
+        sink = self.worker.sink
+        if sink is None:
             print("No data to save.")
             return
-
-        # Fixed file path
-        file_path = r"C:\Users\lenovo\Desktop\simulator\obd-II_data.csv"
-
-        # Define CSV columns based on the provided format
-        columns = [
-            "Timestamp", "Engine RPM", "Coolant Temp (°C)", "Fuel Pressure (kPa)", "O2 Sensor Voltage (V)",
-            "Catalyst Temp (°C)", "EGR Flow (%)", "Short Term Fuel Trim (%)", "Long Term Fuel Trim (%)",
-            "Evap System Vapor Pressure (kPa)", "Transmission Temp (°C)", "Fuel Level (%)", "Ambient Air Temp (°C)",
-            "Oil Pressure (psi)", "Brake Pedal Position (%)", "Steering Angle (°)", "Tire Pressure (psi)",
-            "Alternator Output (V)", "Fuel Injector Pulse Width (ms)", "Knock Sensor Voltage (V)", "Wheel Speed (km/h)",
-            "Clutch Pedal Position (%)", "Exhaust Gas Temp (°C)", "Road Conditions", "Weather", "Traffic Conditions",
-            "Vehicle Load", "Time Since Last Maintenance (days)", "Coolant Temp Rate of Change (°C/min)",
-            "Fuel Trim Stability", "Battery Health Indicator", "Transmission Temp Anomaly Score",
-            "Excessive Engine Load Detection", "Fault Code", "Fault Description", "Severity Level", "Recommended Fix"
-        ]
-
-        # Prepare data for CSV
-        csv_data = []
-        for entry in self.data_log:
-            csv_row = {
-                "Timestamp": entry.get("Timestamp", ""),  # Use the timestamp from the log entry
-                "Engine RPM": entry.get("Engine RPM", ""),
-                "Coolant Temp (°C)": entry.get("Coolant Temp (°C)", ""),
-                "Fuel Pressure (kPa)": entry.get("Fuel Pressure (kPa)", ""),
-                "O2 Sensor Voltage (V)": entry.get("O2 Sensor Voltage (V)", ""),
-                "Catalyst Temp (°C)": entry.get("Catalyst Temp (°C)", ""),
-                "EGR Flow (%)": entry.get("EGR Flow (%)", ""),
-                "Short Term Fuel Trim (%)": entry.get("Short Term Fuel Trim (%)", ""),
-                "Long Term Fuel Trim (%)": entry.get("Long Term Fuel Trim (%)", ""),
-                "Evap System Vapor Pressure (kPa)": entry.get("Evap System Vapor Pressure (kPa)", ""),
-                "Transmission Temp (°C)": entry.get("Transmission Temp (°C)", ""),
-                "Fuel Level (%)": entry.get("Fuel Level (%)", ""),
-                "Ambient Air Temp (°C)": entry.get("Ambient Air Temp (°C)", ""),
-                "Oil Pressure (psi)": entry.get("Oil Pressure (psi)", ""),
-                "Brake Pedal Position (%)": entry.get("Brake Pedal Position (%)", ""),
-                "Steering Angle (°)": entry.get("Steering Angle (°)", ""),
-                "Tire Pressure (psi)": entry.get("Tire Pressure (psi)", ""),
-                "Alternator Output (V)": entry.get("Alternator Output (V)", ""),
-                "Fuel Injector Pulse Width (ms)": entry.get("Fuel Injector Pulse Width (ms)", ""),
-                "Knock Sensor Voltage (V)": entry.get("Knock Sensor Voltage (V)", ""),
-                "Wheel Speed (km/h)": entry.get("Wheel Speed (km/h)", ""),
-                "Clutch Pedal Position (%)": entry.get("Clutch Pedal Position (%)", ""),
-                "Exhaust Gas Temp (°C)": entry.get("Exhaust Gas Temp (°C)", ""),
-                "Road Conditions": "",  # Placeholder for future implementation
-                "Weather": "",  # Placeholder for future implementation
-                "Traffic Conditions": "",  # Placeholder for future implementation
-                "Vehicle Load": "",  # Placeholder for future implementation
-                "Time Since Last Maintenance (days)": "",  # Placeholder for future implementation
-                "Coolant Temp Rate of Change (°C/min)": "",  # Placeholder for future implementation
-                "Fuel Trim Stability": "",  # Placeholder for future implementation
-                "Battery Health Indicator": "",  # Placeholder for future implementation
-                "Transmission Temp Anomaly Score": "",  # Placeholder for future implementation
-                "Excessive Engine Load Detection": "",  # Placeholder for future implementation
-                "Fault Code": entry.get("Fault Code", ""),
-                "Fault Description": entry.get("Fault Description", ""),
-                "Severity Level": "",  # Placeholder for future implementation
-                "Recommended Fix": ""  # Placeholder for future implementation
-            }
-            csv_data.append(csv_row)
-
-        # Check if the file exists
-        file_exists = os.path.isfile(file_path)
-
-        # Write data to CSV
-        with open(file_path, mode="a", newline="") as file:
-            writer = csv.DictWriter(file, fieldnames=columns)
-            
-            # Write header only if the file is new
-            if not file_exists:
-                writer.writeheader()
-            
-            # Write rows
-            writer.writerows(csv_data)
-
-        print(f"Data saved to {file_path}")
-        self.data_log = []  # Clear the data log after saving
+        sink.flush(wait=False)
+        print(f"Saving data to {sink.writer.path}")
+
+    def toggle_stats(self):
+        """Show or hide the live metrics panel"""
+        visible = not self.stats_panel.isVisible()
+        self.stats_panel.setVisible(visible)
+        self.stats_panel.refresh()
+        self.stats_button.setText("Hide Stats" if visible else "Show Stats")
+
+    def closeEvent(self, event):
+        """Stop the simulation thread and close its streaming log when the window closes"""
+        self.worker.stop()
+        super().closeEvent(event)
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
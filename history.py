@@ -0,0 +1,247 @@
+"""Bounded in-memory signal history with multi-resolution rollups and range queries.
+
+HistoryStore keeps every signal of the ROW_FIELDS rows it is given in three
+fixed-size ring buffers: the raw samples, 1 s buckets and 1 min buckets,
+each bucket holding the min, max and mean of every signal.  A bucket is
+folded from the finer tier in one vectorized step when the first sample of
+the next bucket arrives, so append() is O(1) and memory stays the same
+however long the run.  query() binary-searches the time-ordered rings and
+copies only the requested window, so a range query is O(window), and picks
+the finest tier that still covers the range when no resolution is given.
+
+serve() exposes query() as JSON over HTTP for any network client:
+GET /history?signal=Engine RPM&last=3600&max_points=500.
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from scheduler import parse_timestamp
+from schema import N_SIGNALS, SIGNAL_NAMES
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+RAW_SAMPLES = 36_000  # One hour at 10 Hz
+SECOND_BUCKETS = 6 * 3600
+MINUTE_BUCKETS = 7 * 24 * 60
+RESOLUTIONS = ("raw", "1s", "1min")  # Finest first
+HISTORY_HOST = "127.0.0.1"
+HISTORY_PATH = "/history"
+
+
+class _Ring:
+    """Fixed-capacity time-ordered columns; slot n % capacity holds the n-th entry"""
+
+    def __init__(self, capacity, columns):
+        self.capacity = capacity
+        self.timestamps = np.zeros(capacity, dtype=np.int64)
+        self.columns = {name: np.zeros((capacity, N_SIGNALS), dtype=np.float32) for name in columns}
+        self.counts = np.zeros(capacity, dtype=np.int64)  # samples folded into each bucket
+        self.total = 0  # entries ever appended
+
+    def indices(self, first, stop):
+        """Slots of entries first..stop-1, dropping the ones already overwritten"""
+        return np.arange(max(first, stop - self.capacity), stop) % self.capacity
+
+    def oldest_ms(self):
+        return int(self.timestamps[self.total % self.capacity if self.total > self.capacity else 0])
+
+    def window(self, start_ms, end_ms):
+        """Slots of the entries with start_ms <= timestamp <= end_ms, oldest first"""
+        n = min(self.total, self.capacity)
+        head = self.total % self.capacity if self.total > self.capacity else 0
+        parts = []
+        for low, high in ((head, n), (0, head)):  # older segment, then the wrapped newer one
+            times = self.timestamps[low:high]
+            first = low + int(np.searchsorted(times, start_ms, "left")) if start_ms is not None else low
+            last = low + int(np.searchsorted(times, end_ms, "right")) if end_ms is not None else high
+            if last > first:
+                parts.append(np.arange(first, last))
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+    def append(self, timestamp_ms, count, **values):
+        slot = self.total % self.capacity
+        self.timestamps[slot] = timestamp_ms
+        self.counts[slot] = count
+        for name, value in values.items():
+            self.columns[name][slot] = value
+        self.total += 1
+
+
+class HistoryStore:
+    """Raw, 1 s and 1 min history of every signal in fixed-size ring buffers.
+
+    Rows must arrive in time order; a timestamp earlier than the newest one
+    (a new run or another log) starts the history over.  Rollup queries only
+    see closed buckets.  append() and query() may be called from different
+    threads.
+    """
+
+    def __init__(self, raw_samples=RAW_SAMPLES, second_buckets=SECOND_BUCKETS, minute_buckets=MINUTE_BUCKETS):
+        if np is None:
+            raise RuntimeError("Signal history requires NumPy: pip install numpy")
+        self._sizes = (raw_samples, second_buckets, minute_buckets)
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            raw_samples, second_buckets, minute_buckets = self._sizes
+            self.raw = _Ring(raw_samples, ("value",))
+            self.seconds = _Ring(second_buckets, ("min", "max", "mean"))
+            self.minutes = _Ring(minute_buckets, ("min", "max", "mean"))
+            self.last_ms = None
+            self._second = self._minute = None  # open bucket numbers
+            self._second_first = self._minute_first = 0  # first entry of the open buckets in the finer ring
+
+    def append(self, row):
+        """Record one ROW_FIELDS row"""
+        timestamp_ms = row[0]
+        if self.last_ms is not None and timestamp_ms < self.last_ms:
+            self.clear()
+        with self._lock:
+            self.last_ms = timestamp_ms
+            second = timestamp_ms // 1000
+            if second != self._second:
+                if self._second is not None:
+                    self._close_second()
+                self._second = second
+                self._second_first = self.raw.total
+            raw = self.raw
+            slot = raw.total % raw.capacity
+            raw.timestamps[slot] = timestamp_ms
+            raw.columns["value"][slot] = row[1:1 + N_SIGNALS]
+            raw.total += 1
+
+    def _close_second(self):
+        raw, seconds = self.raw, self.seconds
+        values = raw.columns["value"][raw.indices(self._second_first, raw.total)]
+        if not len(values):
+            return
+        minute = self._second // 60
+        if minute != self._minute:
+            if self._minute is not None:
+                self._close_minute()
+            self._minute = minute
+            self._minute_first = seconds.total
+        seconds.append(self._second * 1000, len(values), min=values.min(axis=0), max=values.max(axis=0),
+                       mean=values.mean(axis=0))
+
+    def _close_minute(self):
+        seconds = self.seconds
+        slots = seconds.indices(self._minute_first, seconds.total)
+        if not len(slots):
+            return
+        columns = seconds.columns
+        counts = seconds.counts[slots]
+        mean = (columns["mean"][slots] * counts[:, None]).sum(axis=0) / counts.sum()
+        self.minutes.append(self._minute * 60_000, int(counts.sum()), min=columns["min"][slots].min(axis=0),
+                            max=columns["max"][slots].max(axis=0), mean=mean)
+
+    def _ring(self, resolution):
+        return {"raw": self.raw, "1s": self.seconds, "1min": self.minutes}[resolution]
+
+    def _pick(self, start_ms, end_ms, max_points):
+        """Finest resolution still holding start_ms whose window fits in max_points"""
+        for resolution in RESOLUTIONS:
+            ring = self._ring(resolution)
+            if not ring.total:
+                continue
+            covers = ring.total <= ring.capacity or start_ms is not None and ring.oldest_ms() <= start_ms
+            if covers and (max_points is None or len(ring.window(start_ms, end_ms)) <= max_points):
+                return resolution
+        return RESOLUTIONS[-1]
+
+    def query(self, signals=None, start_ms=None, end_ms=None, resolution=None, max_points=None):
+        """JSON-ready history of signals (default: all) between start_ms and end_ms (inclusive).
+
+        Returns {"resolution", "timestamp_ms", "signals": {name: columns}}, with
+        a "value" column at raw resolution and "min"/"max"/"mean" columns for
+        rollups.  Without a resolution the finest tier that still covers the
+        range in at most max_points points is used.  Rollups with more than
+        max_points buckets are merged into max_points wider buckets.
+        """
+        names = SIGNAL_NAMES if signals is None else [signals] if isinstance(signals, str) else list(signals)
+        columns = [SIGNAL_NAMES.index(name) for name in names]
+        with self._lock:
+            if resolution is None:
+                resolution = self._pick(start_ms, end_ms, max_points)
+            elif resolution not in RESOLUTIONS:
+                raise ValueError(f"Unknown resolution {resolution!r}; expected one of {', '.join(RESOLUTIONS)}")
+            ring = self._ring(resolution)
+            slots = ring.window(start_ms, end_ms)
+            timestamps = ring.timestamps[slots]
+            values = {key: column[slots][:, columns] for key, column in ring.columns.items()}
+            counts = ring.counts[slots]
+        if resolution != "raw" and max_points and len(slots) > max_points:
+            timestamps, values = _merge(timestamps, values, counts, max_points)
+        return {
+            "resolution": resolution,
+            "timestamp_ms": timestamps.tolist(),
+            "signals": {name: {key: column[:, i].tolist() for key, column in values.items()}
+                        for i, name in enumerate(names)},
+        }
+
+
+def _merge(timestamps, values, counts, max_points):
+    """Merge consecutive rollup buckets into at most max_points wider ones"""
+    starts = np.arange(0, len(timestamps), -(-len(timestamps) // max_points))
+    weights = counts[:, None].astype(np.float64)
+    totals = np.add.reduceat(weights, starts)
+    return timestamps[starts], {
+        "min": np.minimum.reduceat(values["min"], starts),
+        "max": np.maximum.reduceat(values["max"], starts),
+        "mean": (np.add.reduceat(values["mean"] * weights, starts) / totals).astype(np.float32),
+    }
+
+
+def _time_arg(text):
+    """Epoch ms or an ISO timestamp"""
+    return int(text) if text.lstrip("-").isdigit() else parse_timestamp(text)
+
+
+def serve(store, port, host=HISTORY_HOST):
+    """Serve store.query() as JSON at http://host:port/history from a daemon thread; returns the server.
+
+    Query parameters: signal (repeatable), start and end (epoch ms or ISO),
+    last (seconds before the newest sample, instead of start), resolution and
+    max_points.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlsplit(self.path)
+            if url.path != HISTORY_PATH:
+                self.send_error(404)
+                return
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            try:
+                start_ms = _time_arg(params["start"]) if "start" in params else None
+                if "last" in params and store.last_ms is not None:
+                    start_ms = store.last_ms - round(float(params["last"]) * 1000)
+                result = store.query(
+                    parse_qs(url.query).get("signal"), start_ms,
+                    _time_arg(params["end"]) if "end" in params else None,
+                    params.get("resolution"), int(params["max_points"]) if "max_points" in params else None,
+                )
+            except ValueError as error:
+                self.send_error(400, str(error))
+                return
+            body = json.dumps(result).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Charts poll every few seconds
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="HistoryServer", daemon=True).start()
+    return server
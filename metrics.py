@@ -0,0 +1,154 @@
+"""Hot-path instrumentation and a Prometheus text endpoint on localhost.
+
+Components take an optional Metrics registry (metrics=None by default) and
+skip instrumentation entirely without one.  With one, the hot paths only
+time whole batches: a worker wake-up, a writer flush, a dashboard frame.
+Each observation is a perf_counter() call and a bisect into fixed histogram
+buckets.  Counters the components already keep (rows written, late ticks,
+...) are registered as callbacks that are only read when the metrics are
+scraped.
+
+Each metric has a single writer thread, so updates take no locks; a scrape
+may see a histogram mid-update, which Prometheus tolerates.
+"""
+import os
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_HOST = "127.0.0.1"  # The endpoint is never exposed beyond localhost
+METRICS_PATH = "/metrics"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds in seconds, from one fast tick to a slow disk flush
+LATENCY_BUCKETS = (
+    1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+
+class Counter:
+    def __init__(self, name, help):
+        self.name, self.help = name, help
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def samples(self):
+        yield self.name, self.value
+
+
+class Callback:
+    """Counter or gauge whose value is read from function() at scrape time"""
+
+    def __init__(self, name, help, kind, function):
+        self.name, self.help, self.kind = name, help, kind
+        self.function = function
+
+    @property
+    def value(self):
+        return self.function()
+
+    def samples(self):
+        yield self.name, self.function()
+
+
+class Histogram:
+    """Cumulative-bucket histogram with fixed upper bounds"""
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS):
+        self.name, self.help = name, help
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot: above the highest bound
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (None before the first observation)"""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def samples(self):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{self.name}_bucket{{le="{bound:g}"}}', cumulative
+        yield f'{self.name}_bucket{{le="+Inf"}}', self.count
+        yield f"{self.name}_sum", self.sum
+        yield f"{self.name}_count", self.count
+
+
+class Metrics:
+    """Registry of named metrics, rendered in the Prometheus text format"""
+
+    def __init__(self, prefix="obd_"):
+        self.prefix = prefix
+        self.metrics = {}
+
+    def counter(self, name, help):
+        return self._register(Counter(self.prefix + name, help), "counter")
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(self.prefix + name, help, buckets), "histogram")
+
+    def callback(self, name, help, function, kind="gauge"):
+        """Register function() as a gauge (or kind="counter"); re-registering a name replaces it"""
+        return self._register(Callback(self.prefix + name, help, kind, function), kind)
+
+    def _register(self, metric, kind):
+        metric.kind = kind
+        self.metrics[metric.name] = metric
+        return metric
+
+    def get(self, name):
+        return self.metrics.get(self.prefix + name)
+
+    def render(self):
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name} {value}" for name, value in metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+def output_bytes(path):
+    """Size of a log file, or of the files in a .npy column directory (0 if not written yet)"""
+    if os.path.isdir(path):
+        return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def serve(metrics, port, host=METRICS_HOST):
+    """Serve metrics.render() at http://host:port/metrics from a daemon thread; returns the server"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != METRICS_PATH:
+                self.send_error(404)
+                return
+            body = metrics.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Scrapes every few seconds would flood the console
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="MetricsServer", daemon=True).start()
+    return server
@@ -0,0 +1,216 @@
+"""Correlated, autocorrelated sensor noise drawn in precomputed vectorized banks.
+
+Every noisy signal follows a unit-variance Ornstein-Uhlenbeck (AR(1)) process
+with its own correlation time.  The innovations share a cross-signal
+correlation matrix, so for example RPM, injector pulse width and exhaust
+temperature wander together.  The engine scales each process by the signal's
+standard deviation and quantizes the result to the sensor's resolution.  The
+ZERO_AT_REST signals (RPM, wheel speed, fuel pressure, ...) stay at exactly
+zero while the engine is off or the car stands still; every other signal gets
+noise at any value, zero included.  The O2 sensor gets its closed-loop
+switching between lean and rich instead of white noise.
+
+NoiseModel.next() hands out one bank row per tick.  Rows come from banks of
+BANK_TICKS ticks, each one NumPy draw of innovations followed by the AR(1)
+recursion across all signals, so no Python random call is made per value.
+Profiles are JSON files:
+{"signals": {name: {"sigma", "tau", "quantum"}}, "correlations": [[a, b, rho], ...]}.
+Without a file, DEFAULT_NOISE and DEFAULT_CORRELATIONS are used.
+"""
+import json
+import math
+from collections import namedtuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from schema import SIGNAL_NAMES, Signal
+
+DEFAULT_PROFILE = "default"
+BANK_TICKS = 1024  # Ticks of noise drawn per bank
+
+# Closed-loop O2 sensor switching between lean and rich
+O2_SWITCH_HZ = 1.0
+O2_FREQUENCY_JITTER = 0.3  # Relative spread of the switching frequency
+O2_CENTER_V, O2_SWING_V = 0.45, 0.4
+O2_SHARPNESS = 3.0  # tanh steepness: 0 is a sine, larger is closer to a square wave
+
+# Standard deviation (signal units), correlation time (s) and sensor resolution of each noisy signal
+NoiseSpec = namedtuple("NoiseSpec", "sigma tau quantum")
+DEFAULT_NOISE = {
+    Signal.ENGINE_RPM: NoiseSpec(15, 0.5, 0.25),
+    Signal.COOLANT_TEMP: NoiseSpec(0.3, 30, 1),
+    Signal.FUEL_PRESSURE: NoiseSpec(30, 0.3, 3),
+    Signal.O2_VOLTAGE: NoiseSpec(0.02, 0.1, 0.005),
+    Signal.CATALYST_TEMP: NoiseSpec(2, 10, 0.1),
+    Signal.EGR_FLOW: NoiseSpec(0.5, 1, 100 / 255),
+    Signal.SHORT_TERM_FUEL_TRIM: NoiseSpec(1.5, 0.5, 100 / 128),
+    Signal.LONG_TERM_FUEL_TRIM: NoiseSpec(0.2, 120, 100 / 128),
+    Signal.EVAP_PRESSURE: NoiseSpec(0.05, 5, 0.00025),
+    Signal.TRANSMISSION_TEMP: NoiseSpec(0.2, 60, 1),
+    Signal.FUEL_LEVEL: NoiseSpec(0.4, 5, 100 / 255),  # Slosh
+    Signal.AMBIENT_TEMP: NoiseSpec(0.2, 120, 1),
+    Signal.OIL_PRESSURE: NoiseSpec(0.5, 1, 0.1),
+    Signal.STEERING_ANGLE: NoiseSpec(1.0, 2, 0.1),
+    Signal.TIRE_PRESSURE: NoiseSpec(0.05, 300, 0.1),
+    Signal.ALTERNATOR_OUTPUT: NoiseSpec(0.05, 0.5, 0.001),
+    Signal.INJECTOR_PULSE_WIDTH: NoiseSpec(0.05, 0.5, 0.01),
+    Signal.KNOCK_VOLTAGE: NoiseSpec(0.05, 0.05, 0.01),
+    Signal.WHEEL_SPEED: NoiseSpec(0.3, 0.5, 1),
+    Signal.EXHAUST_GAS_TEMP: NoiseSpec(3, 2, 0.1),
+    Signal.BATTERY_VOLTAGE: NoiseSpec(0.03, 1, 0.001),
+    Signal.ELECTRICAL_LOAD: NoiseSpec(1, 2, 0.1),
+}
+
+# Signals that read exactly 0 with the engine stopped or the car standing still; only their non-zero readings get noise
+ZERO_AT_REST = frozenset((
+    Signal.ENGINE_RPM, Signal.FUEL_PRESSURE, Signal.ALTERNATOR_OUTPUT, Signal.INJECTOR_PULSE_WIDTH,
+    Signal.WHEEL_SPEED, Signal.ELECTRICAL_LOAD,
+))
+
+# Correlation of the innovations of two signals
+DEFAULT_CORRELATIONS = (
+    # Engine load moves speed, fueling and exhaust heat together
+    (Signal.ENGINE_RPM, Signal.INJECTOR_PULSE_WIDTH, 0.8),
+    (Signal.ENGINE_RPM, Signal.EXHAUST_GAS_TEMP, 0.6),
+    (Signal.ENGINE_RPM, Signal.WHEEL_SPEED, 0.6),
+    (Signal.INJECTOR_PULSE_WIDTH, Signal.EXHAUST_GAS_TEMP, 0.6),
+    (Signal.INJECTOR_PULSE_WIDTH, Signal.WHEEL_SPEED, 0.5),
+    (Signal.EXHAUST_GAS_TEMP, Signal.WHEEL_SPEED, 0.4),
+    (Signal.SHORT_TERM_FUEL_TRIM, Signal.INJECTOR_PULSE_WIDTH, 0.4),
+    (Signal.CATALYST_TEMP, Signal.EXHAUST_GAS_TEMP, 0.5),
+    (Signal.COOLANT_TEMP, Signal.TRANSMISSION_TEMP, 0.4),
+    (Signal.ALTERNATOR_OUTPUT, Signal.BATTERY_VOLTAGE, 0.8),
+    (Signal.ELECTRICAL_LOAD, Signal.BATTERY_VOLTAGE, -0.3),
+)
+
+
+class NoiseProfile:
+    """Per-signal NoiseSpecs and the Cholesky factor of their innovation correlations"""
+
+    def __init__(self, name, specs, correlations):
+        if np is None:
+            raise RuntimeError("Sensor noise requires NumPy: pip install numpy")
+        self.name = name
+        self.signals = sorted(specs)  # Signal indexes, one process each
+        self.names = [SIGNAL_NAMES[signal] for signal in self.signals]
+        self.sigma = [float(specs[signal].sigma) for signal in self.signals]
+        self.quantum = [float(specs[signal].quantum) for signal in self.signals]
+        self.tau = np.array([specs[signal].tau for signal in self.signals], dtype=float)
+        column = {signal: index for index, signal in enumerate(self.signals)}
+        matrix = np.eye(len(self.signals) + 1)  # Last process: O2 switching frequency jitter
+        for a, b, rho in correlations:
+            matrix[column[a], column[b]] = matrix[column[b], column[a]] = rho
+        try:
+            self.cholesky = np.linalg.cholesky(matrix)
+        except np.linalg.LinAlgError:
+            raise ValueError(f"Noise profile {name}: correlation matrix is not positive definite") from None
+
+    @classmethod
+    def load(cls, name=DEFAULT_PROFILE):
+        """DEFAULT_NOISE, or a JSON profile file (unlisted signals keep their defaults)"""
+        if name == DEFAULT_PROFILE:
+            return cls(name, DEFAULT_NOISE, DEFAULT_CORRELATIONS)
+        with open(name, encoding="utf-8") as file:
+            profile = json.load(file)
+        specs = dict(DEFAULT_NOISE)
+        for signal_name, spec in profile.get("signals", {}).items():
+            specs[Signal(SIGNAL_NAMES.index(signal_name))] = NoiseSpec(spec["sigma"], spec["tau"], spec["quantum"])
+        correlations = [(SIGNAL_NAMES.index(a), SIGNAL_NAMES.index(b), rho)
+                        for a, b, rho in profile.get("correlations", ())]
+        return cls(name, specs, correlations if "correlations" in profile else DEFAULT_CORRELATIONS)
+
+
+def ou_bank(rng, state, tau, cholesky, dt, n_ticks):
+    """(n_ticks, *state.shape) unit-variance OU samples continuing from state, which is updated in place.
+
+    state may be (processes,) for one vehicle or (vehicles, processes) for a fleet.
+    """
+    decay = np.exp(-dt / tau)
+    scale = np.sqrt(1.0 - decay ** 2)
+    bank = rng.standard_normal((n_ticks,) + state.shape) @ cholesky.T
+    bank *= scale
+    for tick in range(n_ticks):
+        state *= decay
+        state += bank[tick]
+        bank[tick] = state
+    return bank
+
+
+class NoiseModel:
+    """Noise processes of one vehicle, consumed one bank row per tick"""
+
+    def __init__(self, profile, seed=None):
+        self.profile = profile
+        n = len(profile.signals)
+        self.tau = np.append(profile.tau, 1.0)  # O2 frequency jitter decorrelates over a second
+        self.state_vector = np.zeros(n + 1)
+        self.o2_phase = 0.0
+        self.rng = np.random.default_rng(seed)
+        self._rows = []
+        self._next = 0
+        self._dt = None
+        self.current = [0.0] * (n + 1)
+        self._signal_column = {signal: index for index, signal in enumerate(profile.signals)}
+        self._measure = [
+            (name, sigma, quantum, column, profile.signals[column] in ZERO_AT_REST)
+            for column, (name, sigma, quantum) in enumerate(zip(profile.names, profile.sigma, profile.quantum))
+        ]
+
+    def reseed(self, seed):
+        """Restart the bank from a new generator, e.g. at a replay block boundary"""
+        self._discard()
+        self.rng = np.random.default_rng(seed)
+
+    def state(self):
+        state = self.current if self._rows else self.state_vector.tolist()
+        return {"state": list(state), "o2_phase": self.o2_phase}
+
+    def load_state(self, state):
+        self._rows = []
+        self.state_vector = np.array(state["state"], dtype=float)
+        self.current = list(state["state"])
+        self.o2_phase = state["o2_phase"]
+
+    def next(self, dt):
+        """Advance every process by dt and return this tick's values"""
+        if self._next >= len(self._rows) or dt != self._dt:
+            self._discard()
+            self._dt = dt
+            self._rows = ou_bank(self.rng, self.state_vector, self.tau, self.profile.cholesky, dt, BANK_TICKS).tolist()
+        self.current = self._rows[self._next]
+        self._next += 1
+        return self.current
+
+    def _discard(self):
+        """Drop the rest of the bank, continuing the processes from the last row handed out"""
+        if self._rows:
+            self.state_vector[:] = self.current
+        self._rows = []
+        self._next = 0
+
+    def value(self, signal):
+        """This tick's unit-variance value for a Signal (0.0 if the profile does not cover it)"""
+        column = self._signal_column.get(signal)
+        return 0.0 if column is None else self.current[column]
+
+    def o2_voltage(self, dt):
+        """Switching O2 sensor voltage, advanced by dt"""
+        frequency = O2_SWITCH_HZ * (1.0 + O2_FREQUENCY_JITTER * self.current[-1])
+        self.o2_phase = (self.o2_phase + 2 * math.pi * frequency * dt) % (2 * math.pi)
+        swing = math.tanh(O2_SHARPNESS * math.sin(self.o2_phase)) / math.tanh(O2_SHARPNESS)
+        return O2_CENTER_V + O2_SWING_V * swing
+
+    def apply(self, data, saved):
+        """Add this tick's noise to data and quantize it, saving untouched values into saved first"""
+        current = self.current
+        for name, sigma, quantum, column, zero_at_rest in self._measure:
+            value = data.get(name)
+            if value is None or zero_at_rest and not value:
+                continue
+            if name not in saved:
+                saved[name] = value
+            value += sigma * current[column]
+            data[name] = round(value / quantum) * quantum
@@ -0,0 +1,437 @@
+"""Playback of recorded logs (CSV, CSV shards, Parquet, .npy directories, .npz) into the dashboard, sinks and emulators.
+
+Logs are never loaded whole: CSV is parsed incrementally from a byte
+offset, .npy/.npz columns are memory-mapped and Parquet is read one row
+group at a time, so multi-GB logs open instantly.  Seeking by timestamp
+goes through a sparse time index of (timestamp_ms, position) entries, one
+per INDEX_STRIDE_BYTES of CSV or INDEX_STRIDE_ROWS of columnar data.  The
+CSV index is cached next to the log as <log>.index.json and extended in
+place when the log has grown.
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import struct
+import time
+import zipfile
+
+from engine import CSV_COLUMNS, ROW_FIELDS, SIGNAL_NAMES, generate_initial_data
+from exporters import SHARD_MANIFEST, SHARD_VERSION, infer_format
+from scheduler import MODES, parse_timestamp
+
+try:
+    import numpy as np
+except ImportError:  # CSV playback works without NumPy
+    np = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet is optional
+    pa = pq = None
+
+try:
+    import zstandard
+except ImportError:  # only needed for .zst shards
+    zstandard = None
+
+INDEX_STRIDE_BYTES = 1 << 20
+INDEX_STRIDE_ROWS = 4096
+INDEX_VERSION = 1
+CHUNK_ROWS = 4096  # rows converted per memory-mapped slice
+CSV_REQUIRED = ("Timestamp", "Fault Code", "Fault Description")
+
+
+def _number(text):
+    """CSV cell -> int or float, keeping integral values integral like the live engine"""
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def _is_timestamp(text):
+    try:
+        parse_timestamp(text)
+    except ValueError:
+        return False
+    return True
+
+
+def _seek_position(index, timestamp_ms):
+    """Position to scan from for the first row at or after timestamp_ms"""
+    for i, (entry_ms, position) in enumerate(index):
+        if entry_ms >= timestamp_ms:
+            return index[max(i - 1, 0)][1]
+    return index[-1][1] if index else None
+
+
+def _csv_rows(records, columns, start_ms=None):
+    """ROW_FIELDS tuples from csv.reader records laid out as columns, from the first at or after start_ms"""
+    # Signals the CSV layout leaves out (battery voltage, electrical load) keep their initial values
+    defaults = generate_initial_data()
+    template = [defaults[name] for name in SIGNAL_NAMES]
+    present = [(i, columns.index(name)) for i, name in enumerate(SIGNAL_NAMES) if name in columns]
+    timestamp_position, fault_position, description_position = map(columns.index, CSV_REQUIRED)
+    n_columns = len(columns)
+    last_text = None
+    last_ms = 0
+    for record in records:
+        if len(record) < n_columns:
+            break  # truncated trailing row
+        if record[timestamp_position] != last_text:  # consecutive rows usually share a timestamp string
+            last_text = record[timestamp_position]
+            last_ms = parse_timestamp(last_text)
+        if start_ms is not None:
+            if last_ms < start_ms:
+                continue
+            start_ms = None
+        signals = template[:]
+        for i, position in present:
+            signals[i] = _number(record[position])
+        yield (last_ms, *signals, record[fault_position], record[description_position])
+
+
+class CSVLog:
+    """CSV log laid out like obd-II_data.csv, parsed lazily from byte offsets.
+
+    A log whose first line is a row rather than a header is read as CSV_COLUMNS.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as file:
+            header = file.readline()
+        columns = next(csv.reader([header.decode("utf-8-sig")]), [])
+        if columns and _is_timestamp(columns[0]):
+            columns = CSV_COLUMNS  # headerless, like the shipped sample and logs appended to it
+            header = b""
+        self.data_offset = len(header)
+        missing = [name for name in CSV_REQUIRED if name not in columns]
+        if missing:
+            raise ValueError(f"{path} is missing log columns: {', '.join(missing)}")
+        self.columns = columns
+        self.timestamp_position = columns.index("Timestamp")
+        self.index = self._load_index()
+
+    @property
+    def index_path(self):
+        return self.path + ".index.json"
+
+    def _line_timestamp(self, line):
+        return parse_timestamp(next(csv.reader([line.decode("utf-8")]))[self.timestamp_position])
+
+    def _load_index(self):
+        """Read the cached index, extending it if the log grew and rebuilding it if the log was rewritten"""
+        size = os.path.getsize(self.path)
+        try:
+            with open(self.index_path, encoding="utf-8") as file:
+                cached = json.load(file)
+            if cached["version"] != INDEX_VERSION or cached["data_offset"] != self.data_offset:
+                raise ValueError("stale index")
+            index = cached["index"]
+            if cached["size"] == size:
+                return index
+            if cached["size"] > size or (index and not self._entry_matches(index[-1])):
+                raise ValueError("log was rewritten")
+        except (OSError, ValueError, KeyError):
+            index = []
+
+        index = self._extend_index(index, size)
+        try:
+            with open(self.index_path + ".tmp", "w", encoding="utf-8") as file:
+                json.dump({"version": INDEX_VERSION, "size": size, "data_offset": self.data_offset, "index": index}, file)
+            os.replace(self.index_path + ".tmp", self.index_path)
+        except OSError:
+            pass  # read-only location: keep the index in memory only
+        return index
+
+    def _entry_matches(self, entry):
+        with open(self.path, "rb") as file:
+            file.seek(entry[1])
+            line = file.readline()
+        try:
+            return line.endswith(b"\n") and self._line_timestamp(line) == entry[0]
+        except ValueError:
+            return False
+
+    def _extend_index(self, index, size):
+        """Sample one row timestamp every INDEX_STRIDE_BYTES, starting after the last entry"""
+        probe = index[-1][1] + INDEX_STRIDE_BYTES if index else self.data_offset
+        with open(self.path, "rb") as file:
+            while probe < size:
+                if probe > self.data_offset:
+                    file.seek(probe - 1)
+                    file.readline()  # finish the row containing the probe byte
+                else:
+                    file.seek(probe)
+                position = file.tell()
+                line = file.readline()
+                if not line.endswith(b"\n"):
+                    break  # trailing row still being written
+                index.append([self._line_timestamp(line), position])
+                probe = position + INDEX_STRIDE_BYTES
+        return index
+
+    def rows(self, start_ms=None):
+        """Yield ROW_FIELDS tuples from the first row at or after start_ms (default: the beginning)"""
+        offset = self.data_offset if start_ms is None else _seek_position(self.index, start_ms)
+        if offset is None:
+            return
+        with open(self.path, "rb") as raw:
+            raw.seek(offset)
+            yield from _csv_rows(csv.reader(io.TextIOWrapper(raw, encoding="utf-8", newline="")), self.columns,
+                                 start_ms)
+
+
+def _npz_loader(path):
+    """Load .npz members, memory-mapping the ones stored uncompressed (as NpzWriter writes them)"""
+    archive = zipfile.ZipFile(path)
+
+    def load(name):
+        info = archive.getinfo(name + ".npy")
+        if info.compress_type != zipfile.ZIP_STORED:
+            return np.load(archive.open(info))  # compressed members can only be read whole
+        with open(path, "rb") as file:
+            file.seek(info.header_offset + 26)
+            name_length, extra_length = struct.unpack("<HH", file.read(4))
+            file.seek(info.header_offset + 30 + name_length + extra_length)
+            version = np.lib.format.read_magic(file)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(file)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(file)
+            offset = file.tell()
+        if 0 in shape:
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape,
+                         order="F" if fortran_order else "C")
+
+    return load
+
+
+class NumpyLog:
+    """Memory-mapped .npy directory or .npz archive written by exporters.NpyWriter / NpzWriter"""
+
+    def __init__(self, path):
+        if np is None:
+            raise RuntimeError("NumPy is required for .npy/.npz playback")
+        self.path = path
+        if os.path.isfile(path):
+            load = _npz_loader(path)
+        else:
+            def load(name):
+                return np.load(os.path.join(path, name + ".npy"), mmap_mode="r")
+        self.timestamps = load("timestamp_ms")
+        self.signals = load("signals")
+        self.fault_codes = load("fault_code")
+        self.descriptions = load("fault_description")
+        self.fault_names = load("fault_code_categories").tolist()
+        self.description_names = load("fault_description_categories").tolist()
+        stored = load("signal_names").tolist()
+        self.signal_order = [stored.index(name) for name in SIGNAL_NAMES]
+        # A crashed writer may leave columns of different lengths; play the common prefix
+        self.n_rows = min(len(self.timestamps), len(self.signals), len(self.fault_codes), len(self.descriptions))
+        self.index = [[int(self.timestamps[i]), i] for i in range(0, self.n_rows, INDEX_STRIDE_ROWS)]
+
+    def rows(self, start_ms=None):
+        start = 0 if start_ms is None else _seek_position(self.index, start_ms)
+        if start is None:
+            return
+        for first in range(start, self.n_rows, CHUNK_ROWS):
+            last = min(self.n_rows, first + CHUNK_ROWS)
+            timestamps = np.asarray(self.timestamps[first:last])
+            if start_ms is not None:
+                later = np.flatnonzero(timestamps >= start_ms)
+                if not len(later):
+                    continue
+                first += int(later[0])
+                timestamps = timestamps[later[0]:]
+                start_ms = None
+            signals = np.asarray(self.signals[first:last])[:, self.signal_order].tolist()
+            faults = [self.fault_names[code] for code in self.fault_codes[first:last].tolist()]
+            descriptions = [self.description_names[code] for code in self.descriptions[first:last].tolist()]
+            for timestamp, values, fault, description in zip(timestamps.tolist(), signals, faults, descriptions):
+                yield (timestamp, *values, fault, description)
+
+
+class ParquetLog:
+    """Parquet log read one row group at a time; row-group timestamp statistics form the index"""
+
+    def __init__(self, path):
+        if pq is None:
+            raise RuntimeError("pyarrow is required for Parquet playback")
+        self.path = path
+        self.file = pq.ParquetFile(path)
+        names = self.file.schema_arrow.names
+        missing = [name for name in ROW_FIELDS if name not in names]
+        if missing:
+            raise ValueError(f"{path} is missing log columns: {', '.join(missing)}")
+        column = names.index("Timestamp")
+        self.index = []
+        for group in range(self.file.num_row_groups):
+            statistics = self.file.metadata.row_group(group).column(column).statistics
+            if statistics is not None and statistics.has_min_max:
+                first_ms = int(statistics.min_raw)
+            else:
+                first_ms = self._timestamps(group)[0]
+            self.index.append([first_ms, group])
+
+    def _timestamps(self, group):
+        column = self.file.read_row_group(group, columns=["Timestamp"]).column(0)
+        return column.cast(pa.int64()).to_pylist()
+
+    def rows(self, start_ms=None):
+        start = 0 if start_ms is None else _seek_position(self.index, start_ms)
+        if start is None:
+            return
+        for group in range(start, self.file.num_row_groups):
+            table = self.file.read_row_group(group, columns=ROW_FIELDS)
+            columns = [table.column(0).cast(pa.int64()).to_pylist()]
+            columns += [table.column(name).to_pylist() for name in ROW_FIELDS[1:]]
+            for row in zip(*columns):
+                if start_ms is not None:
+                    if row[0] < start_ms:
+                        continue
+                    start_ms = None
+                yield row
+
+
+class ShardedLog:
+    """Directory of CSV shards written by exporters.ShardedWriter, read through its shards.json manifest.
+
+    Only finished shards are listed, so a directory that is still being
+    written can be read safely.  select() picks the shards overlapping a time
+    range, e.g. to hand them to parallel jobs that each call shard_rows().
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, SHARD_MANIFEST), encoding="utf-8") as file:
+            manifest = json.load(file)
+        if manifest.get("version") != SHARD_VERSION:
+            raise ValueError(f"Unsupported shard manifest version: {manifest.get('version')}")
+        self.shards = manifest["shards"]
+        self.index = [[shard["start_ms"], i] for i, shard in enumerate(self.shards)]
+
+    def select(self, start_ms=None, end_ms=None):
+        """Manifest entries of the shards holding rows between start_ms and end_ms (inclusive)"""
+        return [shard for shard in self.shards if (start_ms is None or shard["end_ms"] >= start_ms)
+                and (end_ms is None or shard["start_ms"] <= end_ms)]
+
+    def _open(self, shard):
+        path = os.path.join(self.path, shard["file"])
+        if path.endswith(".zst"):
+            if zstandard is None:
+                raise RuntimeError("zstd shards require zstandard: pip install zstandard")
+            raw = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+        elif path.endswith(".gz"):
+            raw = gzip.open(path, "rb")
+        else:
+            raw = open(path, "rb")
+        return io.TextIOWrapper(raw, encoding="utf-8", newline="")
+
+    def shard_rows(self, shard, start_ms=None):
+        """ROW_FIELDS tuples of one shard, from the first at or after start_ms"""
+        with self._open(shard) as text:
+            records = csv.reader(text)
+            columns = next(records, None)
+            if columns is None:
+                return
+            columns[0] = columns[0].lstrip("\ufeff")
+            yield from _csv_rows(records, columns, start_ms)
+
+    def rows(self, start_ms=None):
+        for shard in self.select(start_ms):
+            yield from self.shard_rows(shard, start_ms)
+
+
+LOG_READERS = {
+    "csv": CSVLog,
+    "shards": ShardedLog,
+    "parquet": ParquetLog,
+    "npy": NumpyLog,
+    "npz": NumpyLog,
+}
+
+
+def open_log(path, format=None):
+    """Open a recorded log for playback, inferring the format like exporters.open_exporter"""
+    if format is None and os.path.isfile(path) and path.lower().endswith(".npy"):
+        path = os.path.dirname(path) or "."  # a column picked from an .npy export directory
+    format = format or infer_format(path)
+    if format not in LOG_READERS:
+        raise ValueError(f"Unknown log format: {format}")
+    return LOG_READERS[format](path)
+
+
+def play(rows, emit, mode="realtime", speedup=1.0, stop_event=None):
+    """Call emit(row) for every row, paced by the recorded timestamps, and return the row count.
+
+    realtime keeps the original spacing, accelerated divides it by speedup and
+    freerun emits as fast as possible.  A backwards timestamp jump (the next
+    run of a multi-run dataset) restarts the pacing instead of bursting.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown playback mode: {mode}")
+    scale = 0.0 if mode == "freerun" else 1 / (1000 * (speedup if mode == "accelerated" else 1.0))
+    count = 0
+    first_ms = previous_ms = None
+    for row in rows:
+        if stop_event is not None and stop_event.is_set():
+            break
+        if scale:
+            if first_ms is None or row[0] < previous_ms:
+                first_ms = row[0]
+                wall_start = time.perf_counter()
+            delay = wall_start + (row[0] - first_ms) * scale - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            previous_ms = row[0]
+        emit(row)
+        count += 1
+    return count
+
+
+class LogEngine:
+    """Stand-in for SimulationEngine whose step() advances through a recorded log.
+
+    Lets the ELM327 emulator (or anything else that drives an engine) serve
+    recorded data; the log restarts from start_ms when it runs out if loop is set.
+    """
+
+    def __init__(self, log, start_ms=None, loop=True):
+        self.log = log
+        self.start_ms = start_ms
+        self.loop = loop
+        self.sensor_data = generate_initial_data()
+        self.selected_fault = self.sensor_data["Fault Code"]
+        self.selected_situation = ""
+        self.timestamp_ms = None
+        self._rows = log.rows(start_ms)
+
+    def step(self):
+        row = next(self._rows, None)
+        if row is None and self.loop:
+            self._rows = self.log.rows(self.start_ms)
+            row = next(self._rows, None)
+        if row is not None:
+            self.load_row(row)
+        return self.sensor_data
+
+    def present_faults(self):
+        return [self.selected_fault]
+
+    def load_row(self, row):
+        """Show a ROW_FIELDS tuple as the current sensor data"""
+        self.timestamp_ms = row[0]
+        self.sensor_data.update(zip(SIGNAL_NAMES, row[1:-2]))
+        self.sensor_data["Fault Code"] = self.selected_fault = row[-2]
+        self.selected_situation = row[-1]
+
+    def row(self, timestamp_ms=None):
+        data = self.sensor_data
+        return (self.timestamp_ms if timestamp_ms is None else timestamp_ms,
+                *[data[name] for name in SIGNAL_NAMES], self.selected_fault, self.selected_situation)
@@ -0,0 +1,529 @@
+"""Pub/sub telemetry server: live ticks fanned out over WebSocket and MQTT 3.1.1.
+
+Topics are obd/<vehicle>/all (every signal), obd/<vehicle>/<signal>
+(e.g. obd/3/engine_rpm, see SIGNAL_TOPICS), obd/<vehicle>/fault (on change)
+and obd/fleet (whole fleet frames).  Subscriptions use MQTT filters with the
++ and # wildcards.  MQTT clients such as mosquitto_sub or paho connect to the
+MQTT port directly: CONNECT, SUBSCRIBE, UNSUBSCRIBE, PINGREQ and DISCONNECT
+are supported, and everything is delivered at QoS 0.  WebSocket clients send
+{"subscribe": [filters]} / {"unsubscribe": [filters]} text messages or
+connect to /?subscribe=FILTER.  Each binary message they receive is a
+big-endian uint16 topic length, the topic and the payload.  bridge() forwards
+the same messages to an external MQTT broker.
+
+Producers call publish() / publish_fleet() from any thread; that only
+appends to a deque.  Every flush interval the server turns the buffered ticks
+of each vehicle into one message per subscribed topic.  Each message is
+encoded once and framed once per protocol, and the same bytes go to every
+subscriber.  Payloads are ENCODINGS: "struct" (see STRUCT_HEADER) or
+"msgpack" (needs msgpack).  Each client has a bounded queue that drops its
+oldest message when a slow consumer falls behind, so one stalled client never
+holds up the others or the simulation.
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import re
+import struct
+import threading
+from array import array
+from collections import deque
+from urllib.parse import parse_qs, urlparse
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+from schema import N_SIGNALS, SIGNAL_NAMES
+
+TOPIC_ROOT = "obd"
+FLEET_TOPIC = f"{TOPIC_ROOT}/fleet"
+ENCODINGS = ("struct", "msgpack")
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_WS_PORT = 8765
+DEFAULT_MQTT_PORT = 1883
+FLUSH_INTERVAL_S = 0.02  # Latency bound: buffered ticks are batched into one message per topic this often
+MAX_BATCH_TICKS = 100
+QUEUE_LIMIT = 16_384  # Messages queued per client before the oldest are dropped
+PENDING_LIMIT = 100_000  # Published ticks awaiting a flush before the oldest are dropped
+WRITE_BATCH = 256  # Messages joined into one socket write
+WS_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+# Signal -> topic level, e.g. "Coolant Temp (°C)" -> "coolant_temp"
+SIGNAL_TOPICS = [re.sub(r"[^a-z0-9]+", "_", name.split(" (")[0].lower()).strip("_") for name in SIGNAL_NAMES]
+
+# struct payload: version, ticks, signals, vehicles; then one uint8 Signal index per signal, int64 epoch-ms
+# timestamps and float32 values ordered ticks x vehicles x signals
+STRUCT_VERSION = 1
+STRUCT_HEADER = struct.Struct("<BHHI")
+ALL_SIGNALS = bytes(range(N_SIGNALS))
+
+
+def topic_matches(topic_filter, topic):
+    """MQTT topic filter matching with + (one level) and # (all remaining levels)"""
+    filter_levels, levels = topic_filter.split("/"), topic.split("/")
+    for index, level in enumerate(filter_levels):
+        if level == "#":
+            return True
+        if index >= len(levels) or (level != "+" and level != levels[index]):
+            return False
+    return len(filter_levels) == len(levels)
+
+
+def encode_struct(timestamps, values, signals=ALL_SIGNALS, vehicles=1):
+    """Pack a batch: values is a flat sequence, or any buffer of float32 (e.g. a NumPy array)"""
+    if not isinstance(values, (list, tuple)):
+        values = memoryview(values).cast("B")
+    else:
+        values = array("f", values)
+    return b"".join((STRUCT_HEADER.pack(STRUCT_VERSION, len(timestamps), len(signals), vehicles), signals,
+                     array("q", timestamps).tobytes(), values))
+
+
+def decode_struct(payload):
+    """(timestamps, Signal indexes, vehicles, flat values) of a struct payload"""
+    version, n_ticks, n_signals, vehicles = STRUCT_HEADER.unpack_from(payload)
+    if version != STRUCT_VERSION:
+        raise ValueError(f"Unsupported struct payload version: {version}")
+    offset = STRUCT_HEADER.size
+    signals = list(payload[offset:offset + n_signals])
+    offset += n_signals
+    timestamps = array("q", payload[offset:offset + 8 * n_ticks]).tolist()
+    offset += 8 * n_ticks
+    return timestamps, signals, vehicles, array("f", payload[offset:]).tolist()
+
+
+def _varint(value):
+    if value < 128:
+        return bytes((value,))
+    out = bytearray()
+    while True:
+        value, digit = divmod(value, 128)
+        out.append(digit | (0x80 if value else 0))
+        if not value:
+            return bytes(out)
+
+
+def mqtt_publish(topic, payload):
+    """QoS 0 PUBLISH packet"""
+    topic = topic.encode()
+    return b"".join((b"\x30", _varint(2 + len(topic) + len(payload)), struct.pack(">H", len(topic)), topic, payload))
+
+
+def ws_frame(data, opcode=0x2):
+    """Unmasked, unfragmented server-to-client WebSocket frame"""
+    size = len(data)
+    if size < 126:
+        header = struct.pack(">BB", 0x80 | opcode, size)
+    elif size < 1 << 16:
+        header = struct.pack(">BBH", 0x80 | opcode, 126, size)
+    else:
+        header = struct.pack(">BBQ", 0x80 | opcode, 127, size)
+    return header + data
+
+
+def ws_message(topic, payload):
+    topic = topic.encode()
+    return ws_frame(b"".join((struct.pack(">H", len(topic)), topic, payload)))
+
+
+FRAMERS = {"mqtt": mqtt_publish, "ws": ws_message}
+
+
+class Client:
+    """One subscriber: its filters and a bounded queue that drops the oldest message when full"""
+
+    def __init__(self, protocol, writer, queue_limit=QUEUE_LIMIT):
+        self.protocol = protocol
+        self.writer = writer
+        self.filters = set()
+        self.queue = deque(maxlen=queue_limit)
+        self.ready = asyncio.Event()
+        self.sent = 0
+        self.dropped = 0
+
+    def put(self, packets):
+        """Queue one flush's messages, dropping the oldest queued ones beyond the limit"""
+        overflow = len(self.queue) + len(packets) - self.queue.maxlen
+        if overflow > 0:
+            self.dropped += overflow
+        self.queue.extend(packets)
+        self.ready.set()
+
+    async def send_forever(self):
+        """Write queued messages in batches until the connection fails"""
+        queue, writer = self.queue, self.writer
+        while True:
+            await self.ready.wait()
+            self.ready.clear()
+            while queue:
+                chunk = [queue.popleft() for _ in range(min(len(queue), WRITE_BATCH))]
+                writer.write(b"".join(chunk))
+                self.sent += len(chunk)
+                await writer.drain()
+
+
+class TelemetryHub:
+    """Buffers published ticks and fans batched messages out to WebSocket and MQTT subscribers"""
+
+    def __init__(self, encoding="struct", queue_limit=QUEUE_LIMIT, flush_interval=FLUSH_INTERVAL_S,
+                 max_batch_ticks=MAX_BATCH_TICKS):
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unknown encoding: {encoding}")
+        if encoding == "msgpack" and msgpack is None:
+            raise RuntimeError("msgpack encoding requires msgpack: pip install msgpack")
+        self.encoding = encoding
+        self.queue_limit = queue_limit
+        self.flush_interval = flush_interval
+        self.max_batch_ticks = max_batch_ticks
+        self.clients = set()
+        self.messages = 0  # Messages encoded
+        self.deliveries = 0  # Messages queued to clients
+        self.dropped_ticks = 0  # Published ticks lost because the flush fell behind
+        self._closed = [0, 0]  # Messages sent to and dropped for clients that have disconnected
+        self._pending = deque(maxlen=PENDING_LIMIT)  # (vehicle, row) and (None, (timestamps, fleet values))
+        self._faults = {}  # vehicle -> last published (fault code, description)
+        self._routes = {}  # topic -> subscribed clients, cleared when subscriptions change
+        self._plans = {}  # vehicle -> [(topic, signal index or None, clients)]
+        self._outbox = {}  # client -> packets of the flush in progress
+        self._servers = []
+        self._flusher = self._bridge = None
+
+    # Producer side (any thread)
+
+    def publish(self, vehicle, row):
+        """Queue one ROW_FIELDS row of a vehicle"""
+        if len(self._pending) == PENDING_LIMIT:
+            self.dropped_ticks += 1
+        self._pending.append((vehicle, row))
+
+    def publish_fleet(self, timestamps, values):
+        """Queue fleet frames: a (vehicles, ticks, N_SIGNALS) float32 array and its ticks' epoch-ms timestamps"""
+        if len(self._pending) == PENDING_LIMIT:
+            self.dropped_ticks += 1
+        self._pending.append((None, (list(timestamps), values)))
+
+    # Subscriptions
+
+    def subscribe(self, client, topic_filter):
+        client.filters.add(topic_filter)
+        self._routes.clear()
+        self._plans.clear()
+
+    def unsubscribe(self, client, topic_filter):
+        client.filters.discard(topic_filter)
+        self._routes.clear()
+        self._plans.clear()
+
+    def _clients(self, topic):
+        clients = self._routes.get(topic)
+        if clients is None:
+            clients = self._routes[topic] = [client for client in self.clients
+                                              if any(topic_matches(f, topic) for f in client.filters)]
+        return clients
+
+    def _plan(self, vehicle):
+        """Subscribed per-vehicle topics as (topic, Signal index or None for all, clients)"""
+        plan = self._plans.get(vehicle)
+        if plan is None:
+            prefix = f"{TOPIC_ROOT}/{vehicle}/"
+            plan = [(prefix + "all", None, self._clients(prefix + "all"))]
+            plan += [(prefix + name, index, self._clients(prefix + name)) for index, name in enumerate(SIGNAL_TOPICS)]
+            plan = self._plans[vehicle] = [entry for entry in plan if entry[2]]
+        return plan
+
+    # Fan-out (event loop)
+
+    def _send(self, topic, payload, clients):
+        """Frame a message once per protocol and add it to each client's outbox for this flush"""
+        packets, outbox = {}, self._outbox
+        for client in clients:
+            packet = packets.get(client.protocol)
+            if packet is None:
+                packet = packets[client.protocol] = FRAMERS[client.protocol](topic, payload)
+            box = outbox.get(client)
+            if box is None:
+                box = outbox[client] = []
+            box.append(packet)
+        self.messages += 1
+        self.deliveries += len(clients)
+
+    def _encode(self, vehicle, timestamps, values, signals):
+        """values: ticks x len(signals) flat floats"""
+        if self.encoding == "struct":
+            return encode_struct(timestamps, values, bytes(signals) if signals is not None else ALL_SIGNALS)
+        names = SIGNAL_NAMES if signals is None else [SIGNAL_NAMES[index] for index in signals]
+        width = len(names)
+        rows = [values[start:start + width] for start in range(0, len(values), width)]
+        return msgpack.packb({"vehicle": vehicle, "t": timestamps, "signals": names, "values": rows})
+
+    def flush(self):
+        """Encode and queue one message per subscribed topic for everything published since the last flush"""
+        pending, rows = self._pending, {}
+        fleets = []
+        while pending:
+            vehicle, item = pending.popleft()
+            if vehicle is None:
+                fleets.append(item)
+            else:
+                rows.setdefault(vehicle, []).append(item)
+        for vehicle, batch in rows.items():
+            self._flush_fault(vehicle, batch[-1])
+            for start in range(0, len(batch), self.max_batch_ticks):
+                self._flush_rows(vehicle, batch[start:start + self.max_batch_ticks])
+        if fleets:
+            import numpy as np  # publish_fleet() callers already hold NumPy arrays
+
+            # Consecutive frames of the same fleet are sent as one batch
+            for start in range(0, len(fleets), self.max_batch_ticks):
+                chunk = fleets[start:start + self.max_batch_ticks]
+                if all(values.shape[0] == chunk[0][1].shape[0] for _, values in chunk):
+                    self._flush_fleet([t for timestamps, _ in chunk for t in timestamps],
+                                      np.concatenate([values for _, values in chunk], axis=1))
+                else:
+                    for timestamps, values in chunk:
+                        self._flush_fleet(timestamps, values)
+        outbox, self._outbox = self._outbox, {}
+        for client, packets in outbox.items():
+            client.put(packets)
+
+    def _flush_rows(self, vehicle, batch):
+        plan = self._plan(vehicle)
+        if not plan:
+            return
+        timestamps = [row[0] for row in batch]
+        for topic, signal, clients in plan:
+            if signal is None:
+                values = [value for row in batch for value in row[1:1 + N_SIGNALS]]
+                self._send(topic, self._encode(vehicle, timestamps, values, None), clients)
+            else:
+                values = [row[1 + signal] for row in batch]
+                self._send(topic, self._encode(vehicle, timestamps, values, (signal,)), clients)
+
+    def _flush_fault(self, vehicle, row):
+        fault = (row[-2], row[-1])
+        if self._faults.get(vehicle) == fault:
+            return
+        self._faults[vehicle] = fault
+        topic = f"{TOPIC_ROOT}/{vehicle}/fault"
+        clients = self._clients(topic)
+        if clients:
+            message = {"vehicle": vehicle, "t": row[0], "fault": fault[0], "description": fault[1]}
+            payload = msgpack.packb(message) if self.encoding == "msgpack" else json.dumps(message).encode()
+            self._send(topic, payload, clients)
+
+    def _flush_fleet(self, timestamps, values):
+        clients = self._clients(FLEET_TOPIC)
+        if clients:
+            n_vehicles = values.shape[0]
+            frames = values.transpose(1, 0, 2)  # ticks x vehicles x signals
+            if self.encoding == "struct":
+                payload = encode_struct(timestamps, frames.astype("<f4", copy=False).tobytes(), vehicles=n_vehicles)
+            else:
+                payload = msgpack.packb({"t": timestamps, "signals": SIGNAL_NAMES, "values": frames.tolist()})
+            self._send(FLEET_TOPIC, payload, clients)
+        # Per-vehicle topics only for the fleet vehicles someone subscribed to
+        for vehicle in range(values.shape[0]):
+            plan = self._plan(vehicle)
+            if plan:
+                block = values[vehicle]
+                for topic, signal, subscribers in plan:
+                    column = block.reshape(-1).tolist() if signal is None else block[:, signal].tolist()
+                    self._send(topic, self._encode(vehicle, timestamps, column, None if signal is None else (signal,)),
+                               subscribers)
+
+    async def _flush_forever(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self.flush()
+
+    # Servers
+
+    async def start(self, host=DEFAULT_HOST, ws_port=DEFAULT_WS_PORT, mqtt_port=DEFAULT_MQTT_PORT, broker=None):
+        """Start the listeners (a port of None disables that protocol), the flush task and a bridge to broker"""
+        if broker is not None:
+            broker_host, _, broker_port = broker.partition(":")
+            self._bridge = await self.bridge(broker_host, int(broker_port or DEFAULT_MQTT_PORT))
+        if ws_port is not None:
+            self._servers.append(await asyncio.start_server(self._serve_ws, host, ws_port, backlog=1024))
+        if mqtt_port is not None:
+            self._servers.append(await asyncio.start_server(self._serve_mqtt, host, mqtt_port, backlog=1024))
+        self._flusher = asyncio.ensure_future(self._flush_forever())
+        return self._servers
+
+    def start_in_thread(self, **kwargs):
+        """Run the servers on a daemon thread's event loop, e.g. next to the Qt dashboard"""
+        started, failure = threading.Event(), []
+
+        def run():
+            loop = asyncio.new_event_loop()
+            try:
+                loop.run_until_complete(self.start(**kwargs))
+            except (OSError, ConnectionError) as error:
+                failure.append(error)
+                return
+            finally:
+                started.set()
+            loop.run_forever()
+
+        threading.Thread(target=run, name="TelemetryHub", daemon=True).start()
+        started.wait()
+        if failure:
+            raise failure[0]
+
+    async def _run_client(self, client, reader, handle):
+        self.clients.add(client)
+        sender = asyncio.ensure_future(client.send_forever())
+        try:
+            await handle(client, reader)
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError, struct.error):
+            pass
+        finally:
+            sender.cancel()
+            self.clients.discard(client)
+            self._closed[0] += client.sent
+            self._closed[1] += client.dropped
+            self._routes.clear()
+            self._plans.clear()
+            client.writer.close()
+
+    async def _serve_mqtt(self, reader, writer):
+        await self._run_client(Client("mqtt", writer, self.queue_limit), reader, self._handle_mqtt)
+
+    async def _handle_mqtt(self, client, reader):
+        while True:
+            kind, body = await _read_mqtt_packet(reader)
+            if kind == 1:  # CONNECT
+                level = body[2 + struct.unpack(">H", body[:2])[0]]
+                if level not in (3, 4):
+                    client.writer.write(b"\x20\x02\x00\x01")  # unacceptable protocol version
+                    return
+                client.writer.write(b"\x20\x02\x00\x00")
+            elif kind == 8:  # SUBSCRIBE
+                packet_id, filters = body[:2], _mqtt_filters(body[2:], with_qos=True)
+                for topic_filter in filters:
+                    self.subscribe(client, topic_filter)
+                client.writer.write(b"\x90" + _varint(2 + len(filters)) + packet_id + b"\x00" * len(filters))
+            elif kind == 10:  # UNSUBSCRIBE
+                for topic_filter in _mqtt_filters(body[2:], with_qos=False):
+                    self.unsubscribe(client, topic_filter)
+                client.writer.write(b"\xb0\x02" + body[:2])
+            elif kind == 12:  # PINGREQ
+                client.writer.write(b"\xd0\x00")
+            elif kind == 14:  # DISCONNECT
+                return
+            # Client PUBLISH is accepted and ignored: the simulator is the only source
+
+    async def _serve_ws(self, reader, writer):
+        await self._run_client(Client("ws", writer, self.queue_limit), reader, self._handle_ws)
+
+    async def _handle_ws(self, client, reader):
+        request = await reader.readuntil(b"\r\n\r\n")
+        lines = request.decode("latin-1").split("\r\n")
+        headers = {key.strip().lower(): value.strip() for key, _, value in (line.partition(":") for line in lines[1:])}
+        key = headers.get("sec-websocket-key")
+        if key is None:
+            client.writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n")
+            return
+        accept = base64.b64encode(hashlib.sha1(key.encode() + WS_GUID).digest()).decode()
+        client.writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                             f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+        path = lines[0].split(" ")[1] if " " in lines[0] else "/"
+        for topic_filter in parse_qs(urlparse(path).query).get("subscribe", ()):
+            self.subscribe(client, topic_filter)
+        while True:
+            opcode, data = await _read_ws_frame(reader)
+            if opcode == 0x1:  # text: subscription commands
+                command = json.loads(data)
+                for topic_filter in command.get("subscribe", ()):
+                    self.subscribe(client, topic_filter)
+                for topic_filter in command.get("unsubscribe", ()):
+                    self.unsubscribe(client, topic_filter)
+            elif opcode == 0x8:  # close
+                client.writer.write(ws_frame(data[:2], 0x8))
+                return
+            elif opcode == 0x9:  # ping
+                client.writer.write(ws_frame(data, 0xA))
+
+    async def bridge(self, host, port=DEFAULT_MQTT_PORT, filters=(f"{TOPIC_ROOT}/#",), client_id="obd-simulator",
+                     keepalive_s=60):
+        """Connect to an external MQTT broker; returns a task forwarding matching messages until it disconnects"""
+        reader, writer = await self._open_bridge(host, port, client_id, keepalive_s)
+        client = Client("mqtt", writer, self.queue_limit)
+
+        async def ping():
+            while True:
+                await asyncio.sleep(keepalive_s / 2)
+                writer.write(b"\xc0\x00")  # PINGREQ
+
+        async def keepalive(client, reader):
+            pinger = asyncio.ensure_future(ping())
+            try:
+                while True:
+                    await _read_mqtt_packet(reader)  # PINGRESP
+            finally:
+                pinger.cancel()
+
+        for topic_filter in filters:
+            self.subscribe(client, topic_filter)
+        return asyncio.ensure_future(self._run_client(client, reader, keepalive))
+
+    async def _open_bridge(self, host, port, client_id, keepalive_s):
+        reader, writer = await asyncio.open_connection(host, port)
+        name = client_id.encode()
+        body = b"\x00\x04MQTT\x04\x02" + struct.pack(">H", keepalive_s) + struct.pack(">H", len(name)) + name
+        writer.write(b"\x10" + _varint(len(body)) + body)  # CONNECT, MQTT 3.1.1, clean session
+        kind, reply = await _read_mqtt_packet(reader)
+        if kind != 2 or reply[1] != 0:
+            writer.close()
+            raise ConnectionError(f"MQTT broker {host}:{port} refused the connection (CONNACK {reply.hex()})")
+        return reader, writer
+
+    def stats(self):
+        return {
+            "clients": len(self.clients), "messages": self.messages, "deliveries": self.deliveries,
+            "sent": self._closed[0] + sum(client.sent for client in self.clients),
+            "dropped": self._closed[1] + sum(client.dropped for client in self.clients),
+            "dropped_ticks": self.dropped_ticks,
+        }
+
+
+async def _read_mqtt_packet(reader):
+    """(packet type, body) of the next MQTT control packet"""
+    first = (await reader.readexactly(1))[0]
+    length, shift = 0, 0
+    while True:
+        digit = (await reader.readexactly(1))[0]
+        length += (digit & 0x7F) << shift
+        if not digit & 0x80:
+            break
+        shift += 7
+        if shift > 21:
+            raise ValueError("Malformed MQTT remaining length")
+    return first >> 4, await reader.readexactly(length)
+
+
+def _mqtt_filters(body, with_qos):
+    filters, offset = [], 0
+    while offset < len(body):
+        size = struct.unpack_from(">H", body, offset)[0]
+        filters.append(body[offset + 2:offset + 2 + size].decode())
+        offset += 2 + size + (1 if with_qos else 0)
+    return filters
+
+
+async def _read_ws_frame(reader):
+    """(opcode, unmasked payload) of the next client frame; fragments are not supported"""
+    first, second = await reader.readexactly(2)
+    size = second & 0x7F
+    if size == 126:
+        size = struct.unpack(">H", await reader.readexactly(2))[0]
+    elif size == 127:
+        size = struct.unpack(">Q", await reader.readexactly(8))[0]
+    mask = await reader.readexactly(4) if second & 0x80 else None
+    data = await reader.readexactly(size)
+    if mask:
+        data = bytes(byte ^ mask[index % 4] for index, byte in enumerate(data))
+    return first & 0x0F, data
@@ -0,0 +1,73 @@
+"""Run manifests and seeded replay of whole runs or time slices.
+
+A manifest is a small JSON file next to a dataset holding, per run, the
+engine seed, the simulated clock and the engine's control timeline and
+block checkpoints.  replay() restores the checkpoint at or before the
+requested start tick, so regenerating an hour of a multi-day run costs at
+most one SEED_BLOCK_TICKS block of extra simulation.
+"""
+import bisect
+import json
+import os
+
+from engine import SimulationEngine
+from scheduler import SimClock
+
+MANIFEST_VERSION = 1
+
+
+def manifest_path(output):
+    """Manifest location for a dataset path"""
+    return output.rstrip(os.sep) + ".manifest.json"
+
+
+def run_manifest(engine, clock, **info):
+    """Manifest entry for one engine run stamped by a scheduler.SimClock"""
+    return {**info, "start_ms": clock.start_ms, "rate_hz": 1_000_000 / clock.period_us, **engine.manifest()}
+
+
+def write_manifest(path, runs, **info):
+    """Atomically write a manifest holding every run of a dataset"""
+    with open(path + ".tmp", "w", encoding="utf-8") as file:
+        json.dump({"version": MANIFEST_VERSION, **info, "runs": runs}, file)
+    os.replace(path + ".tmp", path)
+
+
+def load_manifest(path):
+    with open(path, encoding="utf-8") as file:
+        manifest = json.load(file)
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"Unsupported manifest version: {manifest.get('version')}")
+    return manifest
+
+
+def tick_at(run, timestamp_ms):
+    """First tick of run stamped at or after timestamp_ms"""
+    clock = SimClock(run["rate_hz"], run["start_ms"])
+    return max(0, -(-(timestamp_ms - clock.start_ms) * 1000 // clock.period_us))
+
+
+def replay(run, start_tick=0, stop_tick=None):
+    """Yield the ROW_FIELDS rows of ticks [start_tick, stop_tick) exactly as the run produced them"""
+    stop_tick = run["ticks"] if stop_tick is None else min(stop_tick, run["ticks"])
+    checkpoints = run["checkpoints"]
+    checkpoint = checkpoints[bisect.bisect_right([c["tick"] for c in checkpoints], start_tick) - 1]
+    engine = SimulationEngine(
+        physics=run["physics"], seed=run["seed"], block_ticks=run["block_ticks"], noise=run.get("noise"),
+    )
+    engine.restore(checkpoint)
+    clock = SimClock(run["rate_hz"], run["start_ms"])
+    clock.ticks = engine.tick
+
+    timeline = run["timeline"]
+    event = bisect.bisect_right([entry["tick"] for entry in timeline], engine.tick) - 1
+    engine.apply_controls(timeline[event])
+    event += 1
+    while engine.tick < stop_tick:
+        if event < len(timeline) and timeline[event]["tick"] == engine.tick:
+            engine.apply_controls(timeline[event])
+            event += 1
+        engine.step()
+        if clock.ticks >= start_tick:
+            yield engine.row(clock.now_ms)
+        clock.advance()
@@ -0,0 +1,93 @@
+"""Simulated clock and tick scheduler: real-time, accelerated and free-run modes"""
+import time
+from datetime import datetime
+
+MODES = ("realtime", "accelerated", "freerun")
+
+
+def now_ms():
+    """Current wall-clock time as int64 epoch milliseconds"""
+    return time.time_ns() // 1_000_000
+
+
+def format_timestamp(timestamp_ms):
+    """Render epoch milliseconds as 'YYYY-MM-DD HH:MM:SS.mmm' local time"""
+    return datetime.fromtimestamp(timestamp_ms / 1000).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+
+
+def parse_timestamp(text):
+    """Parse 'YYYY-MM-DD HH:MM:SS[.mmm]' (or any ISO format) local time to epoch milliseconds"""
+    return round(datetime.fromisoformat(text).timestamp() * 1000)
+
+
+class SimClock:
+    """Simulated time advancing a fixed period per tick, in integer microseconds to avoid drift"""
+
+    def __init__(self, rate_hz=1.0, start_ms=None):
+        self.start_ms = now_ms() if start_ms is None else int(start_ms)
+        self.period_us = round(1_000_000 / rate_hz)
+        self.ticks = 0
+
+    @property
+    def dt(self):
+        """Simulated seconds per tick"""
+        return self.period_us / 1_000_000
+
+    @property
+    def now_ms(self):
+        return self.start_ms + self.ticks * self.period_us // 1000
+
+    def advance(self):
+        self.ticks += 1
+        return self.now_ms
+
+
+class Scheduler:
+    """Drive a tick callback from a SimClock.
+
+    realtime runs at rate_hz against the wall clock (e.g. 10-100 Hz to match
+    OBD polling), accelerated runs speedup times faster than real time, and
+    freerun produces ticks as fast as the CPU allows.  Every mode stamps ticks
+    with simulated time, so an 8-hour drive in freerun takes seconds.  Wall
+    deadlines are absolute, so late ticks never accumulate drift; ticks that
+    start more than one period late are counted in late_ticks.
+    """
+
+    def __init__(self, mode="realtime", rate_hz=1.0, speedup=1.0, start_ms=None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown scheduler mode: {mode}")
+        if rate_hz <= 0 or speedup <= 0:
+            raise ValueError("rate_hz and speedup must be positive")
+        self.mode = mode
+        self.rate_hz = rate_hz
+        self.speedup = speedup if mode == "accelerated" else 1.0
+        self.clock = SimClock(rate_hz, start_ms)
+        self.late_ticks = 0
+
+    @property
+    def wall_period(self):
+        """Wall-clock seconds between ticks (0 in freerun)"""
+        if self.mode == "freerun":
+            return 0.0
+        return self.clock.dt / self.speedup
+
+    def run(self, tick, n_ticks=None, duration_s=None, stop_event=None):
+        """Call tick(timestamp_ms) until n_ticks / duration_s of simulated time elapse or stop_event is set"""
+        if duration_s is not None:
+            n_ticks = round(duration_s * self.rate_hz)
+        wall_period = self.wall_period
+        start = time.perf_counter()
+        done = 0
+        while n_ticks is None or done < n_ticks:
+            if stop_event is not None and stop_event.is_set():
+                break
+            if wall_period:
+                delay = start + done * wall_period - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                elif -delay > wall_period:
+                    self.late_ticks += 1
+            tick(self.clock.now_ms)
+            self.clock.advance()
+            done += 1
+        return done
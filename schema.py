@@ -0,0 +1,157 @@
+"""Fixed signal schema and compact packed frames for logged samples.
+
+Signal numbers every sensor signal; SIGNALS holds its display name, unit,
+(low, high) bounds and resolution in decimals.  Signals with clamp=True are
+held inside their bounds by the engine every tick.
+
+A logged sample is packed into a FRAME record: int64 epoch-ms timestamp,
+one float32 per signal and uint16 indexes into a Labels table for the fault
+code and description.  That is 108 bytes per sample, against ~640 bytes for
+a tuple of Python floats and 2-3 KB for a dict keyed by display names, and
+packing it is a single struct call.  Display names and values rounded back
+to each signal's resolution only reappear when FrameBlock.rows() decodes a
+block for a writer or a UI.
+"""
+import struct
+from collections import namedtuple
+from enum import IntEnum
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class Signal(IntEnum):
+    ENGINE_RPM = 0
+    COOLANT_TEMP = 1
+    FUEL_PRESSURE = 2
+    O2_VOLTAGE = 3
+    CATALYST_TEMP = 4
+    EGR_FLOW = 5
+    SHORT_TERM_FUEL_TRIM = 6
+    LONG_TERM_FUEL_TRIM = 7
+    EVAP_PRESSURE = 8
+    TRANSMISSION_TEMP = 9
+    FUEL_LEVEL = 10
+    AMBIENT_TEMP = 11
+    OIL_PRESSURE = 12
+    BRAKE_PEDAL = 13
+    STEERING_ANGLE = 14
+    TIRE_PRESSURE = 15
+    ALTERNATOR_OUTPUT = 16
+    INJECTOR_PULSE_WIDTH = 17
+    KNOCK_VOLTAGE = 18
+    WHEEL_SPEED = 19
+    CLUTCH_PEDAL = 20
+    EXHAUST_GAS_TEMP = 21
+    BATTERY_VOLTAGE = 22
+    ELECTRICAL_LOAD = 23
+
+
+SignalSpec = namedtuple("SignalSpec", "name unit low high decimals clamp")
+
+# Indexed by Signal
+SIGNALS = (
+    SignalSpec("Engine RPM", "rpm", 0, 8000, 0, False),
+    SignalSpec("Coolant Temp (°C)", "°C", 70, 120, 1, True),
+    SignalSpec("Fuel Pressure (kPa)", "kPa", 0, 6000, 0, False),
+    SignalSpec("O2 Sensor Voltage (V)", "V", 0, 1.1, 2, False),
+    SignalSpec("Catalyst Temp (°C)", "°C", 400, 800, 1, True),
+    SignalSpec("EGR Flow (%)", "%", 0, 20, 1, True),
+    SignalSpec("Short Term Fuel Trim (%)", "%", -10, 10, 1, True),
+    SignalSpec("Long Term Fuel Trim (%)", "%", -5, 5, 1, True),
+    SignalSpec("Evap System Vapor Pressure (kPa)", "kPa", -5, 5, 2, True),
+    SignalSpec("Transmission Temp (°C)", "°C", 70, 110, 1, True),
+    SignalSpec("Fuel Level (%)", "%", 0, 100, 2, True),
+    SignalSpec("Ambient Air Temp (°C)", "°C", -40, 60, 1, False),
+    SignalSpec("Oil Pressure (psi)", "psi", 20, 60, 1, True),
+    SignalSpec("Brake Pedal Position (%)", "%", 0, 100, 0, False),
+    SignalSpec("Steering Angle (°)", "°", -180, 180, 1, True),
+    SignalSpec("Tire Pressure (psi)", "psi", 28, 35, 1, True),
+    SignalSpec("Alternator Output (V)", "V", 0, 16, 2, False),
+    SignalSpec("Fuel Injector Pulse Width (ms)", "ms", 1, 10, 2, True),
+    SignalSpec("Knock Sensor Voltage (V)", "V", 0, 5, 2, True),
+    SignalSpec("Wheel Speed (km/h)", "km/h", 0, 250, 1, True),
+    SignalSpec("Clutch Pedal Position (%)", "%", 0, 100, 0, True),
+    SignalSpec("Exhaust Gas Temp (°C)", "°C", 200, 1000, 1, True),
+    SignalSpec("Battery Voltage (V)", "V", 0, 16, 2, False),
+    SignalSpec("Electrical Load (A)", "A", 0, 200, 1, False),
+)
+
+SIGNAL_NAMES = [spec.name for spec in SIGNALS]
+N_SIGNALS = len(SIGNALS)
+DECIMALS = [spec.decimals for spec in SIGNALS]
+_WHOLE = [index for index, decimals in enumerate(DECIMALS) if not decimals]
+_SCALES = None if np is None else np.array([10.0 ** decimals for decimals in DECIMALS])
+
+# Packed sample: timestamp, signals, fault code label, description label
+FRAME = struct.Struct(f"<q{N_SIGNALS}f2H")
+FRAME_DTYPE = None if np is None else np.dtype(
+    [("timestamp_ms", "<i8"), ("signals", "<f4", (N_SIGNALS,)), ("fault_code", "<u2"), ("description", "<u2")]
+)
+
+
+def round_signals(values):
+    """Round N_SIGNALS values to each signal's resolution (integers where it has no decimals)"""
+    return [round(value, decimals) if decimals else round(value) for value, decimals in zip(values, DECIMALS)]
+
+
+class Labels:
+    """Interned fault code / description strings, shared by the blocks of one log"""
+
+    def __init__(self):
+        self.values = []
+        self.index = {}
+
+    def encode(self, text):
+        position = self.index.get(text)
+        if position is None:
+            position = self.index[text] = len(self.values)
+            self.values.append(text)
+        return position
+
+
+class FrameBlock:
+    """Preallocated buffer of up to capacity packed samples"""
+
+    __slots__ = ("buffer", "capacity", "count", "labels")
+
+    def __init__(self, capacity, labels):
+        self.buffer = bytearray(FRAME.size * capacity)
+        self.capacity = capacity
+        self.count = 0
+        self.labels = labels
+
+    def append(self, row):
+        """Pack one ROW_FIELDS row"""
+        encode = self.labels.encode
+        FRAME.pack_into(self.buffer, self.count * FRAME.size, *row[:-2], encode(row[-2]), encode(row[-1]))
+        self.count += 1
+
+    def rows(self):
+        """Decode into ROW_FIELDS tuples, rounding float32 noise off at each signal's resolution"""
+        labels = self.labels.values
+        if np is None:
+            view = memoryview(self.buffer)[:self.count * FRAME.size]
+            return [
+                (fields[0], *round_signals(fields[1:-2]), labels[fields[-2]], labels[fields[-1]])
+                for fields in FRAME.iter_unpack(view)
+            ]
+        # Same rounding as round_signals, one column at a time
+        frames = self.frames()
+        scaled = np.rint(frames["signals"] * _SCALES)
+        columns = (scaled / _SCALES).T.tolist()
+        for index in _WHOLE:
+            columns[index] = scaled[:, index].astype(np.int64).tolist()
+        return list(zip(
+            frames["timestamp_ms"].tolist(), *columns,
+            [labels[index] for index in frames["fault_code"].tolist()],
+            [labels[index] for index in frames["description"].tolist()],
+        ))
+
+    def frames(self):
+        """The packed samples as a FRAME_DTYPE structured array (no copy)"""
+        if np is None:
+            raise RuntimeError("Structured frames require NumPy: pip install numpy")
+        return np.frombuffer(self.buffer, dtype=FRAME_DTYPE, count=self.count)
@@ -0,0 +1,707 @@
+"""Headless command-line entry point for bulk OBD-II dataset generation"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+
+from bench import BENCHMARKS, DEFAULT_EXPORT_ROWS, DEFAULT_TICKS, DEFAULT_TOLERANCE, compare, run_suite
+from catalog import CATALOG
+from cycles import CYCLES, RANDOM_PREFIX, load_cycle
+from engine import Faults, DrivingScenarios, SIGNAL_NAMES, SimulationEngine, derive_seed
+from faults import parse_fault_spec
+from metrics import METRICS_HOST, METRICS_PATH, Metrics, serve
+from noise import DEFAULT_PROFILE
+from exporters import EXPORTERS, SHARD_SUFFIXES, NpyAppender, NpyWriter, infer_format, open_exporter
+from playback import LogEngine, open_log, play
+from replay import load_manifest, manifest_path, replay, run_manifest, tick_at, write_manifest
+from scheduler import MODES, Scheduler, format_timestamp, now_ms, parse_timestamp
+from schema import round_signals
+from sinks import StreamingSink
+
+DEFAULT_ROWS = 1000
+
+
+def generate(args):
+    """Write N rows per fault/scenario combination without starting QApplication"""
+    faults = [CATALOG.resolve(name) for name in args.fault] if args.fault else list(Faults.keys())
+    scenarios = args.scenario or list(DrivingScenarios.keys())
+    for name in faults:
+        if name not in Faults:
+            sys.exit(f"Unknown fault: {name}")
+    for name in scenarios:
+        if name not in DrivingScenarios:
+            sys.exit(f"Unknown scenario: {name}")
+    active_faults = _active_faults(args.add_fault)
+    seed = args.seed if args.seed is not None else random.SystemRandom().getrandbits(63)
+    cycle_names = (args.cycle or []) + [f"{RANDOM_PREFIX}{derive_seed(seed, 'cycle', index)}"
+                                        for index in range(args.random_cycles)]
+    try:
+        cycles = [load_cycle(name) for name in cycle_names]
+    except (OSError, ValueError, RuntimeError) as error:
+        sys.exit(str(error))
+
+    start_ms = parse_timestamp(args.start) if args.start else now_ms()
+    dt = args.dt if args.dt is not None else 1 / args.rate_hz
+    _check_output(args)
+    metrics = None
+    if args.metrics_port:
+        metrics = Metrics()
+        serve(metrics, args.metrics_port)
+        print(f"Serving metrics on http://{METRICS_HOST}:{args.metrics_port}{METRICS_PATH}")
+    total = 0
+    runs = []
+    started = time.perf_counter()
+    # Chunks are written on a background thread while the next rows are generated
+    with StreamingSink(_open_output(args), flush_rows=args.chunk_rows, metrics=metrics) as sink:
+        # A drive cycle scripts the scenario and controls itself
+        combinations = [(cycle.scenario, cycle) for cycle in cycles] or [(name, None) for name in scenarios]
+        for fault in faults:
+            for scenario, cycle in combinations:
+                engine = SimulationEngine(
+                    fault=fault, scenario=scenario, physics=args.physics, dt=dt, seed=derive_seed(seed, len(runs)),
+                    noise=args.noise,
+                )
+                engine.car_on = not args.car_off
+                engine.ac_on = args.ac
+                engine.brake_applied = args.brake
+                engine.speed = args.speed
+                engine.active_faults = active_faults
+                n_ticks = args.rows if args.rows is not None else DEFAULT_ROWS
+                if cycle is not None:
+                    engine.drive_cycle = cycle.name
+                    if args.rows is None:
+                        n_ticks = cycle.compile(dt).n_ticks
+
+                def tick(timestamp_ms, engine=engine):
+                    engine.step()
+                    sink.append(engine.row(timestamp_ms))
+
+                scheduler = Scheduler(args.mode, args.rate_hz, args.speedup, start_ms)
+                total += scheduler.run(tick, n_ticks=n_ticks, duration_s=args.duration)
+                runs.append(run_manifest(engine, scheduler.clock, fault=fault, scenario=scenario,
+                                         cycle=cycle.name if cycle is not None else None))
+    elapsed = time.perf_counter() - started
+    write_manifest(manifest_path(args.output), runs, seed=seed, output=os.path.basename(args.output))
+    print(f"Wrote {total} rows to {args.output} in {elapsed:.2f}s ({total / elapsed:.0f} rows/s), seed {seed}")
+
+
+def _active_faults(specs):
+    """Validate repeatable 'CODE[@ONSET_S[+RAMP_S]]' options into engine.active_faults"""
+    active_faults = tuple((CATALOG.resolve(code), onset, ramp)
+                          for code, onset, ramp in map(parse_fault_spec, specs or ()))
+    for code, _, _ in active_faults:
+        if code not in Faults:
+            sys.exit(f"Unknown fault: {code}")
+    return active_faults
+
+
+def replay_runs(args):
+    """Regenerate a dataset, or a time slice of it, from its manifest"""
+    manifest = load_manifest(args.manifest)
+    runs = manifest["runs"]
+    selected = args.run if args.run is not None else range(len(runs))
+    start_ms = parse_timestamp(args.start) if args.start else None
+    _check_output(args)
+    total = 0
+    started = time.perf_counter()
+    with StreamingSink(_open_output(args), flush_rows=args.chunk_rows) as sink:
+        for index in selected:
+            run = runs[index]
+            start_tick = tick_at(run, start_ms) if start_ms is not None else 0
+            stop_tick = start_tick + round(args.duration * run["rate_hz"]) if args.duration is not None else None
+            for row in replay(run, start_tick, stop_tick):
+                sink.append(row)
+                total += 1
+    elapsed = time.perf_counter() - started
+    print(f"Replayed {total} rows to {args.output} in {elapsed:.2f}s")
+
+
+def play_log(args):
+    """Stream a recorded log into a sink at its original, an accelerated or maximum speed"""
+    log = _open_log(args.log)
+    start_ms = parse_timestamp(args.start) if args.start else None
+    rows = log.rows(start_ms)
+    if args.duration is not None:
+        rows = _until(rows, args.duration)
+    if args.output is None:
+        def emit(row):
+            values = (format_timestamp(row[0]), *round_signals(row[1:-2]), *row[-2:])
+            print(",".join(str(value) for value in values))
+        play(rows, emit, args.mode, args.speedup)
+        return
+    _check_output(args)
+    started = time.perf_counter()
+    with StreamingSink(_open_output(args), flush_rows=args.chunk_rows) as sink:
+        total = play(rows, sink.append, args.mode, args.speedup)
+    print(f"Played {total} rows from {args.log} to {args.output} in {time.perf_counter() - started:.2f}s")
+
+
+def _open_log(path):
+    """open_log() for a command-line path, exiting with the reason when it cannot be read"""
+    try:
+        return open_log(path)
+    except (OSError, ValueError, RuntimeError) as error:
+        sys.exit(str(error))
+
+
+def _output_format(args):
+    """--format, or the one inferred from the --output extension, exiting with the reason when there is none"""
+    try:
+        return args.format or infer_format(args.output)
+    except ValueError as error:
+        sys.exit(f"{error} with --format")
+
+
+def _check_output(args):
+    """Refuse to replace an existing --output unless --overwrite is given; a sharded log is continued instead"""
+    format = _output_format(args)
+    if os.path.exists(args.output) and format != "shards" and not args.overwrite:
+        sys.exit(f"{args.output} already exists; pass --overwrite to replace it")
+
+
+def _open_output(args):
+    """Exporter for --output/--format, passing the rotation and compression options to a sharded log"""
+    format = _output_format(args)
+    if format == "csv":
+        return open_exporter(args.output, format, truncate=True)  # _check_output allowed replacing it
+    if format != "shards":
+        return open_exporter(args.output, format)
+    return open_exporter(args.output, format, max_bytes=int(args.shard_mb * (1 << 20)),
+                         max_seconds=args.shard_minutes * 60, compression=args.compression)
+
+
+def _add_output_options(parser):
+    parser.add_argument("--overwrite", action="store_true", help="Replace --output if it already exists")
+    parser.add_argument("--shard-mb", type=float, default=64,
+                        help="Sharded logs (.shards): rotate after this many uncompressed MiB")
+    parser.add_argument("--shard-minutes", type=float, default=60,
+                        help="Sharded logs: also rotate at multiples of this much log time (0: size only)")
+    parser.add_argument("--compression", choices=sorted(SHARD_SUFFIXES),
+                        help="Sharded logs: shard compression (default: zstd if installed, else gzip)")
+
+
+def _until(rows, duration_s):
+    """Rows up to duration_s of recorded time after the first one"""
+    end_ms = None
+    for row in rows:
+        if end_ms is None:
+            end_ms = row[0] + duration_s * 1000
+        if row[0] >= end_ms:
+            return
+        yield row
+
+
+def features(args):
+    """Vectorized derived-feature pass over a recorded log into an ML-ready .npy directory"""
+    import numpy as np
+    from features import NUMERIC_FEATURES, BatchFeatures, fault_details
+
+    log = _open_log(args.log)
+    started = time.perf_counter()
+    writer = NpyWriter(args.output)
+    table = NpyAppender(os.path.join(args.output, "features.npy"), np.float32, (len(NUMERIC_FEATURES),))
+    compute = BatchFeatures()
+    total = 0
+    rows = iter(log.rows())
+    while True:
+        chunk = list(itertools.islice(rows, args.chunk_rows))
+        if not chunk:
+            break
+        columns = list(zip(*chunk))
+        timestamps = np.array(columns[0], dtype=np.int64)
+        signals = np.array(columns[1:-2], dtype=np.float64).T
+        writer.write_columns(timestamps, signals, columns[-2], columns[-1])
+        table.append(compute(timestamps, signals))
+        total += len(chunk)
+    writer.close()
+    table.close()
+    # Severity and fix per fault_code category: severity_categories[fault_code[i]]
+    details = [fault_details(fault) for fault in writer.fault_dictionary.values]
+    writer.save_extra("feature_names", np.array(NUMERIC_FEATURES))
+    writer.save_extra("severity_categories", np.array([severity for severity, _ in details], dtype=str))
+    writer.save_extra("recommended_fix_categories", np.array([fix for _, fix in details], dtype=str))
+    print(f"Wrote {total} rows with features to {args.output} in {time.perf_counter() - started:.2f}s")
+
+
+def batch(args):
+    """Generate a whole fleet in one vectorized call and save it as .npz"""
+    import numpy as np
+    from batch import FAULT_NAMES, SCENARIO_NAMES, generate_batch, resolve_indices
+
+    if not args.output.endswith(".npz"):
+        args.output += ".npz"  # np.savez adds the extension itself
+    _check_output(args)
+    n_vehicles = args.vehicles
+    fault_idx = resolve_indices(args.fault, FAULT_NAMES, n_vehicles)
+    # Pair every fault with every scenario when both default to round-robin
+    scenario_idx = resolve_indices(args.scenario, SCENARIO_NAMES, n_vehicles)
+    if not args.scenario:
+        scenario_idx = (np.arange(n_vehicles) // len(FAULT_NAMES)) % len(SCENARIO_NAMES)
+    rng = np.random.default_rng(args.seed)
+
+    start = time.perf_counter()
+    data = generate_batch(
+        n_vehicles, args.steps, faults=fault_idx, scenarios=scenario_idx, car_on=not args.car_off,
+        ac_on=args.ac, brake_applied=args.brake, speed=args.speed, rng=rng, physics=args.physics, dt=args.dt,
+    )
+    elapsed = time.perf_counter() - start
+    np.savez(
+        args.output, data=data, signals=np.array(SIGNAL_NAMES),
+        fault=fault_idx, fault_names=np.array(FAULT_NAMES),
+        scenario=scenario_idx, scenario_names=np.array(SCENARIO_NAMES),
+    )
+    print(f"Generated {data.size} samples ({n_vehicles} vehicles x {args.steps} steps) "
+          f"in {elapsed:.3f}s ({data.size / elapsed / 1e6:.1f}M samples/s) -> {args.output}")
+
+
+def fleet(args):
+    """Simulate a large fleet across worker processes and report vehicles x Hz capacity"""
+    from fleet import merge_shards, run_fleet
+
+    report = run_fleet(
+        args.vehicles, args.steps, args.output_dir, seed=args.seed, workers=args.workers, shards=args.shards,
+        physics=args.physics, dt=args.dt, ac_fraction=args.ac_fraction, brake_fraction=args.brake_fraction,
+    )
+    print(f"Simulated {report['vehicles']} vehicles x {report['steps']} steps on {report['workers']} workers "
+          f"in {report['seconds']:.2f}s: {report['vehicle_hz']:.0f} vehicles x Hz "
+          f"({report['samples_per_second'] / 1e6:.1f}M samples/s) -> {args.output_dir}")
+    if args.merge:
+        print(f"Merged shards into {merge_shards(args.output_dir, args.merge)}")
+
+
+def dataset(args):
+    """Build a balanced, labelled train/val/test dataset of signal windows across worker processes"""
+    import json
+    from dataset import DEFAULT_SPLITS, build_dataset
+
+    faults = [CATALOG.resolve(fault) for fault in args.fault or ()]
+    for fault in faults:
+        if fault not in Faults:
+            sys.exit(f"Unknown fault: {fault}")
+    overrides = ()
+    if args.targets:
+        with open(args.targets, encoding="utf-8") as file:
+            overrides = json.load(file)
+    fractions = [float(part) for part in args.splits.split(",")] if args.splits else DEFAULT_SPLITS
+    if len(fractions) != len(DEFAULT_SPLITS) or min(fractions) < 0 or not sum(fractions):
+        sys.exit("--splits takes three non-negative train,val,test fractions, e.g. 0.8,0.1,0.1")
+    try:
+        report = build_dataset(
+            args.output_dir, per_stratum=args.per_stratum, overrides=overrides, faults=faults or None,
+            scenarios=args.scenario, window=args.window, fractions=fractions, seed=args.seed, workers=args.workers,
+            shard_windows=args.shard_windows, physics=args.physics, dt=args.dt, ac_fraction=args.ac_fraction,
+        )
+    except ValueError as error:
+        sys.exit(str(error))
+    windows = report["windows"]
+    print(f"Dataset of {len(report['strata'])} strata x {report['window']} ticks in {args.output_dir}: "
+          + ", ".join(f"{split} {count} windows" for split, count in windows.items())
+          + f" ({report['resumed_windows']} already done) in {report['seconds']:.2f}s")
+
+
+def elm327(args):
+    """Serve the simulation to OBD client software as an ELM327 adapter"""
+    import asyncio
+    from elm327 import ELM327Emulator
+
+    if args.log:
+        # One recorded row per emulator tick; match --rate-hz to the log rate for original speed
+        engine = LogEngine(_open_log(args.log), parse_timestamp(args.start) if args.start else None)
+    else:
+        fault = CATALOG.resolve(args.fault) if args.fault else "No Faults Detected"
+        if fault not in Faults:
+            sys.exit(f"Unknown fault: {fault}")
+        engine = SimulationEngine(
+            fault=fault, scenario=args.scenario, physics=args.physics, dt=1 / args.rate_hz, noise=args.noise,
+            record=False,
+        )
+        engine.car_on = not args.car_off
+        engine.ac_on = args.ac
+        engine.speed = args.speed
+        engine.active_faults = _active_faults(args.add_fault)
+    emulator = ELM327Emulator(engine, rate_hz=args.rate_hz, vin=args.vin)
+
+    async def serve():
+        server = await emulator.serve_tcp(args.host, args.port)
+        print(f"ELM327 emulator listening on {args.host}:{args.port}")
+        if args.pty:
+            print(f"ELM327 emulator serial device: {emulator.open_pty()}")
+        async with server:
+            await emulator.simulate()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+def can(args):
+    """Send simulated OBD-II ISO-TP frames to SocketCAN interfaces or a candump log"""
+    from canbus import (
+        MAX_ECUS, CanBus, CandumpTransport, CanSimulator, ObdCanNode, SocketCANTransport, parse_schedule_spec,
+    )
+
+    faults = [CATALOG.resolve(name) for name in args.fault] if args.fault else ["No Faults Detected"]
+    for name in faults:
+        if name not in Faults:
+            sys.exit(f"Unknown fault: {name}")
+    try:
+        schedule = dict(map(parse_schedule_spec, args.frame)) if args.frame else None
+    except ValueError as error:
+        sys.exit(str(error))
+    # "vcan{}" puts every vehicle on its own bus; a plain name shares one bus between up to 8 ECUs
+    per_vehicle = "{}" in args.channel
+    if not per_vehicle and args.vehicles > MAX_ECUS:
+        sys.exit(f"At most {MAX_ECUS} vehicles share one bus; use a channel template such as vcan{{}}")
+    seed = args.seed if args.seed is not None else random.SystemRandom().getrandbits(63)
+    mode = args.mode or ("freerun" if args.log else "realtime")
+    log = open(args.log, "w", encoding="ascii") if args.log else None
+    buses, nodes = {}, []
+    try:
+        for index in range(args.vehicles):
+            channel = args.channel.format(index) if per_vehicle else args.channel
+            if channel not in buses:
+                transport = CandumpTransport(log, channel) if log else SocketCANTransport(channel)
+                buses[channel] = CanBus(transport, bitrate=args.bitrate)
+            engine = SimulationEngine(
+                fault=faults[index % len(faults)], scenario=args.scenario, physics=args.physics, dt=1 / args.rate_hz,
+                seed=derive_seed(seed, index), noise=args.noise, record=False,
+            )
+            engine.car_on = not args.car_off
+            engine.ac_on = args.ac
+            engine.speed = args.speed
+            nodes.append(ObdCanNode(engine, buses[channel], ecu=0 if per_vehicle else index, schedule=schedule,
+                                    vin=args.vin))
+    except RuntimeError as error:
+        sys.exit(str(error))
+    simulator = CanSimulator(nodes, 1 / args.rate_hz)
+    scheduler = Scheduler(mode, args.rate_hz, args.speedup)
+    print(f"Sending {args.vehicles} vehicles on {len(buses)} buses -> {args.log or ', '.join(buses)}")
+    started = time.perf_counter()
+    try:
+        scheduler.run(simulator.tick, duration_s=args.duration)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        simulator.close()
+        if log is not None:
+            log.close()
+    elapsed = time.perf_counter() - started
+    simulated = scheduler.clock.ticks / args.rate_hz
+    sent, dropped, load = simulator.stats(simulated)
+    print(f"Sent {sent} frames in {elapsed:.2f}s ({sent / elapsed:.0f} frames/s), {dropped} dropped, "
+          f"mean bus load {load:.0%} over {simulated:.1f} simulated seconds, seed {seed}")
+
+
+def stream(args):
+    """Publish live ticks to WebSocket and MQTT subscribers, and optionally to an external broker"""
+    from pubsub import TelemetryHub
+
+    faults = [CATALOG.resolve(name) for name in args.fault] if args.fault else list(Faults.keys())
+    for name in faults:
+        if name not in Faults:
+            sys.exit(f"Unknown fault: {name}")
+    seed = args.seed if args.seed is not None else random.SystemRandom().getrandbits(63)
+    try:
+        hub = TelemetryHub(args.encoding, queue_limit=args.queue_limit, flush_interval=args.flush_ms / 1000)
+        hub.start_in_thread(host=args.host, ws_port=args.ws_port or None, mqtt_port=args.mqtt_port or None,
+                            broker=args.broker)
+    except (RuntimeError, OSError, ConnectionError) as error:
+        sys.exit(str(error))
+    print(f"Streaming on {args.host}: WebSocket port {args.ws_port or 'off'}, MQTT port {args.mqtt_port or 'off'}"
+          + (f", bridged to {args.broker}" if args.broker else ""))
+
+    if args.fleet:
+        import numpy as np
+        from batch import generate_batch
+
+        rng = np.random.default_rng(seed)
+
+        def tick(timestamp_ms):
+            data = generate_batch(args.fleet, 1, faults=faults, scenarios=args.scenario, speed=args.speed, rng=rng)
+            hub.publish_fleet((timestamp_ms,), data)
+    else:
+        engines = []
+        for index in range(args.vehicles):
+            engine = SimulationEngine(
+                fault=faults[index % len(faults)], scenario=args.scenario or "City Road", physics=args.physics,
+                dt=1 / args.rate_hz, seed=derive_seed(seed, index), noise=args.noise, record=False,
+            )
+            engine.car_on = True
+            engine.speed = args.speed
+            engines.append(engine)
+        publish = hub.publish
+
+        def tick(timestamp_ms):
+            for index, engine in enumerate(engines):
+                engine.step()
+                publish(index, engine.row(timestamp_ms))
+
+    scheduler = Scheduler(args.mode, args.rate_hz, args.speedup)
+    started = time.perf_counter()
+    try:
+        scheduler.run(tick, duration_s=args.duration)
+    except KeyboardInterrupt:
+        pass
+    time.sleep(2 * args.flush_ms / 1000)  # Let the last ticks go out
+    elapsed = time.perf_counter() - started
+    stats = hub.stats()
+    print(f"Published {scheduler.clock.ticks} ticks as {stats['messages']} messages in {elapsed:.2f}s "
+          f"({stats['deliveries'] / elapsed:.0f} deliveries/s to subscribers, "
+          f"{stats['dropped']} dropped by slow clients), seed {seed}")
+
+
+def bench(args):
+    """Run the benchmark suite, save it as JSON and optionally check it against a baseline"""
+    import json
+
+    only = args.only.split(",") if args.only else BENCHMARKS
+    for name in only:
+        if name not in BENCHMARKS:
+            sys.exit(f"Unknown benchmark: {name}")
+    formats = args.formats.split(",") if args.formats else None
+    result = run_suite(only, ticks=args.ticks, physics=args.physics, export_rows=args.export_rows or DEFAULT_EXPORT_ROWS,
+                       formats=formats, workdir=args.workdir)
+    for name, record in result["metrics"].items():
+        print(f"{name:<40} {record['value']:>16,.2f} {record['unit']}")
+    for entry in sorted(result["details"].get("engine", []), key=lambda entry: entry["ticks_per_s"])[:3]:
+        print(f"Slowest: {entry['fault']} / {entry['scenario']} (car_on={entry['car_on']}, ac_on={entry['ac_on']}, "
+              f"brake_applied={entry['brake_applied']}): {entry['ticks_per_s']:,.0f} ticks/s")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(result, handle, indent=2)
+        print(f"Benchmark results -> {args.output}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+        regressions = 0
+        for name, previous, current, change, regressed in compare(result, baseline, args.tolerance):
+            regressions += regressed
+            print(f"{name:<40} {previous:>16,.2f} -> {current:>16,.2f} {change:+8.1%}{'  REGRESSION' if regressed else ''}")
+        if regressions:
+            sys.exit(f"{regressions} metrics regressed by more than {args.tolerance:.0%} against {args.baseline}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Headless OBD-II simulator")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    gen = commands.add_parser("generate", help="Write N rows per fault/scenario combination")
+    gen.add_argument("--rows", type=int, help=f"Rows per fault/scenario or fault/cycle combination "
+                     f"(default: {DEFAULT_ROWS}, or the whole cycle)")
+    gen.add_argument("--output", default="generated.csv",
+                     help="Output path (.csv, .shards directory, .parquet, .npz or .npy directory; default: generated.csv)")
+    gen.add_argument("--format", choices=sorted(EXPORTERS) + ["columnar"],
+                     help="Export format (default: from the output extension; columnar = Parquet if available, else .npy)")
+    gen.add_argument("--chunk-rows", type=int, default=10_000, help="Rows per export chunk")
+    _add_output_options(gen)
+    gen.add_argument("--fault", action="append", help="Fault name or DTC to include (repeatable, default: all)")
+    gen.add_argument("--scenario", action="append", help="Driving scenario to include (repeatable, default: all)")
+    gen.add_argument("--cycle", action="append", metavar="NAME",
+                     help=f"Drive cycle to run instead of the scenarios: {', '.join(CYCLES)}, a script path or "
+                          f"{RANDOM_PREFIX}SEED (repeatable)")
+    gen.add_argument("--random-cycles", type=int, default=0, metavar="N",
+                     help="Also run N synthesized drive cycles derived from --seed")
+    gen.add_argument("--add-fault", action="append", metavar="SPEC",
+                     help="Extra fault active in every run as 'CODE[@ONSET_S[+RAMP_S]]', starting ONSET_S simulated "
+                          "seconds in and ramping to full effect over RAMP_S (repeatable)")
+    gen.add_argument("--speed", type=int, default=0, help="Vehicle speed in km/h while the car is on")
+    gen.add_argument("--car-off", action="store_true", help="Simulate with the engine off")
+    gen.add_argument("--ac", action="store_true", help="Simulate with the AC on")
+    gen.add_argument("--brake", action="store_true", help="Simulate with the brake applied")
+    gen.add_argument("--duration", type=float, help="Simulated seconds per combination (overrides --rows)")
+    gen.add_argument("--mode", choices=MODES, default="freerun",
+                     help="realtime paces ticks at --rate-hz, accelerated at --speedup x real time, freerun as fast as possible")
+    gen.add_argument("--rate-hz", type=float, default=1.0, help="Simulated sample rate (e.g. 10-100 Hz for OBD polling)")
+    gen.add_argument("--speedup", type=float, default=10.0, help="Speedup factor for accelerated mode")
+    gen.add_argument("--start", help="Simulated start time, ISO format (default: now)")
+    gen.add_argument("--physics", action="store_true", help="Use the stateful vehicle model (speed is the target speed)")
+    gen.add_argument("--dt", type=float, help="Physics time step in seconds (default: 1 / --rate-hz)")
+    gen.add_argument("--noise", nargs="?", const=DEFAULT_PROFILE, metavar="PROFILE",
+                     help="Correlated, quantized sensor noise from a JSON profile (default profile without a value)")
+    gen.add_argument("--seed", type=int, help="Run seed recorded in <output>.manifest.json (default: random)")
+    gen.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on 127.0.0.1:PORT while generating")
+    gen.set_defaults(func=generate)
+
+    rep = commands.add_parser("replay", help="Regenerate a dataset or a time slice of it from its manifest")
+    rep.add_argument("manifest", help="Path to a <dataset>.manifest.json written by generate")
+    rep.add_argument("--output", required=True, help="Output path (.csv, .parquet, .npz or .npy directory)")
+    rep.add_argument("--format", choices=sorted(EXPORTERS) + ["columnar"], help="Export format")
+    rep.add_argument("--run", type=int, action="append", help="Run index to replay (repeatable, default: all)")
+    rep.add_argument("--start", help="Slice start, ISO format (default: start of each run)")
+    rep.add_argument("--duration", type=float, help="Slice length in simulated seconds (default: to the end)")
+    rep.add_argument("--chunk-rows", type=int, default=10_000, help="Rows per export chunk")
+    _add_output_options(rep)
+    rep.set_defaults(func=replay_runs)
+
+    pb = commands.add_parser("play", help="Stream a recorded log (CSV, Parquet, .npz, .npy) into another sink")
+    pb.add_argument("log", help="Recorded log path")
+    pb.add_argument("--output", help="Output path (default: print rows to stdout)")
+    pb.add_argument("--format", choices=sorted(EXPORTERS) + ["columnar"], help="Export format")
+    pb.add_argument("--mode", choices=MODES, default="freerun",
+                    help="realtime keeps the recorded spacing, accelerated runs --speedup x faster, freerun as fast as possible")
+    pb.add_argument("--speedup", type=float, default=10.0, help="Speedup factor for accelerated mode")
+    pb.add_argument("--start", help="Seek to the first row at or after this time, ISO format")
+    pb.add_argument("--duration", type=float, help="Recorded seconds to play (default: to the end)")
+    pb.add_argument("--chunk-rows", type=int, default=10_000, help="Rows per export chunk")
+    _add_output_options(pb)
+    pb.set_defaults(func=play_log)
+
+    feat = commands.add_parser("features", help="Add the derived feature columns to a recorded log in one vectorized pass")
+    feat.add_argument("log", help="Recorded log path (CSV, Parquet, .npz, .npy)")
+    feat.add_argument("--output", required=True, help="Output .npy directory: the log columns plus features.npy")
+    feat.add_argument("--chunk-rows", type=int, default=100_000, help="Rows per vectorized chunk")
+    feat.set_defaults(func=features)
+
+    bat = commands.add_parser("batch", help="Generate a vectorized fleet array and save it as .npz")
+    bat.add_argument("--vehicles", type=int, default=1000, help="Number of simulated vehicles")
+    bat.add_argument("--steps", type=int, default=1000, help="Ticks per vehicle")
+    bat.add_argument("--output", default="obd-II_batch.npz", help="Output .npz path")
+    bat.add_argument("--overwrite", action="store_true", help="Replace --output if it already exists")
+    bat.add_argument("--fault", action="append", help="Fault to cycle across vehicles (repeatable, default: all)")
+    bat.add_argument("--scenario", action="append", help="Scenario to cycle across vehicles (repeatable, default: all)")
+    bat.add_argument("--speed", type=int, help="Vehicle speed in km/h while the car is on "
+                     "(default 0, or random scenario cruising with --physics)")
+    bat.add_argument("--car-off", action="store_true", help="Simulate with the engine off")
+    bat.add_argument("--ac", action="store_true", help="Simulate with the AC on")
+    bat.add_argument("--brake", action="store_true", help="Simulate with the brake applied")
+    bat.add_argument("--seed", type=int, help="Seed for the NumPy generator")
+    bat.add_argument("--physics", action="store_true", help="Use the vectorized vehicle model")
+    bat.add_argument("--dt", type=float, default=1.0, help="Physics time step in seconds")
+    bat.set_defaults(func=batch, format="npz")
+
+    runner = commands.add_parser("fleet", help="Simulate a fleet across CPU cores into per-shard .npy files")
+    runner.add_argument("--vehicles", type=int, default=10_000, help="Number of simulated vehicles")
+    runner.add_argument("--steps", type=int, default=600, help="Ticks per vehicle")
+    runner.add_argument("--output-dir", default="obd-II_fleet", help="Directory for shard-NNNNN/ outputs and fleet.json")
+    runner.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    runner.add_argument("--shards", type=int, help="Vehicle shards (default: one per 1000 vehicles); changing it changes the RNG streams")
+    runner.add_argument("--seed", type=int, default=0, help="Fleet seed; results do not depend on --workers")
+    runner.add_argument("--ac-fraction", type=float, default=0.3, help="Share of vehicles with the AC on")
+    runner.add_argument("--brake-fraction", type=float, default=0.0, help="Share of vehicles with the brake applied")
+    runner.add_argument("--physics", action="store_true", help="Use the vectorized vehicle model")
+    runner.add_argument("--dt", type=float, default=1.0, help="Physics time step in seconds")
+    runner.add_argument("--merge", help="Also merge the shards in vehicle order into this .npy file")
+    runner.set_defaults(func=fleet)
+
+    data = commands.add_parser("dataset", help="Build balanced train/val/test windows per fault x situation x scenario")
+    data.add_argument("--output-dir", default="obd-II_dataset",
+                      help="Directory for dataset.json and <split>/shard-NNNNN/ outputs; rerun to resume")
+    data.add_argument("--window", type=int, default=60, help="Ticks per sequence window")
+    data.add_argument("--per-stratum", type=int, default=100,
+                      help="Windows per fault x situation x scenario combination")
+    data.add_argument("--targets", metavar="JSON",
+                      help='Per-stratum counts overriding --per-stratum: a list of {"fault", "situation", '
+                           '"scenario", "count"} entries, missing keys matching anything')
+    data.add_argument("--fault", action="append", help="Only this fault or DTC (repeatable, default: all)")
+    data.add_argument("--scenario", action="append", choices=list(DrivingScenarios),
+                      help="Only this scenario (repeatable, default: all)")
+    data.add_argument("--splits", help="train,val,test fractions of every stratum (default: 0.8,0.1,0.1)")
+    data.add_argument("--shard-windows", type=int, default=4096, help="Windows per shard")
+    data.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    data.add_argument("--seed", type=int, default=0, help="Dataset seed; results do not depend on --workers")
+    data.add_argument("--ac-fraction", type=float, default=0.3, help="Share of windows with the AC on")
+    data.add_argument("--physics", action="store_true", help="Use the vectorized vehicle model")
+    data.add_argument("--dt", type=float, default=1.0, help="Physics time step in seconds")
+    data.set_defaults(func=dataset)
+
+    elm = commands.add_parser("elm327", help="Emulate an ELM327 adapter over TCP and optionally a pty")
+    elm.add_argument("--host", default="127.0.0.1", help="TCP listen address")
+    elm.add_argument("--port", type=int, default=35000, help="TCP listen port")
+    elm.add_argument("--pty", action="store_true", help="Also expose a pseudo-terminal serial device")
+    elm.add_argument("--rate-hz", type=float, default=10.0, help="Simulation/encoding rate")
+    elm.add_argument("--fault", help="Fault reported as a Mode 03 DTC (default: none)")
+    elm.add_argument("--add-fault", action="append", metavar="SPEC",
+                     help="Extra fault as 'CODE[@ONSET_S[+RAMP_S]]', reported once past its onset (repeatable)")
+    elm.add_argument("--scenario", default="City Road", choices=list(DrivingScenarios), help="Driving scenario")
+    elm.add_argument("--speed", type=int, default=40, help="Vehicle (target) speed in km/h")
+    elm.add_argument("--car-off", action="store_true", help="Simulate with the engine off")
+    elm.add_argument("--ac", action="store_true", help="Simulate with the AC on")
+    elm.add_argument("--physics", action="store_true", help="Use the stateful vehicle model")
+    elm.add_argument("--noise", nargs="?", const=DEFAULT_PROFILE, metavar="PROFILE",
+                     help="Correlated, quantized sensor noise from a JSON profile (default profile without a value)")
+    elm.add_argument("--vin", default="1HGCM82633A004352", help="VIN reported for Mode 09 PID 02")
+    elm.add_argument("--log", help="Serve a recorded log (one row per tick, looping) instead of simulating")
+    elm.add_argument("--start", help="With --log, seek to this time first, ISO format")
+    elm.set_defaults(func=elm327)
+
+    bus = commands.add_parser("can", help="Send OBD-II ISO-TP frames to SocketCAN (vcan0) or a candump log")
+    bus.add_argument("--channel", default="vcan0",
+                     help="CAN interface; a template such as vcan{} gives every vehicle its own bus (default: vcan0)")
+    bus.add_argument("--log", help="Write a candump -l log to this path instead of sending to SocketCAN")
+    bus.add_argument("--vehicles", type=int, default=1, help="Simulated vehicles (up to 8 ECUs per shared bus)")
+    bus.add_argument("--frame", action="append", metavar="REQUEST@MS",
+                     help="Broadcast the response to REQUEST every MS milliseconds, e.g. 010C@10 or 03@1000 "
+                          "(repeatable; replaces the default schedule)")
+    bus.add_argument("--bitrate", type=int, default=500_000, help="Bus bitrate used to serialize frames")
+    bus.add_argument("--rate-hz", type=float, default=100.0, help="Simulation rate; frames are queued once per tick")
+    bus.add_argument("--mode", choices=MODES,
+                     help="Tick pacing (default: realtime on SocketCAN, freerun for --log)")
+    bus.add_argument("--speedup", type=float, default=10.0, help="Speedup factor for accelerated mode")
+    bus.add_argument("--duration", type=float, help="Simulated seconds to run (default: until interrupted)")
+    bus.add_argument("--fault", action="append", help="Fault reported as a Mode 03 DTC, cycled across vehicles "
+                     "(repeatable, default: none)")
+    bus.add_argument("--scenario", default="City Road", choices=list(DrivingScenarios), help="Driving scenario")
+    bus.add_argument("--speed", type=int, default=40, help="Vehicle (target) speed in km/h")
+    bus.add_argument("--car-off", action="store_true", help="Simulate with the engine off")
+    bus.add_argument("--ac", action="store_true", help="Simulate with the AC on")
+    bus.add_argument("--physics", action="store_true", help="Use the stateful vehicle model")
+    bus.add_argument("--noise", nargs="?", const=DEFAULT_PROFILE, metavar="PROFILE",
+                     help="Correlated, quantized sensor noise from a JSON profile (default profile without a value)")
+    bus.add_argument("--vin", default="1HGCM82633A004352", help="VIN reported for Mode 09 PID 02")
+    bus.add_argument("--seed", type=int, help="Seed for the vehicles' generators (default: random)")
+    bus.set_defaults(func=can)
+
+    pub = commands.add_parser("stream", help="Publish live ticks over WebSocket and MQTT to many subscribers")
+    pub.add_argument("--host", default="127.0.0.1", help="Listen address")
+    pub.add_argument("--ws-port", type=int, default=8765, help="WebSocket port (0 disables it)")
+    pub.add_argument("--mqtt-port", type=int, default=1883, help="MQTT 3.1.1 port (0 disables it)")
+    pub.add_argument("--broker", metavar="HOST[:PORT]", help="Also forward every message to this MQTT broker")
+    pub.add_argument("--encoding", choices=("struct", "msgpack"), default="struct",
+                     help="Payload encoding (msgpack needs the msgpack package)")
+    pub.add_argument("--flush-ms", type=float, default=20.0,
+                     help="Ticks published within this interval are batched into one message per topic")
+    pub.add_argument("--queue-limit", type=int, default=1024,
+                     help="Messages queued per client before its oldest are dropped")
+    pub.add_argument("--vehicles", type=int, default=1, help="Simulated vehicles, published as obd/<index>/...")
+    pub.add_argument("--fleet", type=int, metavar="N",
+                     help="Publish N vectorized vehicles as fleet frames on obd/fleet instead of --vehicles")
+    pub.add_argument("--rate-hz", type=float, default=10.0, help="Simulation rate")
+    pub.add_argument("--mode", choices=MODES, default="realtime", help="Tick pacing")
+    pub.add_argument("--speedup", type=float, default=10.0, help="Speedup factor for accelerated mode")
+    pub.add_argument("--duration", type=float, help="Simulated seconds to run (default: until interrupted)")
+    pub.add_argument("--fault", action="append", help="Fault cycled across vehicles (repeatable, default: all)")
+    pub.add_argument("--scenario", choices=list(DrivingScenarios), help="Driving scenario (default: City Road, "
+                     "or every scenario round-robin with --fleet)")
+    pub.add_argument("--speed", type=int, default=40, help="Vehicle (target) speed in km/h")
+    pub.add_argument("--physics", action="store_true", help="Use the stateful vehicle model")
+    pub.add_argument("--noise", nargs="?", const=DEFAULT_PROFILE, metavar="PROFILE",
+                     help="Correlated, quantized sensor noise from a JSON profile (default profile without a value)")
+    pub.add_argument("--seed", type=int, help="Seed for the vehicles' generators (default: random)")
+    pub.set_defaults(func=stream)
+
+    ben = commands.add_parser("bench", help="Benchmark generation, row memory, export and dashboard throughput")
+    ben.add_argument("--only", help=f"Comma-separated benchmarks to run (default: {','.join(BENCHMARKS)})")
+    ben.add_argument("--ticks", type=int, default=DEFAULT_TICKS, help="Timed ticks per fault/scenario/control combination")
+    ben.add_argument("--physics", action="store_true", help="Benchmark the stateful vehicle model")
+    ben.add_argument("--export-rows", type=int, action="append",
+                     help="Rows per export run (repeatable, default: 10000 and 100000; up to 10^7 for soak tests)")
+    ben.add_argument("--formats", help="Comma-separated export formats (default: every installed one)")
+    ben.add_argument("--workdir", help="Directory for temporary export files (default: the system temp dir)")
+    ben.add_argument("--output", help="Write the results as JSON to this path")
+    ben.add_argument("--baseline", help="Compare against a previous --output JSON; exit 1 on regressions")
+    ben.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                     help="Relative slowdown tolerated against the baseline (default: 0.1)")
+    ben.set_defaults(func=bench)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
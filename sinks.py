@@ -0,0 +1,166 @@
+"""Streaming, bounded-memory log sink feeding exporters one ROW_FIELDS tuple per tick"""
+import threading
+import time
+from collections import deque
+
+from metrics import output_bytes
+from schema import FrameBlock, Labels
+
+
+class StreamingSink:
+    """Preallocated row blocks drained to a writer by a background thread.
+
+    Rows are packed into fixed-size schema.FrameBlock buffers of flush_rows
+    108-byte samples that are recycled after writing, so memory stays constant
+    however long the run; the writer thread decodes each block back into
+    ROW_FIELDS tuples.  A block is handed to the writer thread when it fills
+    up or when flush_interval seconds have passed.  At most max_rows rows are held in
+    memory; beyond that append() either blocks the producer (backpressure) or,
+    with overflow="drop", discards the oldest pending block.  Pass a
+    metrics.Metrics registry to time the writer's flushes.
+    """
+
+    def __init__(self, writer, flush_rows=1000, flush_interval=1.0, max_rows=100_000, overflow="block", metrics=None):
+        if overflow not in ("block", "drop"):
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.writer = writer
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.max_blocks = max(1, max_rows // flush_rows)
+        self.overflow = overflow
+        self.rows_written = 0
+        self.dropped_rows = 0
+
+        self._labels = Labels()
+        self._block = FrameBlock(flush_rows, self._labels)
+        self._pending = deque()  # filled blocks waiting for the writer
+        self._in_flight = []  # blocks the writer is currently writing
+        self._free = []  # recycled blocks
+        self._flush_requested = False
+        self._closed = False
+        self._error = None
+        self._cond = threading.Condition()
+        self._flush_seconds = None
+        if metrics is not None:
+            self._flush_seconds = metrics.histogram("flush_seconds", "Time the writer thread spent writing one batch of blocks")
+            metrics.callback("rows_buffered", "Rows held in memory and not yet written", lambda: self.buffered_rows)
+            metrics.callback("rows_written_total", "Rows written to the log", lambda: self.rows_written, "counter")
+            metrics.callback("rows_dropped_total", "Rows discarded by the drop overflow policy",
+                             lambda: self.dropped_rows, "counter")
+            metrics.callback("log_bytes", "Size of the log written so far", lambda: output_bytes(writer.path))
+        self._thread = threading.Thread(target=self._writer_loop, name="StreamingSink", daemon=True)
+        self._thread.start()
+
+    @property
+    def buffered_rows(self):
+        """Rows held in memory and not yet written"""
+        with self._cond:
+            queued = list(self._pending) + self._in_flight
+            return self._block.count + sum(block.count for block in queued)
+
+    def append(self, row):
+        """Queue one row, applying backpressure once max_rows are buffered"""
+        with self._cond:
+            if self._error is not None:
+                raise self._error
+            if self._closed:
+                raise ValueError("append to a closed sink")
+            self._block.append(row)
+            if self._block.count == self.flush_rows:
+                self._hand_off()
+
+    def flush(self, wait=True):
+        """Write everything buffered so far; wait=False returns before the writer thread is done"""
+        with self._cond:
+            if self._block.count:
+                self._hand_off()
+            self._flush_requested = True
+            self._cond.notify_all()
+            while wait and (self._pending or self._in_flight or self._flush_requested) and self._error is None:
+                self._cond.wait()
+            if self._error is not None:
+                raise self._error
+
+    def close(self):
+        """Flush remaining rows, stop the writer thread and close the writer"""
+        if self._closed:
+            return
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _hand_off(self):
+        """Move the active block to the pending queue (caller holds the lock)"""
+        while len(self._pending) + len(self._in_flight) >= self.max_blocks:
+            if self.overflow == "drop":
+                if not self._pending:
+                    # Everything queued is being written: discard the active block instead
+                    self.dropped_rows += self._block.count
+                    self._block.count = 0
+                    return
+                block = self._pending.popleft()
+                self.dropped_rows += block.count
+                self._free.append(block)
+                break
+            self._cond.wait()
+            if self._error is not None:
+                raise self._error
+        self._pending.append(self._block)
+        self._block = self._free.pop() if self._free else FrameBlock(self.flush_rows, self._labels)
+        self._block.count = 0
+        self._cond.notify_all()
+
+    def _writer_loop(self):
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            with self._cond:
+                while not self._pending and not self._flush_requested and not self._closed:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        if self._block.count:
+                            self._hand_off()
+                        deadline = time.monotonic() + self.flush_interval
+                        continue
+                    self._cond.wait(timeout)
+                if self._closed and not self._pending:
+                    return
+                batch = self._in_flight = list(self._pending)
+                self._pending.clear()
+                flush_requested = self._flush_requested
+
+            started = time.perf_counter()
+            try:
+                write_frames = getattr(self.writer, "write_frames", None)
+                for block in batch:
+                    if write_frames is not None:
+                        write_frames(block)  # columnar writers take the packed block as is
+                    else:
+                        self.writer.write_rows(block.rows())
+                if batch or flush_requested:
+                    self.writer.flush()
+                    if self._flush_seconds is not None:
+                        self._flush_seconds.observe(time.perf_counter() - started)
+            except Exception as exc:  # surface writer failures to the producer
+                with self._cond:
+                    self._error = exc
+                    self._cond.notify_all()
+                return
+
+            with self._cond:
+                for block in batch:
+                    self.rows_written += block.count
+                    self._free.append(block)
+                self._in_flight = []
+                if flush_requested:
+                    self._flush_requested = False
+                deadline = time.monotonic() + self.flush_interval
+                self._cond.notify_all()
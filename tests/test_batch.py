@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from batch import generate_batch
+from catalog import CATALOG
+from engine import SIGNAL_NAMES, SimulationEngine
+
+N_TICKS = 2000
+
+
+def engine_block(fault, car_on, ac_on, brake_applied, speed):
+    """(N_TICKS, signals) array of a seeded SimulationEngine run"""
+    engine = SimulationEngine(fault=fault, seed=3)
+    engine.car_on, engine.ac_on, engine.brake_applied, engine.speed = car_on, ac_on, brake_applied, speed
+    rows = []
+    for _ in range(N_TICKS):
+        data = engine.step()
+        rows.append([data[name] for name in SIGNAL_NAMES])
+    return np.array(rows, dtype=np.float32)
+
+
+def test_same_seed_gives_the_same_batch():
+    first = generate_batch(6, 50, rng=np.random.default_rng(11), physics=True)
+    again = generate_batch(6, 50, rng=np.random.default_rng(11), physics=True)
+    other = generate_batch(6, 50, rng=np.random.default_rng(12), physics=True)
+    np.testing.assert_array_equal(first, again)
+    assert not np.array_equal(first, other)
+
+
+@pytest.mark.parametrize("fault", ["No Faults Detected", CATALOG.resolve("P0217"), CATALOG.resolve("P0300")])
+@pytest.mark.parametrize("car_on, ac_on, brake_applied", [(True, False, False), (True, True, True), (False, False, False)])
+def test_batch_matches_engine(fault, car_on, ac_on, brake_applied):
+    expected = engine_block(fault, car_on, ac_on, brake_applied, 50)
+    data = generate_batch(1, N_TICKS, faults=fault, scenarios="City Road", car_on=car_on, ac_on=ac_on,
+                          brake_applied=brake_applied, speed=50, rng=np.random.default_rng(3))[0]
+    for index, name in enumerate(SIGNAL_NAMES):
+        low, high = expected[:, index].min(), expected[:, index].max()
+        if low == high:
+            assert (data[:, index] == low).all(), name
+        else:
+            # Same distribution, different generator: the batch covers the engine's range and stays inside it
+            slack = 0.02 * (high - low) + 1e-3
+            assert low - slack <= data[:, index].min() <= low + slack, name
+            assert high - slack <= data[:, index].max() <= high + slack, name
+
@@ -0,0 +1,68 @@
+import errno
+import io
+
+import canbus
+from canbus import CAN_FRAME, CanBus, CandumpTransport, PAD_BYTE, SocketCANTransport, isotp_frames
+
+
+def reassemble(frames):
+    """Payload of an ISO-TP transfer (single frame, or first frame plus consecutive frames)"""
+    kind = frames[0][0] >> 4
+    if kind == 0:
+        return frames[0][1:1 + frames[0][0]]
+    size = (frames[0][0] & 0x0F) << 8 | frames[0][1]
+    payload = frames[0][2:]
+    for index, frame in enumerate(frames[1:], 1):
+        assert frame[0] == 0x20 | index % 16
+        payload += frame[1:]
+    return payload[:size]
+
+
+def test_single_frame_is_padded():
+    assert isotp_frames(b"\x41\x0c\x1a\xf8") == [bytes([4, 0x41, 0x0C, 0x1A, 0xF8, PAD_BYTE, PAD_BYTE, PAD_BYTE])]
+
+
+def test_multi_frame_round_trip():
+    for size in (8, 20, 130):
+        payload = bytes(range(size))
+        frames = isotp_frames(payload)
+        assert all(len(frame) == 8 for frame in frames)
+        assert len(frames) == 1 + -(-(size - 6) // 7)
+        assert reassemble(frames) == payload
+
+
+class FullQueueSocket:
+    """Accepts room frames, then reports a full transmit queue like vcan does"""
+
+    def __init__(self, room):
+        self.room = room
+        self.frames = []
+
+    def send(self, frame):
+        if len(self.frames) >= self.room:
+            raise OSError(errno.ENOBUFS, "No buffer space available")
+        self.frames.append(bytes(frame))
+
+
+def test_full_socketcan_queue_drops_and_counts_the_rest(monkeypatch):
+    monkeypatch.setattr(canbus, "SEND_BACKOFF_S", 0)
+    transport = object.__new__(SocketCANTransport)  # no vcan interface needed
+    transport.buffer = bytearray(64 * CAN_FRAME.size)
+    transport.socket = FullQueueSocket(10)
+    bus = CanBus(transport, capacity=64)
+    for index in range(30):
+        bus.queue(0x7E8, isotp_frames(b"\x41\x0d\x3c"), index * 0.001)
+    bus.flush()
+    assert (bus.frames_sent, bus.frames_dropped) == (10, 20)
+    assert CAN_FRAME.unpack(transport.socket.frames[0])[0] == 0x7E8
+
+
+def test_saturated_bus_drops_whole_transfers():
+    log = io.StringIO()
+    bus = CanBus(CandumpTransport(log, "vcan0"), bitrate=125_000)  # 1 ms per frame
+    for _ in range(300):
+        bus.queue(0x7E8, isotp_frames(bytes(20)), 0.0)  # three frames each, all due at once
+    bus.close()
+    assert bus.frames_sent == 3 * 34 and bus.frames_dropped == 3 * 266
+    lines = log.getvalue().splitlines()
+    assert len(lines) == bus.frames_sent and lines[0].startswith("(0.000000) vcan0 7E8#1014")
@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+from catalog import CATALOG, CATALOG_PATH, FaultCatalog, fault_code
+
+ENTRIES = [
+    {"name": "P0001 - First", "situations": ["Cold start", "Idle"]},
+    {"name": "P0002 - Second", "situations": ["Idle"]},
+    {"name": "No Faults Detected", "situations": ["Idle"]},
+]
+
+
+def test_indexes_agree_with_the_catalog_file():
+    with open(CATALOG_PATH, encoding="utf-8") as file:
+        entries = json.load(file)["faults"]
+    assert list(CATALOG.faults) == [entry["name"] for entry in entries]
+    for entry in entries:
+        name = entry["name"]
+        assert CATALOG.faults[name] == entry["situations"]
+        for situation in entry["situations"]:
+            assert name in CATALOG.faults_for(situation)
+    for situation, names in CATALOG.by_situation.items():
+        assert names == [entry["name"] for entry in entries if situation in entry["situations"]]
+
+
+def test_code_index_and_resolve():
+    for name in CATALOG.faults:
+        if name != "No Faults Detected":
+            assert CATALOG.by_code[fault_code(name)] == name
+            assert CATALOG.resolve(fault_code(name).lower()) == name
+        assert CATALOG.resolve(name) == name
+    assert CATALOG.resolve("P9999") == "P9999"
+
+
+def test_reverse_index_keeps_catalog_order(tmp_path):
+    catalog = FaultCatalog(ENTRIES, descriptions_path=str(tmp_path / "missing.json"))
+    assert catalog.faults_for("Idle") == ["P0001 - First", "P0002 - Second", "No Faults Detected"]
+    assert catalog.faults_for("Cold start") == ["P0001 - First"]
+    assert catalog.faults_for("Highway") == []
+    assert len(catalog) == 3 and "P0002 - Second" in catalog
+    assert catalog.search("SECOND") == ["P0002 - Second"]
+    assert catalog.describe("P0001 - First") == {}
+
+
+def test_duplicates_and_versions_are_rejected(tmp_path):
+    with pytest.raises(ValueError, match="Duplicate"):
+        FaultCatalog(ENTRIES + ENTRIES[:1])
+    path = tmp_path / "catalog.json"
+    path.write_text(json.dumps({"version": 99, "faults": ENTRIES}), encoding="utf-8")
+    with pytest.raises(ValueError, match="version"):
+        FaultCatalog.load(str(path))
+
+
+def test_descriptions_load_lazily(tmp_path):
+    path = tmp_path / "descriptions.json"
+    path.write_text(json.dumps({"P0001 - First": {"severity": "High"}}), encoding="utf-8")
+    catalog = FaultCatalog(ENTRIES, descriptions_path=str(path))
+    assert catalog._descriptions is None
+    assert catalog.describe("P0001 - First") == {"severity": "High"}
+    assert catalog.describe("P0002 - Second") == {}
+    assert CATALOG.describe(CATALOG.resolve("P0217"))  # the shipped file covers the shipped catalog
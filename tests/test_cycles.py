@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from cycles import CYCLES, Cycle, load_cycle, random_cycle
+from engine import SimulationEngine
+
+SCRIPT = {
+    "name": "test",
+    "speed": [[0, 0], [10, 50], [20, 50], [30, 0]],
+    "events": [{"t": 5, "ac_on": True}, {"t": 15, "scenario": "Highway", "brake": True}, {"t": 32, "car_on": False}],
+    "faults": ["P0300@12+4"],
+}
+
+
+def test_speed_is_interpolated_between_breakpoints():
+    compiled = Cycle(SCRIPT).compile(0.5)
+    assert compiled.n_ticks == 65  # 32 s at 2 Hz, both ends included
+    speed = dict(zip((tick * 0.5 for tick in range(compiled.n_ticks)), compiled.speed))
+    assert speed[0] == 0 and speed[2.5] == 12.5 and speed[5] == 25 and speed[10] == 50
+    assert speed[15] == 50 and speed[25] == 25 and speed[30] == 0 and speed[32] == 0
+
+
+def test_events_are_piecewise_constant():
+    compiled = Cycle(SCRIPT).compile(1.0)
+    ac, scenario, brake, car = (compiled.columns[name] for name in
+                                ("ac_on", "selected_scenario", "brake_applied", "car_on"))
+    assert ac[4] is False and ac[5] is True and ac[32] is True
+    assert scenario[14] == "City Road" and scenario[15] == "Highway"
+    assert brake[14] is False and brake[15] is True
+    assert car[31] is True and car[32] is False
+
+
+def test_compiled_cycles_are_cached_per_dt():
+    cycle = Cycle(SCRIPT)
+    assert cycle.compile(0.1) is cycle.compile(0.1)
+    assert cycle.compile(0.1) is not cycle.compile(1.0)
+
+
+def test_engine_follows_the_script_and_holds_the_last_tick(tmp_path):
+    path = tmp_path / "script.json"
+    path.write_text(json.dumps(SCRIPT), encoding="utf-8")
+    engine = SimulationEngine(seed=1)
+    engine.drive_cycle = str(path)
+    speeds, faults = [], []
+    for _ in range(40):
+        engine.step()
+        speeds.append(engine.speed)
+        faults.append(engine.present_faults())
+    assert speeds[:11] == [0, 5, 10, 15, 20, 25, 30, 35, 40, 45, 50]
+    assert speeds[30:] == [0] * 10 and engine.car_on is False
+    assert "P0300 - Random/Multiple Cylinder Misfire Detected" not in faults[10]
+    assert "P0300 - Random/Multiple Cylinder Misfire Detected" in faults[12]
+
+
+def test_random_cycles_are_reproducible():
+    assert random_cycle(7).speed == random_cycle(7).speed
+    assert random_cycle(7).speed != random_cycle(8).speed
+    assert load_cycle("random:7") is load_cycle("random:7")
+    cycle = random_cycle(7)
+    assert all(0 <= speed <= 130 for _, speed in cycle.speed)
+    assert all(a[0] <= b[0] for a, b in zip(cycle.speed, cycle.speed[1:]))
+
+
+def test_library_cycles():
+    assert {"NEDC", "WLTP", "FTP-75", "HWFET"} <= set(CYCLES)
+    nedc = CYCLES["NEDC"]
+    assert nedc.duration_s == 1180 and nedc.distance_km() == pytest.approx(11.0, abs=0.3)
+
+
+@pytest.mark.parametrize("change, message", [
+    ({"speed": [[0, 0], [10, 5], [5, 0]]}, "must not decrease"),
+    ({"speed": []}, "no speed breakpoints"),
+    ({"events": [{"t": 1, "gear": 3}]}, "unknown event fields"),
+    ({"faults": ["P9999"]}, "unknown fault"),
+])
+def test_invalid_scripts(change, message):
+    with pytest.raises(ValueError, match=message):
+        Cycle({**SCRIPT, **change})
@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtWidgets = pytest.importorskip("PyQt6.QtWidgets")
+
+from dashboard import Dashboard, format_value  # noqa: E402
+from engine import SimulationEngine  # noqa: E402
+
+START_MS = 1_700_000_000_000
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+def drive_rows(ticks):
+    engine = SimulationEngine(seed=4)
+    engine.car_on = True
+    rows = []
+    for tick in range(ticks):
+        engine.step()
+        rows.append(engine.row(START_MS + 100 * tick))
+    return rows
+
+
+def test_refresh_shows_the_newest_row(app):
+    dashboard = Dashboard()
+    dashboard.refresh_timer.stop()
+    rows = drive_rows(20)
+    dashboard.add_source(lambda: rows[:])
+    dashboard.refresh()
+    name = next(iter(dashboard.value_labels))
+    assert dashboard.value_labels[name].text() == format_value(rows[-1][1])
+    assert dashboard.buffers[name].count == 20
+    assert not dashboard.dirty
+
+
+def test_clear_resets_the_screen_and_redraws_a_repeated_value(app):
+    dashboard = Dashboard()
+    dashboard.refresh_timer.stop()
+    row = drive_rows(1)[0]
+    dashboard.push(row)
+    dashboard.refresh()
+    dashboard.clear()
+    assert dashboard.status_label.text() == ""
+    assert all(label.text() == "-" for label in dashboard.value_labels.values())
+    assert all(gauge.value == gauge.low for gauge in dashboard.gauges.values())
+    assert all(buffer.count == 0 for buffer in dashboard.buffers.values())
+    dashboard.refresh()  # nothing pushed since the clear: the blank screen stays
+    assert dashboard.status_label.text() == ""
+    dashboard.push(row)  # the same values again must reach the labels despite the text cache
+    dashboard.refresh()
+    name = next(iter(dashboard.value_labels))
+    assert dashboard.value_labels[name].text() == format_value(row[1])
+    assert dashboard.status_label.text()
@@ -0,0 +1,34 @@
+import pytest
+
+from dataset import allocate, plan_dataset, strata
+
+
+def test_allocate_keeps_stratum_counts_and_split_totals():
+    counts = [5] * 40 + [13] * 7
+    sizes = allocate(counts, (0.8, 0.1, 0.1))
+    assert sizes.sum(axis=1).tolist() == counts
+    totals = sizes.sum(axis=0)
+    assert abs(totals - [0.8 * sum(counts), 0.1 * sum(counts), 0.1 * sum(counts)]).max() <= 1
+
+
+@pytest.mark.parametrize("count", [5, 15])
+def test_allocate_does_not_favour_the_earlier_split(count):
+    val, test = allocate([count] * 20, (0.8, 0.1, 0.1)).sum(axis=0)[1:]
+    assert abs(val - test) <= 1
+
+
+def test_allocate_leaves_zero_fraction_splits_empty():
+    assert allocate([7, 3], (1, 0, 0)).tolist() == [[7, 0, 0], [3, 0, 0]]
+
+
+def test_plan_rejects_an_empty_split():
+    with pytest.raises(ValueError):
+        plan_dataset(strata()[:1], [2], (0.8, 0.1, 0.1), seed=0, shard_windows=10)
+
+
+def test_plan_is_deterministic_and_sharded():
+    combinations = strata(scenarios=["Highway"])[:4]
+    plan = plan_dataset(combinations, [30] * 4, (0.8, 0.1, 0.1), seed=3, shard_windows=25)
+    assert plan == plan_dataset(combinations, [30] * 4, (0.8, 0.1, 0.1), seed=3, shard_windows=25)
+    assert [sum(map(len, shards)) for shards in plan] == [96, 12, 12]
+    assert max(len(shard) for shard in plan[0]) == 25
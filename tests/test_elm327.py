@@ -0,0 +1,83 @@
+import pytest
+
+from catalog import CATALOG
+from elm327 import DEFAULT_VIN, MODE01_ENCODERS, ELM327Emulator, ELM327Session, encode_dtc, format_message
+from engine import SimulationEngine
+
+
+@pytest.fixture
+def session():
+    engine = SimulationEngine(fault=CATALOG.resolve("P0217"), physics=True, seed=4)
+    engine.car_on = True
+    engine.speed = 60
+    for _ in range(20):
+        engine.step()
+    session = ELM327Session(ELM327Emulator(engine))
+    session.handle("ATE0")
+    return session
+
+
+def query(session, request):
+    """Data bytes of a single-frame reply"""
+    reply = session.handle(request)
+    assert reply.endswith("\r\r>")
+    return [int(byte, 16) for byte in reply[:-3].split()]
+
+
+def decode_pid(session, pid):
+    data = query(session, f"01{pid:02X}")
+    assert data[:2] == [0x41, pid]
+    return data[2:]
+
+
+def test_mode01_live_data(session):
+    sensors = session.emulator.engine.sensor_data
+    a, b = decode_pid(session, 0x0C)
+    assert (256 * a + b) / 4 == sensors["Engine RPM"]
+    assert decode_pid(session, 0x0D) == [round(sensors["Wheel Speed (km/h)"])]
+    assert decode_pid(session, 0x05)[0] - 40 == round(sensors["Coolant Temp (°C)"])
+    a, b = decode_pid(session, 0x23)
+    assert (256 * a + b) * 10 == pytest.approx(sensors["Fuel Pressure (kPa)"], abs=5)
+    a, b = decode_pid(session, 0x42)
+    assert (256 * a + b) / 1000 == pytest.approx(sensors["Battery Voltage (V)"], abs=1e-3)
+
+
+def test_supported_pid_bitmaps(session):
+    supported = set()
+    for base in (0x00, 0x20, 0x40):
+        bits = int.from_bytes(bytes(decode_pid(session, base)), "big")
+        supported |= {base + 0x20 - shift for shift in range(32) if bits >> shift & 1}
+    assert supported == set(MODE01_ENCODERS) | {0x01, 0x20, 0x40}
+    assert 0x23 in supported and 0x0A not in supported
+    assert session.handle("010A") == "NO DATA\r\r>"
+
+
+def test_dtcs_and_clearing(session):
+    data = query(session, "03")
+    assert data == [0x43, 1] + encode_dtc("P0217")
+    status = decode_pid(session, 0x01)
+    assert status[0] == 0x81  # MIL on, one DTC
+    assert session.handle("04") == "44\r\r>"
+    assert query(session, "03") == [0x43, 0]
+
+
+def test_headers_and_multi_frame_vin(session):
+    assert session.handle("ATH1") == "OK\r\r>"
+    assert session.handle("010D").startswith("7E8 03 41 0D ")
+    session.handle("ATH0")
+    lines = session.handle("0902")[:-3].split("\r")
+    assert lines[0] == "014"  # 20 bytes over three ISO-TP frames
+    payload = [int(byte, 16) for line in lines[1:] for byte in line.split(":")[1].split()]
+    assert bytes(payload[3:]).decode() == DEFAULT_VIN
+
+
+def test_at_commands(session):
+    assert session.handle("ATRV") == f"{session.emulator.engine.sensor_data['Battery Voltage (V)']:.1f}V\r\r>"
+    assert session.handle("ATS0") == "OK\r\r>"
+    assert session.handle("010D") == "410D3C\r\r>"
+    assert session.handle("ATZZ") == "?\r\r>"
+    assert session.handle("ATZ").startswith("ATZ\r")  # reset turns echo back on
+
+
+def test_format_message_without_spaces():
+    assert format_message([0x41, 0x0C, 0x1B, 0xE0], headers=True, spaces=False) == "7E804410C1BE0"
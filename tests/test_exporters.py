@@ -0,0 +1,121 @@
+import os
+
+import numpy as np
+import pytest
+
+import exporters
+from engine import CSV_COLUMNS, SimulationEngine
+from exporters import CSVWriter, NpyWriter, ShardedWriter, _scan_part, infer_format, open_exporter
+from playback import ShardedLog
+from sinks import StreamingSink
+
+START_MS = 1_700_000_000_000
+
+
+def sample_rows(n):
+    engine = SimulationEngine(seed=5)
+    engine.car_on = True
+    rows = []
+    for tick in range(n):
+        engine.step()
+        rows.append(engine.row(START_MS + 1000 * tick))
+    return rows
+
+
+@pytest.fixture
+def fsyncs(monkeypatch):
+    """Count the writers' fsync calls instead of making them"""
+    calls = []
+    monkeypatch.setattr(exporters.os, "fsync", calls.append)
+    return calls
+
+
+def test_csv_appends_under_one_header_unless_truncated(tmp_path):
+    path = str(tmp_path / "log.csv")
+    for truncate in (False, False, True):
+        writer = CSVWriter(path, truncate=truncate)
+        writer.write_rows(sample_rows(5))
+        writer.close()
+    with open(path, encoding="utf-8") as file:
+        lines = file.read().splitlines()
+    assert lines[0] == ",".join(CSV_COLUMNS) and len(lines) == 6
+
+
+def test_parquet_flushes_write_only_full_row_groups(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "log.parquet")
+    with StreamingSink(exporters.ParquetWriter(path, row_group_rows=250), flush_rows=10) as sink:
+        for row in sample_rows(600):
+            sink.append(row)
+    metadata = pq.ParquetFile(path).metadata
+    assert [metadata.row_group(index).num_rows for index in range(metadata.num_row_groups)] == [250, 250, 100]
+
+
+def test_fsync_is_opt_in(tmp_path, fsyncs):
+    rows = sample_rows(20)
+    for writer in (CSVWriter(str(tmp_path / "log.csv")), NpyWriter(str(tmp_path / "log.npy"))):
+        writer.write_rows(rows)
+        writer.flush()
+        writer.close()
+    assert fsyncs == []
+    for writer, files in ((CSVWriter(str(tmp_path / "durable.csv"), durable=True), 1),
+                          (NpyWriter(str(tmp_path / "durable.npy"), durable=True), 4)):
+        writer.write_rows(rows)
+        writer.flush()
+        assert len(fsyncs) == files
+        writer.close()
+        fsyncs.clear()
+
+
+def test_sharded_parts_stay_durable(tmp_path, fsyncs):
+    writer = ShardedWriter(str(tmp_path / "log.shards"), compression="none")
+    writer.write_rows(sample_rows(20))
+    writer.flush()
+    assert len(fsyncs) == 1
+    writer.close()
+
+
+def test_infer_format(tmp_path):
+    assert infer_format("a.csv") == "csv" and infer_format("a.PQ") == "parquet" and infer_format("a.npz") == "npz"
+    assert infer_format(str(tmp_path)) == "npy"
+    with pytest.raises(ValueError, match="Cannot infer"):
+        infer_format(str(tmp_path / "log.txt"))
+    with pytest.raises(ValueError, match="Unknown export format"):
+        open_exporter(str(tmp_path / "log.csv"), "xlsx")
+
+
+def test_npy_columns_are_readable_after_a_flush(tmp_path):
+    path = str(tmp_path / "log.npy")
+    writer = NpyWriter(path)
+    writer.write_rows(sample_rows(30))
+    writer.flush()  # never closed, as after a crash
+    assert np.load(os.path.join(path, "signals.npy"), mmap_mode="r").shape[0] == 30
+    assert np.load(os.path.join(path, "timestamp_ms.npy"))[-1] == START_MS + 29_000
+
+
+def test_scan_part_trims_a_torn_row(tmp_path):
+    path = str(tmp_path / "000000.csv.part")
+    writer = CSVWriter(path)
+    writer.write_rows(sample_rows(10))
+    writer.close()
+    size = os.path.getsize(path)
+    with open(path, "ab") as file:
+        file.write(b"2023-11-14 22:13:30,12")
+    assert _scan_part(path) == (10, START_MS, START_MS + 9000)
+    assert os.path.getsize(path) == size
+
+
+def test_sharded_writer_recovers_a_crashed_shard(tmp_path):
+    path = str(tmp_path / "log.shards")
+    rows = sample_rows(250)
+    writer = ShardedWriter(path, max_seconds=100, compression="gzip")
+    writer.write_rows(rows)
+    writer.flush()  # the crash: the open shard is never rotated, so it stays a .part
+    writer._compressor.shutdown(wait=True)
+    with open(writer._part, "ab") as file:
+        file.write(b"2023-11-14 22:17:")
+    ShardedWriter(path, compression="gzip").close()
+    log = ShardedLog(path)
+    assert sum(shard["rows"] for shard in log.shards) == len(rows)
+    assert [row[0] for row in log.rows()] == [row[0] for row in rows]
+    assert not [name for name in os.listdir(path) if name.endswith((".part", ".tmp"))]
@@ -0,0 +1,79 @@
+import pytest
+
+from catalog import CATALOG
+from engine import CLAMP_BOUNDS, SIGNAL_NAMES, SimulationEngine
+from faults import ADD, FAULT_EFFECTS, SET, fault_intensity, parse_fault_spec
+
+
+def run(fault="No Faults Detected", ticks=200, car_on=True, speed=60, **options):
+    engine = SimulationEngine(fault=fault, seed=21, **options)
+    engine.car_on = car_on
+    engine.speed = speed
+    for _ in range(ticks):
+        yield engine.step()
+
+
+def clamped(name, low, high):
+    bounds = CLAMP_BOUNDS.get(name, (float("-inf"), float("inf")))
+    return max(low, bounds[0]), min(high, bounds[1])
+
+
+def test_registry_covers_the_catalog():
+    assert set(FAULT_EFFECTS) == set(CATALOG.faults)
+    for specs in FAULT_EFFECTS.values():
+        for spec in specs:
+            assert spec["signal"] in SIGNAL_NAMES
+            assert spec["op"] in (SET, ADD) and spec["low"] <= spec["high"]
+
+
+@pytest.mark.parametrize("physics", [False, True])
+@pytest.mark.parametrize("fault", sorted(FAULT_EFFECTS))
+def test_set_effects_hold_their_range(fault, physics):
+    specs = FAULT_EFFECTS[fault]
+    targets = [spec["signal"] for spec in specs]
+    checks = [spec for spec in specs if spec["op"] == SET and targets.count(spec["signal"]) == 1]
+    for data in run(fault, ticks=100, physics=physics):
+        for spec in checks:
+            low, high = clamped(spec["signal"], spec["low"], spec["high"])
+            assert low <= data[spec["signal"]] <= high, spec["signal"]
+
+
+def test_additive_effects_do_not_accumulate():
+    # Wheel speed follows the 60 km/h control; P0720 offsets it by -15..0 every tick, never more
+    speeds = [data["Wheel Speed (km/h)"] for data in run(CATALOG.resolve("P0720"), ticks=500)]
+    assert min(speeds) >= 45 and max(speeds) <= 60
+    assert len(set(speeds)) > 5
+
+
+def test_clamped_offsets_keep_wheel_speed_non_negative():
+    speeds = [data["Wheel Speed (km/h)"] for data in run(CATALOG.resolve("P0720"), ticks=300, speed=5)]
+    assert min(speeds) == 0 and max(speeds) <= 5
+
+
+def test_running_effects_skip_a_stopped_engine():
+    for data in run(CATALOG.resolve("P0507"), ticks=50, car_on=False):
+        assert data["Engine RPM"] == 0
+        assert data["Short Term Fuel Trim (%)"] == 0
+    rpms = [data["Engine RPM"] for data in run(CATALOG.resolve("P0507"), ticks=50, car_on=True)]
+    assert min(rpms) > 0
+
+
+def test_faults_ramp_in_from_their_onset():
+    engine = SimulationEngine(seed=5)
+    engine.car_on = True
+    engine.active_faults = (parse_fault_spec("P0217 - Engine Over Temperature@10+20"),)
+    coolant = [engine.step()["Coolant Temp (°C)"] for _ in range(60)]
+    baseline = max(coolant[:9])
+    assert baseline < 110
+    assert baseline < coolant[19] < 120  # half-way through the ramp
+    assert all(110 <= value <= 120 for value in coolant[30:])
+    assert engine.present_faults() == ["No Faults Detected", "P0217 - Engine Over Temperature"]
+
+
+def test_fault_intensity_and_spec_parsing():
+    assert fault_intensity(5, 10, 20) == 0
+    assert fault_intensity(20, 10, 20) == 0.5
+    assert fault_intensity(40, 10, 20) == 1
+    assert fault_intensity(10, 10) == 1
+    assert parse_fault_spec("P0300@600+120") == ("P0300", 600.0, 120.0)
+    assert parse_fault_spec("P0300") == ("P0300", 0.0, 0.0)
@@ -0,0 +1,45 @@
+import numpy as np
+
+from catalog import CATALOG
+from engine import SimulationEngine
+from features import MAX_GAP_MS, NUMERIC_FEATURES, BatchFeatures, FeatureState, batch_features
+
+START_MS = 1_700_000_000_000
+
+
+def sample_rows():
+    """Two runs: a physics drive with a long pause in it, then a dict-mode run starting earlier in time"""
+    engine = SimulationEngine(fault=CATALOG.resolve("P0217"), physics=True, seed=9)
+    engine.car_on = True
+    engine.speed = 70
+    rows = []
+    for tick in range(800):
+        engine.step()
+        rows.append(engine.row(START_MS + 1000 * tick + (MAX_GAP_MS * 2 if tick >= 500 else 0)))
+    engine = SimulationEngine(seed=10)
+    engine.car_on = True
+    for tick in range(400):
+        engine.step()
+        rows.append(engine.row(START_MS + 500 * tick))
+    return rows
+
+
+def columns(rows):
+    timestamps = np.array([row[0] for row in rows], dtype=np.int64)
+    return timestamps, np.array([row[1:-2] for row in rows], dtype=np.float64)
+
+
+def test_online_and_batch_features_agree():
+    rows = sample_rows()
+    state = FeatureState()
+    online = np.array([state.update(row)[:len(NUMERIC_FEATURES)] for row in rows], dtype=np.float64)
+    np.testing.assert_allclose(batch_features(*columns(rows)), online, atol=2e-3)
+
+
+def test_chunked_batch_features_match_one_pass():
+    rows = sample_rows()
+    timestamps, signals = columns(rows)
+    compute = BatchFeatures()
+    chunks = [compute(timestamps[start:start + 137], signals[start:start + 137])
+              for start in range(0, len(rows), 137)]
+    np.testing.assert_allclose(np.concatenate(chunks), batch_features(timestamps, signals), atol=1e-9)
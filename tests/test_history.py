@@ -0,0 +1,132 @@
+import json
+import urllib.request
+
+import numpy as np
+import pytest
+
+from history import HistoryStore, _merge
+from schema import N_SIGNALS, SIGNAL_NAMES
+
+START_MS = 1_700_000_040_000  # On a minute boundary
+RPM = SIGNAL_NAMES[0]
+
+
+def row(timestamp_ms, value):
+    return (timestamp_ms,) + (float(value),) * N_SIGNALS
+
+
+def fill(store, seconds, hz=10, start_ms=START_MS):
+    """Signal value = sample number, hz samples per second"""
+    for n in range(seconds * hz):
+        store.append(row(start_ms + n * 1000 // hz, n))
+
+
+def test_second_rollups_hold_min_max_and_mean_of_each_closed_bucket():
+    store = HistoryStore()
+    fill(store, 5)
+    result = store.query(RPM, resolution="1s")
+    assert result["timestamp_ms"] == [START_MS + 1000 * s for s in range(4)]  # the fifth second is still open
+    columns = result["signals"][RPM]
+    assert columns["min"] == [10.0 * s for s in range(4)]
+    assert columns["max"] == [10.0 * s + 9 for s in range(4)]
+    assert columns["mean"] == pytest.approx([10.0 * s + 4.5 for s in range(4)])
+
+
+def test_minute_rollups_weight_seconds_by_their_sample_count():
+    store = HistoryStore()
+    for n in range(330):  # one sample per second in the first half minute, ten in the second
+        second = n if n < 30 else 30 + (n - 30) // 10
+        offset = 0 if n < 30 else (n - 30) % 10 * 100
+        store.append(row(START_MS + second * 1000 + offset, n))
+    store.append(row(START_MS + 60_000, 0))
+    store.append(row(START_MS + 61_000, 0))  # closing the first second of the next minute closes the minute
+    result = store.query(RPM, resolution="1min")
+    assert result["timestamp_ms"] == [START_MS]
+    columns = result["signals"][RPM]
+    assert columns["min"] == [0.0] and columns["max"] == [329.0]
+    assert columns["mean"] == pytest.approx([164.5])  # an unweighted mean of the seconds would be 97
+    assert store.minutes.counts[0] == 330
+
+
+def test_raw_ring_keeps_only_the_newest_samples_in_time_order():
+    store = HistoryStore(raw_samples=25)
+    fill(store, 4)
+    result = store.query(RPM, resolution="raw")
+    assert result["timestamp_ms"] == [START_MS + n * 100 for n in range(15, 40)]
+    assert result["signals"][RPM]["value"] == [float(n) for n in range(15, 40)]
+    window = store.query(RPM, START_MS + 1800, START_MS + 2200, resolution="raw")
+    assert window["signals"][RPM]["value"] == [18.0, 19.0, 20.0, 21.0, 22.0]
+
+
+def test_rollups_survive_raw_wraparound():
+    store = HistoryStore(raw_samples=25, second_buckets=3)
+    fill(store, 6)
+    result = store.query(RPM, resolution="1s")
+    assert result["timestamp_ms"] == [START_MS + 1000 * s for s in (2, 3, 4)]
+    assert result["signals"][RPM]["mean"] == pytest.approx([24.5, 34.5, 44.5])
+
+
+def test_earlier_timestamp_starts_the_history_over():
+    store = HistoryStore()
+    fill(store, 3)
+    store.append(row(START_MS - 60_000, 7))
+    assert store.raw.total == 1 and store.seconds.total == 0
+    assert store.query(RPM)["signals"][RPM]["value"] == [7.0]
+
+
+def test_unspecified_resolution_picks_the_finest_tier_within_max_points():
+    store = HistoryStore()
+    fill(store, 10)
+    assert store.query(RPM)["resolution"] == "raw"
+    assert store.query(RPM, max_points=50)["resolution"] == "1s"
+    with pytest.raises(ValueError):
+        store.query(RPM, resolution="1h")
+
+
+def test_raw_ring_that_no_longer_covers_the_start_defers_to_rollups():
+    store = HistoryStore(raw_samples=25)
+    fill(store, 10)
+    assert store.query(RPM, START_MS)["resolution"] == "1s"
+    assert store.query(RPM, START_MS + 8000)["resolution"] == "raw"
+
+
+def test_merge_combines_buckets_by_count():
+    timestamps = np.array([0, 1000, 2000, 3000, 4000], dtype=np.int64)
+    values = {
+        "min": np.array([[1.0], [0.0], [5.0], [2.0], [3.0]], dtype=np.float32),
+        "max": np.array([[4.0], [9.0], [6.0], [8.0], [3.0]], dtype=np.float32),
+        "mean": np.array([[2.0], [5.0], [5.5], [4.0], [3.0]], dtype=np.float32),
+    }
+    counts = np.array([1, 3, 2, 2, 4], dtype=np.int64)
+    merged_timestamps, merged = _merge(timestamps, values, counts, 2)
+    assert merged_timestamps.tolist() == [0, 3000]
+    assert merged["min"][:, 0].tolist() == [0.0, 2.0]
+    assert merged["max"][:, 0].tolist() == [9.0, 8.0]
+    assert merged["mean"][:, 0] == pytest.approx([(2 + 15 + 11) / 6, (8 + 12) / 6])
+
+
+def test_query_merges_rollups_beyond_max_points():
+    store = HistoryStore()
+    fill(store, 9)
+    result = store.query(RPM, resolution="1s", max_points=4)
+    assert result["timestamp_ms"] == [START_MS + 1000 * s for s in (0, 2, 4, 6)]
+    assert result["signals"][RPM]["min"] == [0.0, 20.0, 40.0, 60.0]
+    assert result["signals"][RPM]["max"] == [19.0, 39.0, 59.0, 79.0]
+    assert result["signals"][RPM]["mean"] == pytest.approx([9.5, 29.5, 49.5, 69.5])
+
+
+def test_http_endpoint_serves_the_last_window():
+    from history import serve
+
+    store = HistoryStore()
+    fill(store, 5)
+    server = serve(store, 0)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/history?signal={RPM.replace(' ', '%20')}&last=0.25"
+        with urllib.request.urlopen(url, timeout=5) as response:
+            result = json.load(response)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert result["resolution"] == "raw"
+    assert result["signals"][RPM]["value"] == [47.0, 48.0, 49.0]
@@ -0,0 +1,89 @@
+import json
+import math
+
+import numpy as np
+import pytest
+
+from engine import SimulationEngine
+from noise import DEFAULT_NOISE, NoiseModel, NoiseProfile, ZERO_AT_REST, ou_bank
+from schema import SIGNAL_NAMES, Signal
+
+
+@pytest.fixture(scope="module")
+def fleet_bank():
+    """(ticks, vehicles, processes) default-profile noise, 300 simulated seconds past a cold start"""
+    profile = NoiseProfile.load()
+    state = np.zeros((2000, len(profile.signals) + 1))
+    bank = ou_bank(np.random.default_rng(0), state, np.append(profile.tau, 1.0), profile.cholesky, 5.0, 62)
+    return profile, bank[60:]
+
+
+def column(profile, signal):
+    return profile.signals.index(signal)
+
+
+def test_processes_have_unit_variance(fleet_bank):
+    profile, bank = fleet_bank
+    for signal in (Signal.ENGINE_RPM, Signal.COOLANT_TEMP, Signal.EXHAUST_GAS_TEMP):
+        assert bank[0, :, column(profile, signal)].std() == pytest.approx(1.0, abs=0.05)
+
+
+@pytest.mark.parametrize("a, b, rho", [
+    (Signal.ENGINE_RPM, Signal.INJECTOR_PULSE_WIDTH, 0.8),
+    (Signal.ENGINE_RPM, Signal.WHEEL_SPEED, 0.6),
+    (Signal.INJECTOR_PULSE_WIDTH, Signal.WHEEL_SPEED, 0.5),
+    (Signal.SHORT_TERM_FUEL_TRIM, Signal.INJECTOR_PULSE_WIDTH, 0.4),
+    (Signal.ENGINE_RPM, Signal.COOLANT_TEMP, 0.0),
+])
+def test_cross_signal_correlations(fleet_bank, a, b, rho):
+    # Processes with the same correlation time keep their innovations' correlation
+    profile, bank = fleet_bank
+    measured = np.corrcoef(bank[0, :, column(profile, a)], bank[0, :, column(profile, b)])[0, 1]
+    assert measured == pytest.approx(rho, abs=0.06)
+
+
+@pytest.mark.parametrize("signal", [Signal.COOLANT_TEMP, Signal.TRANSMISSION_TEMP, Signal.ENGINE_RPM])
+def test_autocorrelation_follows_the_correlation_time(fleet_bank, signal):
+    profile, bank = fleet_bank
+    index = column(profile, signal)
+    measured = np.corrcoef(bank[0, :, index], bank[1, :, index])[0, 1]
+    assert measured == pytest.approx(math.exp(-5.0 / DEFAULT_NOISE[signal].tau), abs=0.06)
+
+
+def test_apply_quantizes_and_keeps_zero_at_rest_signals_at_zero():
+    model = NoiseModel(NoiseProfile.load(), seed=3)
+    zeros = {name: 0 for name in SIGNAL_NAMES}
+    for _ in range(50):
+        model.next(1.0)
+        data, saved = dict(zeros), {}
+        model.apply(data, saved)
+        for signal in ZERO_AT_REST:
+            assert data[SIGNAL_NAMES[signal]] == 0
+    # A genuine zero of any other signal is measured like any other value
+    assert data[SIGNAL_NAMES[Signal.STEERING_ANGLE]] != 0
+    assert saved[SIGNAL_NAMES[Signal.STEERING_ANGLE]] == 0
+    quantum = DEFAULT_NOISE[Signal.COOLANT_TEMP].quantum
+    data = {SIGNAL_NAMES[Signal.COOLANT_TEMP]: 90.0}
+    model.apply(data, {})
+    assert data[SIGNAL_NAMES[Signal.COOLANT_TEMP]] % quantum == 0
+
+
+def test_noisy_engine_at_rest():
+    engine = SimulationEngine(physics=True, noise="default", seed=8)
+    for _ in range(30):
+        data = engine.step()
+        assert data["Engine RPM"] == 0 and data["Wheel Speed (km/h)"] == 0 and data["Fuel Pressure (kPa)"] == 0
+    engine.car_on = True
+    rpms = {engine.step()["Engine RPM"] for _ in range(30)}
+    assert len(rpms) > 10
+
+
+def test_profile_files(tmp_path):
+    path = tmp_path / "profile.json"
+    path.write_text(json.dumps({"signals": {"Engine RPM": {"sigma": 40, "tau": 2, "quantum": 1}}}), encoding="utf-8")
+    profile = NoiseProfile.load(str(path))
+    index = column(profile, Signal.ENGINE_RPM)
+    assert profile.sigma[index] == 40 and profile.tau[index] == 2
+    path.write_text(json.dumps({"correlations": [["Engine RPM", "Coolant Temp (°C)", 1.5]]}), encoding="utf-8")
+    with pytest.raises(ValueError, match="positive definite"):
+        NoiseProfile.load(str(path))
@@ -0,0 +1,110 @@
+import builtins
+import os
+import shutil
+
+import pytest
+
+import playback
+from engine import SimulationEngine
+from exporters import CSVWriter, open_exporter
+from playback import CSVLog, open_log
+
+START_MS = 1_700_000_000_000
+SAMPLE_LOG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "obd-II_data.csv")
+
+
+def record(path, n_rows, start=0, **options):
+    engine = SimulationEngine(seed=9)
+    engine.car_on = True
+    engine.speed = 50
+    writer = open_exporter(path, **options)
+    rows = []
+    for index in range(start, start + n_rows):
+        engine.step()
+        rows.append(engine.row(START_MS + 1000 * index))
+    writer.write_rows(rows)
+    writer.close()
+    return rows
+
+
+def key(row):
+    """Timestamp, RPM and fault code: columns every log layout keeps"""
+    return row[0], row[1], row[-2]
+
+
+@pytest.fixture
+def small_stride(monkeypatch):
+    monkeypatch.setattr(playback, "INDEX_STRIDE_BYTES", 512)
+
+
+def test_csv_round_trip_and_seek(tmp_path, small_stride):
+    path = str(tmp_path / "log.csv")
+    rows = record(path, 300)
+    log = CSVLog(path)
+    assert len(log.index) > 10
+    assert [key(row) for row in log.rows()] == [key(row) for row in rows]
+    assert [key(row) for row in log.rows(START_MS + 123_500)] == [key(row) for row in rows[124:]]
+    assert list(log.rows(START_MS + 10_000_000)) == []
+
+
+def test_headerless_log_reads_as_csv_columns(tmp_path, small_stride):
+    path = str(tmp_path / "log.csv")
+    rows = record(path, 100)
+    with open(path, encoding="utf-8") as file:
+        lines = file.readlines()
+    with open(path, "w", encoding="utf-8") as file:
+        file.writelines(lines[1:])
+    log = CSVLog(path)
+    assert log.data_offset == 0
+    assert [key(row) for row in log.rows(START_MS + 50_000)] == [key(row) for row in rows[50:]]
+
+
+def test_shipped_sample_log_opens(tmp_path):
+    path = str(tmp_path / "sample.csv")
+    shutil.copy(SAMPLE_LOG, path)
+    rows = list(open_log(path).rows())
+    assert rows and all(rows[i][0] <= rows[i + 1][0] for i in range(len(rows) - 1))
+
+
+def test_cached_index_is_extended_when_the_log_grows(tmp_path, small_stride):
+    path = str(tmp_path / "log.csv")
+    rows = record(path, 100)
+    first = CSVLog(path).index
+    assert os.path.exists(path + ".index.json")
+    writer = CSVWriter(path)  # appends without a second header
+    engine = SimulationEngine(seed=10)
+    more = []
+    for index in range(100, 200):
+        engine.step()
+        more.append(engine.row(START_MS + 1000 * index))
+    writer.write_rows(more)
+    writer.close()
+    log = CSVLog(path)
+    assert log.index[:len(first)] == first and len(log.index) > len(first)
+    assert [key(row) for row in log.rows(START_MS + 150_000)] == [key(row) for row in (rows + more)[150:]]
+
+
+def test_index_stays_in_memory_when_the_directory_is_read_only(tmp_path, monkeypatch):
+    path = str(tmp_path / "log.csv")
+    rows = record(path, 50)
+    real_open = builtins.open
+
+    def read_only_open(name, mode="r", *args, **kwargs):
+        if str(name).endswith(".tmp") and "w" in mode:
+            raise PermissionError(13, "Permission denied", name)
+        return real_open(name, mode, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "open", read_only_open)
+    log = CSVLog(path)
+    assert log.index and os.listdir(tmp_path) == ["log.csv"]
+    assert [key(row) for row in log.rows()] == [key(row) for row in rows]
+
+
+@pytest.mark.parametrize("name", ["log.npy", "log.npz", "log.parquet"])
+def test_columnar_logs_seek_like_csv(tmp_path, name):
+    if name.endswith(".parquet"):
+        pytest.importorskip("pyarrow")
+    path = str(tmp_path / name)
+    rows = record(path, 200)
+    log = open_log(path)
+    assert [key(row) for row in log.rows(START_MS + 120_000)] == [key(row) for row in rows[120:]]
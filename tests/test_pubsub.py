@@ -0,0 +1,32 @@
+import pytest
+
+from pubsub import ALL_SIGNALS, decode_struct, encode_struct, topic_matches
+
+
+@pytest.mark.parametrize("topic_filter, topic, expected", [
+    ("obd/vehicle/1", "obd/vehicle/1", True),
+    ("obd/vehicle/+", "obd/vehicle/7", True),
+    ("obd/+/7", "obd/vehicle/7", True),
+    ("obd/#", "obd/vehicle/7", True),
+    ("#", "obd", True),
+    ("obd/vehicle/+", "obd/vehicle/7/extra", False),
+    ("obd/vehicle/+", "obd/vehicle", False),
+    ("obd/vehicle/1", "obd/vehicle/2", False),
+])
+def test_topic_matches(topic_filter, topic, expected):
+    assert topic_matches(topic_filter, topic) is expected
+
+
+def test_struct_round_trip():
+    timestamps = [1_700_000_000_000, 1_700_000_000_100]
+    values = [float(i) / 4 for i in range(2 * len(ALL_SIGNALS))]
+    assert decode_struct(encode_struct(timestamps, values)) == (timestamps, list(ALL_SIGNALS), 1, values)
+
+
+def test_struct_round_trip_from_a_fleet_array():
+    np = pytest.importorskip("numpy")
+    signals = bytes([0, 3, 20])
+    data = np.arange(2 * 5 * len(signals), dtype=np.float32).reshape(2, 5, len(signals))
+    timestamps, decoded, vehicles, values = decode_struct(encode_struct([1, 2], data, signals, vehicles=5))
+    assert (timestamps, decoded, vehicles) == ([1, 2], list(signals), 5)
+    assert values == data.ravel().tolist()
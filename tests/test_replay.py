@@ -0,0 +1,46 @@
+import pytest
+
+from engine import SimulationEngine
+from replay import replay, run_manifest
+from scheduler import SimClock
+
+START_MS = 1_700_000_000_000
+
+
+def record_run(n_ticks=500, **options):
+    """Rows and manifest of a run whose controls change halfway through"""
+    engine = SimulationEngine(fault="P0300 - Random/Multiple Cylinder Misfire Detected", seed=42, block_ticks=64,
+                              **options)
+    engine.car_on = True
+    engine.speed = 40
+    clock = SimClock(10.0, START_MS)
+    rows = []
+    for tick in range(n_ticks):
+        if tick == n_ticks // 2:
+            engine.speed = 90
+            engine.ac_on = True
+        engine.step()
+        rows.append(engine.row(clock.now_ms))
+        clock.advance()
+    return rows, run_manifest(engine, clock)
+
+
+@pytest.mark.parametrize("options", [{}, {"physics": True}, {"physics": True, "noise": "default"}])
+def test_replay_is_bit_exact(options):
+    rows, run = record_run(**options)
+    assert list(replay(run)) == rows
+
+
+def test_replay_slice_starts_mid_block():
+    rows, run = record_run(physics=True, noise="default")
+    assert list(replay(run, 300, 420)) == rows[300:420]
+
+
+def test_live_engine_keeps_no_history():
+    engine = SimulationEngine(seed=1, block_ticks=8, record=False)
+    for speed in range(100):
+        engine.speed = speed
+        engine.step()
+    assert engine.timeline == [] and engine.checkpoints == []
+    with pytest.raises(RuntimeError):
+        engine.manifest()
@@ -0,0 +1,63 @@
+import time
+
+import pytest
+
+from scheduler import Scheduler, SimClock, format_timestamp, parse_timestamp
+
+START_MS = 1_700_000_000_000
+
+
+def test_clock_has_no_drift():
+    clock = SimClock(10.0, START_MS)
+    for _ in range(36_000):
+        clock.advance()
+    assert clock.now_ms == START_MS + 3_600_000
+
+
+def test_stalled_tick_counts_the_late_ticks_and_catches_up():
+    scheduler = Scheduler("realtime", rate_hz=100, start_ms=START_MS)
+    stamps = []
+
+    def tick(timestamp_ms):
+        stamps.append(timestamp_ms)
+        if len(stamps) == 10:
+            time.sleep(0.2)
+
+    began = time.perf_counter()
+    assert scheduler.run(tick, n_ticks=50) == 50
+    elapsed = time.perf_counter() - began
+    # Ticks due during the stall start more than a period late; the deadlines stay absolute
+    assert 10 <= scheduler.late_ticks <= 30
+    assert elapsed < 0.6  # 0.49 s of deadlines; relative sleeps would take 0.69 s
+    assert stamps == [START_MS + 10 * index for index in range(50)]
+
+
+def test_realtime_without_stalls_has_no_late_ticks():
+    scheduler = Scheduler("realtime", rate_hz=200, start_ms=START_MS)
+    scheduler.run(lambda timestamp_ms: None, n_ticks=40)
+    assert scheduler.late_ticks == 0
+
+
+def test_accelerated_and_freerun_keep_simulated_time():
+    scheduler = Scheduler("accelerated", rate_hz=10, speedup=100, start_ms=START_MS)
+    stamps = []
+    began = time.perf_counter()
+    scheduler.run(stamps.append, duration_s=2)
+    assert time.perf_counter() - began < 0.5
+    assert stamps == [START_MS + 100 * index for index in range(20)]
+
+    freerun = Scheduler("freerun", rate_hz=1, start_ms=START_MS)
+    stamps = []
+    freerun.run(stamps.append, duration_s=3600)
+    assert len(stamps) == 3600 and stamps[-1] == START_MS + 3_599_000 and freerun.late_ticks == 0
+
+
+def test_invalid_settings():
+    with pytest.raises(ValueError):
+        Scheduler("warp")
+    with pytest.raises(ValueError):
+        Scheduler(rate_hz=0)
+
+
+def test_timestamp_round_trip():
+    assert parse_timestamp(format_timestamp(START_MS + 123)) == START_MS + 123
@@ -0,0 +1,27 @@
+import os
+import subprocess
+import sys
+
+SIMULATE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "simulate.py")
+
+
+def simulate(*args, cwd):
+    return subprocess.run([sys.executable, SIMULATE, *args], cwd=cwd, capture_output=True, text=True, timeout=120)
+
+
+def test_unknown_output_extension_is_a_usage_error(tmp_path):
+    result = simulate("generate", "--rows", "1", "--output", "log.txt", cwd=tmp_path)
+    assert result.returncode == 1
+    assert "Cannot infer export format" in result.stderr and "--format" in result.stderr
+    assert "Traceback" not in result.stderr
+    assert simulate("generate", "--rows", "1", "--output", "log.txt", "--format", "csv", cwd=tmp_path).returncode == 0
+
+
+def test_outputs_are_only_replaced_with_overwrite(tmp_path):
+    for command in (["generate", "--rows", "1", "--output", "log.csv"],
+                    ["batch", "--vehicles", "2", "--steps", "2", "--output", "fleet"]):
+        assert simulate(*command, cwd=tmp_path).returncode == 0
+        refused = simulate(*command, cwd=tmp_path)
+        assert refused.returncode == 1 and "pass --overwrite" in refused.stderr
+        assert simulate(*command, "--overwrite", cwd=tmp_path).returncode == 0
+    assert os.path.exists(tmp_path / "fleet.npz")
@@ -0,0 +1,92 @@
+import threading
+
+import pytest
+
+from engine import SimulationEngine
+from sinks import StreamingSink
+
+START_MS = 1_700_000_000_000
+
+
+class GatedWriter:
+    """Records written timestamps; write_rows waits until the gate opens"""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.writing = threading.Event()
+        self.timestamps = []
+        self.closed = False
+
+    def write_rows(self, rows):
+        self.writing.set()
+        self.gate.wait()
+        self.timestamps.extend(row[0] for row in rows)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def make_rows(n):
+    engine = SimulationEngine(seed=1)
+    rows = []
+    for index in range(n):
+        engine.step()
+        rows.append(engine.row(START_MS + 1000 * index))
+    return rows
+
+
+def fill(sink, writer, rows):
+    """Append the first block, wait for the writer to take it, then append the rest"""
+    for row in rows[:sink.flush_rows]:
+        sink.append(row)
+    assert writer.writing.wait(5)
+    for row in rows[sink.flush_rows:]:
+        sink.append(row)
+
+
+def test_block_policy_stalls_the_producer_until_the_writer_catches_up():
+    writer, rows = GatedWriter(), make_rows(30)
+    sink = StreamingSink(writer, flush_rows=10, flush_interval=60, max_rows=20)
+    producer = threading.Thread(target=fill, args=(sink, writer, rows))
+    producer.start()
+    producer.join(0.3)
+    assert producer.is_alive()  # one block in flight, one pending: the third waits
+    assert sink.buffered_rows == 30
+    writer.gate.set()
+    producer.join(5)
+    assert not producer.is_alive()
+    sink.close()
+    assert writer.timestamps == [row[0] for row in rows]
+    assert sink.rows_written == 30 and sink.dropped_rows == 0 and writer.closed
+
+
+def test_drop_policy_discards_the_oldest_pending_blocks():
+    writer, rows = GatedWriter(), make_rows(50)
+    sink = StreamingSink(writer, flush_rows=10, flush_interval=60, max_rows=20, overflow="drop")
+    fill(sink, writer, rows)  # never blocks
+    assert sink.dropped_rows == 30
+    writer.gate.set()
+    sink.close()
+    # The block being written survives, and so does the newest pending one
+    assert writer.timestamps == [row[0] for row in rows[:10] + rows[40:]]
+    assert sink.rows_written == 20
+
+
+def test_writer_errors_reach_the_producer():
+    class FailingWriter(GatedWriter):
+        def write_rows(self, rows):
+            raise OSError("disk full")
+
+    sink = StreamingSink(FailingWriter(), flush_rows=5, flush_interval=60)
+    for row in make_rows(5):
+        sink.append(row)
+    with pytest.raises(OSError, match="disk full"):
+        sink.flush()
+
+
+def test_unknown_overflow_policy():
+    with pytest.raises(ValueError):
+        StreamingSink(GatedWriter(), overflow="spill")
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from engine import SIGNAL_NAMES
+from vehicle import (BATTERY_AH, BRAKE_DECEL, FINAL_DRIVE, GEAR_RATIOS, IDLE_RPM, KEY_OFF_LOAD_A, MAX_ACCEL,
+                     TIRE_RADIUS_M, VehicleModel, simulate_fleet)
+
+SPEED = SIGNAL_NAMES.index("Wheel Speed (km/h)")
+RPM = SIGNAL_NAMES.index("Engine RPM")
+
+
+def drive(n_vehicles=50, n_steps=3000, dt=0.1, seed=5):
+    """Model state after every step of a random cruise across every scenario"""
+    model = VehicleModel(n_vehicles, dt, np.random.default_rng(seed))
+    model.car_on[:] = True
+    targets = np.random.default_rng(seed + 1).uniform(0, 130, (n_vehicles, n_steps // 200 + 1))
+    speed, rpm, gear = [], [], []
+    for t in range(n_steps):
+        model.target_speed[:] = targets[:, t // 200]
+        model.brake_applied[:] = t % 1000 > 950
+        model.step()
+        speed.append(model.speed.copy())
+        rpm.append(model.rpm.copy())
+        gear.append(model.gear.copy())
+    return np.array(speed).T, np.array(rpm).T, np.array(gear).T
+
+
+def test_speed_changes_within_the_acceleration_limits():
+    dt = 0.1
+    speed, _, _ = drive(dt=dt)
+    change = np.diff(speed, axis=1)
+    assert change.max() <= MAX_ACCEL * dt + 1e-9
+    assert change.min() >= -BRAKE_DECEL * dt - 1e-9
+    assert speed.min() >= 0
+
+
+def test_rpm_follows_wheel_speed_through_the_gear():
+    speed, rpm, gear = drive()
+    assert np.abs(np.diff(gear, axis=1)).max() <= 1  # one gear at a time
+    wheel_rpm = speed / 3.6 / (2 * np.pi * TIRE_RADIUS_M) * 60
+    expected = np.maximum(wheel_rpm * GEAR_RATIOS[gear] * FINAL_DRIVE, IDLE_RPM)
+    assert np.abs(rpm - expected).max() < 100  # 15 rpm sensor noise
+    steady = np.diff(gear, axis=1) == 0
+    assert np.abs(np.diff(rpm, axis=1))[steady].max() < 400  # no jumps between shifts
+
+
+def test_engine_off_stops_and_drains_the_battery_slowly():
+    model = VehicleModel(1, dt=60.0, rng=np.random.default_rng(0))
+    model.soc[:] = 0.9
+    for _ in range(10 * 60):  # ten hours parked
+        model.step()
+    assert model.rpm[0] == 0 and model.speed[0] == 0
+    assert model.soc[0] == pytest.approx(0.9 - KEY_OFF_LOAD_A * 10 / BATTERY_AH)
+    assert model.soc[0] > 0.89
+
+
+def test_fleet_signals_are_continuous():
+    data = simulate_fleet(20, 600, dt=0.5, scenarios="Highway", rng=np.random.default_rng(2))
+    assert np.abs(np.diff(data[..., SPEED], axis=1)).max() <= BRAKE_DECEL * 0.5 + 0.1  # rounded to 0.1 km/h
+    assert (data[:, 100:, RPM] >= 600).all()
@@ -0,0 +1,256 @@
+"""Time-stepped, vectorized vehicle model giving OBD-II signals real temporal structure.
+
+State is held in NumPy arrays with one entry per vehicle, so the same code
+advances a single GUI car or a fleet of thousands.  Every call to step()
+integrates a fixed dt: a rate-limited longitudinal model feeds a gearbox
+that ties RPM to wheel speed, first-order lags move coolant, catalyst,
+exhaust and transmission temperatures toward load-dependent targets, fuel
+burn drains the tank and the battery charges or discharges with the engine
+state.
+"""
+import numpy as np
+
+from batch import INITIAL_ROW, per_tick
+from engine import DrivingScenarios, SIGNAL_NAMES, generate_initial_data
+
+# Drivetrain
+GEAR_RATIOS = np.array([3.6, 2.1, 1.4, 1.0, 0.8, 0.65])
+FINAL_DRIVE = 3.9
+TIRE_RADIUS_M = 0.31
+IDLE_RPM = 750
+MAX_RPM = 6000
+UPSHIFT_RPM = 2500  # raised by up to 1500 rpm under full load
+DOWNSHIFT_RPM = 1200
+
+# Longitudinal dynamics (km/h per second)
+MAX_ACCEL = 12.0
+BRAKE_DECEL = 25.0
+COAST_DECEL = 2.0
+SPEED_RESPONSE_S = 3.0  # time constant for closing the gap to the target speed
+
+# Thermal time constants (seconds)
+COOLANT_TAU = 120.0
+CATALYST_TAU = 30.0
+EGT_TAU = 5.0
+TRANSMISSION_TAU = 300.0
+
+# Fuel and electrical system
+TANK_LITRES = 50.0
+IDLE_FUEL_LPH = 0.8
+BATTERY_AH = 60.0
+CHARGE_RATE = 0.002  # state-of-charge fraction per second while charging
+KEY_OFF_LOAD_A = 0.03  # Quiescent draw of the sleeping ECUs, alarm and clock with the key out
+
+# Road load multiplier per driving scenario
+SCENARIO_ROAD_LOAD = {"City Road": 1.0, "Highway": 0.9, "Off-Road": 1.8}
+
+# Signals the model owns; the rest keep their generate_initial_data values
+MODELED_SIGNALS = [
+    "Engine RPM", "Wheel Speed (km/h)", "Coolant Temp (°C)", "Catalyst Temp (°C)", "Exhaust Gas Temp (°C)",
+    "Transmission Temp (°C)", "Fuel Level (%)", "Fuel Pressure (kPa)", "Fuel Injector Pulse Width (ms)",
+    "Oil Pressure (psi)", "Battery Voltage (V)", "Alternator Output (V)", "Electrical Load (A)",
+]
+MODELED_INDEX = np.array([SIGNAL_NAMES.index(name) for name in MODELED_SIGNALS])
+
+# Integrated state carried between steps (everything else is an input)
+STATE_FIELDS = (
+    "speed", "gear", "rpm", "load", "coolant", "catalyst", "egt", "transmission", "fuel_level", "soc",
+    "electrical_load",
+)
+
+
+def _lag(value, target, tau, dt):
+    """Exact first-order lag update, stable for any dt"""
+    value += (target - value) * (1.0 - np.exp(-dt / tau))
+
+
+class VehicleModel:
+    """State-space model of n_vehicles cars advanced with a fixed dt (seconds).
+
+    Inputs are per-vehicle arrays that callers update between steps:
+    target_speed (km/h), car_on, ac_on, brake_applied and road_load.
+    """
+
+    modeled_signals = MODELED_SIGNALS
+
+    def __init__(self, n_vehicles=1, dt=1.0, rng=None):
+        self.n = n_vehicles
+        self.dt = float(dt)
+        self.rng = rng if rng is not None else np.random.default_rng()
+        initial = generate_initial_data()
+        shape = (n_vehicles,)
+
+        # Inputs
+        self.target_speed = np.zeros(shape)
+        self.car_on = np.zeros(shape, dtype=bool)
+        self.ac_on = np.zeros(shape, dtype=bool)
+        self.brake_applied = np.zeros(shape, dtype=bool)
+        self.road_load = np.ones(shape)
+        self.ambient = np.full(shape, float(initial["Ambient Air Temp (°C)"]))
+
+        # State
+        self.speed = np.zeros(shape)
+        self.gear = np.zeros(shape, dtype=np.intp)
+        self.rpm = np.zeros(shape)
+        self.load = np.zeros(shape)
+        self.coolant = np.full(shape, float(initial["Coolant Temp (°C)"]))
+        self.catalyst = np.full(shape, float(initial["Catalyst Temp (°C)"]))
+        self.egt = np.full(shape, float(initial["Exhaust Gas Temp (°C)"]))
+        self.transmission = np.full(shape, float(initial["Transmission Temp (°C)"]))
+        self.fuel_level = np.full(shape, float(initial["Fuel Level (%)"]))
+        self.soc = np.full(shape, 0.9)  # battery state of charge
+        self.electrical_load = np.zeros(shape)
+
+    def state(self):
+        """STATE_FIELDS as plain lists, for checkpoints"""
+        return {name: getattr(self, name).tolist() for name in STATE_FIELDS}
+
+    def load_state(self, state):
+        """Restore a state() snapshot"""
+        for name in STATE_FIELDS:
+            setattr(self, name, np.array(state[name], dtype=getattr(self, name).dtype))
+
+    def reseed(self, seed):
+        """Replace the noise generator, e.g. at a replay block boundary"""
+        self.rng = np.random.default_rng(seed)
+
+    def set_scenario(self, scenarios):
+        """Set road load from scenario names (one name or one per vehicle)"""
+        if isinstance(scenarios, str):
+            scenarios = [scenarios] * self.n
+        self.road_load[:] = [SCENARIO_ROAD_LOAD.get(name, 1.0) for name in scenarios]
+
+    def step(self):
+        """Advance every vehicle by dt seconds"""
+        dt = self.dt
+        on = self.car_on
+        noise = self.rng.standard_normal((4, self.n))
+
+        # Longitudinal: close the gap to the target speed at a bounded rate
+        target = np.where(on, self.target_speed, 0.0)
+        gap = target - self.speed
+        accel = np.clip(gap / SPEED_RESPONSE_S, -BRAKE_DECEL, MAX_ACCEL)
+        accel = np.where(on, accel, -COAST_DECEL)
+        accel = np.where(self.brake_applied, -BRAKE_DECEL, accel)
+        speed = self.speed + accel * dt
+        # Never overshoot the target while driving under throttle
+        overshoot = on & ~self.brake_applied & (gap * (target - speed) < 0)
+        self.speed = np.maximum(np.where(overshoot, target, speed), 0.0)
+
+        # Engine load: acceleration demand plus aerodynamic/rolling resistance
+        cruise = 0.08 + 2.0e-5 * self.speed ** 2
+        self.load = np.where(on, np.clip(cruise * self.road_load + 0.6 * np.maximum(accel, 0) / MAX_ACCEL, 0, 1), 0)
+
+        # Drivetrain: wheel speed -> engine speed through the selected gear
+        wheel_rpm = self.speed / 3.6 / (2 * np.pi * TIRE_RADIUS_M) * 60
+        rpm = wheel_rpm * GEAR_RATIOS[self.gear] * FINAL_DRIVE
+        upshift = (rpm > UPSHIFT_RPM + 1500 * self.load) & (self.gear < len(GEAR_RATIOS) - 1)
+        downshift = (rpm < DOWNSHIFT_RPM) & (self.gear > 0)
+        self.gear = np.where(self.speed < 1, 0, self.gear + upshift - downshift)
+        rpm = wheel_rpm * GEAR_RATIOS[self.gear] * FINAL_DRIVE
+        idle = IDLE_RPM + 50 * self.ac_on
+        self.rpm = np.where(on, np.clip(np.maximum(rpm, idle) + 15 * noise[0], 600, MAX_RPM), 0)
+
+        # Thermal: first-order lags toward operating-point targets
+        ambient = self.ambient
+        _lag(self.coolant, np.where(on, 90 + 8 * self.load, ambient), COOLANT_TAU, dt)
+        _lag(self.catalyst, np.where(on, 380 + 380 * self.load + self.rpm / 25, ambient), CATALYST_TAU, dt)
+        _lag(self.egt, np.where(on, 300 + 450 * self.load + self.rpm / 20, ambient), EGT_TAU, dt)
+        _lag(self.transmission, np.where(on, 78 + 25 * self.load + self.speed / 10, ambient), TRANSMISSION_TAU, dt)
+
+        # Fuel: burn rate scales with load and engine speed
+        fuel_lph = np.where(on, IDLE_FUEL_LPH + 22 * self.load * self.rpm / 3000, 0)
+        self.fuel_level = np.maximum(self.fuel_level - fuel_lph * dt / 3600 / TANK_LITRES * 100, 0)
+
+        # Electrical: alternator charges the battery while running, loads drain it otherwise
+        self.electrical_load = np.where(
+            on, 20 + 10 * self.ac_on + 5 * self.brake_applied + 2 * noise[1], KEY_OFF_LOAD_A + 5 * self.brake_applied,
+        )
+        drain = self.electrical_load * dt / 3600 / BATTERY_AH
+        self.soc = np.clip(np.where(on, self.soc + CHARGE_RATE * (1 - self.soc) * dt, self.soc - drain), 0, 1)
+
+    def signals(self, out=None):
+        """Write the current state into an (n_vehicles, len(SIGNAL_NAMES)) float32 array"""
+        if out is None:
+            out = np.empty((self.n, len(SIGNAL_NAMES)), dtype=np.float32)
+            out[:] = INITIAL_ROW
+        on = self.car_on
+        noise = self.rng.standard_normal((3, self.n))
+        columns = [
+            np.round(self.rpm),
+            np.round(self.speed, 1),
+            np.round(self.coolant, 1),
+            np.round(self.catalyst, 1),
+            np.round(self.egt, 1),
+            np.round(self.transmission, 1),
+            np.round(self.fuel_level, 2),
+            np.where(on, np.round(3000 + 400 * self.load + 25 * noise[0]), 0),
+            np.where(on, np.round(1.5 + 8 * self.load, 2), 0),
+            np.where(on, np.round(np.clip(20 + self.rpm / 120, 20, 60), 1), 0),
+            np.round(np.where(on, 13.9 + 0.3 * (1 - self.soc) + 0.05 * noise[1], 11.8 + 0.9 * self.soc), 2),
+            np.where(on, np.round(14.0 + 0.05 * noise[2], 2), 0),
+            np.round(self.electrical_load),
+        ]
+        out[:, MODELED_INDEX] = np.stack(columns, axis=1)
+        return out
+
+    def modeled_row(self, vehicle=0):
+        """Modeled signal values for one vehicle, in MODELED_SIGNALS order"""
+        out = np.zeros((self.n, len(SIGNAL_NAMES)))  # float64 keeps the rounded values exact
+        return self.signals(out)[vehicle, MODELED_INDEX].tolist()
+
+
+def random_target_speeds(rng, scenarios, n_steps, dt, hold_seconds=60.0):
+    """Piecewise-constant target speeds drawn from each vehicle's scenario speed range.
+
+    Returns an (n_vehicles, n_steps) array; a new target is drawn every
+    hold_seconds of simulated time.
+    """
+    ranges = np.array([DrivingScenarios[name]["speed_range"] for name in scenarios], dtype=float)
+    hold = max(1, int(round(hold_seconds / dt)))
+    n_segments = -(-n_steps // hold)
+    draws = rng.uniform(ranges[:, :1], ranges[:, 1:], size=(len(scenarios), n_segments))
+    return np.repeat(draws, hold, axis=1)[:, :n_steps]
+
+
+def simulate_fleet(n_vehicles, n_steps, dt=1.0, scenarios=None, target_speed=None, car_on=True, ac_on=False,
+                   brake_applied=False, rng=None, out=None):
+    """Run n_vehicles through n_steps of dt seconds and return (N, T, len(SIGNAL_NAMES)) float32.
+
+    target_speed may be a scalar, an (N,) array or an (N, T) array; by default
+    each vehicle cruises between random targets from its scenario's speed
+    range.  car_on, ac_on and brake_applied accept the same shapes.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    scenario_names = list(DrivingScenarios.keys())
+    if scenarios is None:
+        scenarios = [scenario_names[i % len(scenario_names)] for i in range(n_vehicles)]
+    elif isinstance(scenarios, str):
+        scenarios = [scenarios] * n_vehicles
+    else:
+        scenarios = [scenario_names[s] if not isinstance(s, str) else s for s in scenarios]
+
+    shape = (n_vehicles, n_steps)
+    if target_speed is None:
+        target_speed = random_target_speeds(rng, scenarios, n_steps, dt)
+    inputs = [
+        per_tick(target_speed, shape, float),
+        per_tick(car_on, shape),
+        per_tick(ac_on, shape),
+        per_tick(brake_applied, shape),
+    ]
+
+    model = VehicleModel(n_vehicles, dt, rng)
+    model.set_scenario(scenarios)
+    if out is None:
+        out = np.empty(shape + (len(SIGNAL_NAMES),), dtype=np.float32)
+        out[:] = INITIAL_ROW
+    for t in range(n_steps):
+        model.target_speed[:] = inputs[0][:, t]
+        model.car_on[:] = inputs[1][:, t]
+        model.ac_on[:] = inputs[2][:, t]
+        model.brake_applied[:] = inputs[3][:, t]
+        model.step()
+        model.signals(out[:, t])
+    return out
+
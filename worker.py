@@ -0,0 +1,155 @@
+"""Simulation worker thread: control commands in, bounded snapshot stream out.
+
+The worker owns the engine, its clock and the log sink; other threads only
+post commands, which are applied between ticks, so the engine is never
+touched from two threads.  Every ROW_FIELDS row goes to the log sink, whose
+own writer thread does the disk I/O, and to a bounded snapshot deque that a
+UI drains at its frame rate.  If the UI falls behind, the oldest snapshots
+are dropped; the simulation and the log never wait for it.
+"""
+import queue
+import threading
+import time
+from collections import deque
+
+from scheduler import SimClock
+
+SNAPSHOT_QUEUE_ROWS = 4096  # Snapshots held for the UI; the oldest are dropped beyond this
+MAX_CATCHUP_S = 1.0  # Longest backlog of simulated time caught up on after a stall
+
+
+class SimulationWorker:
+    """Run a SimulationEngine at rate_hz against the wall clock on a background thread.
+
+    open_sink is called on the worker thread before the first tick and may
+    return a sinks.StreamingSink (or None to skip logging).  Pass a
+    metrics.Metrics registry to time every wake-up, and publish(row) to hand
+    every row to a live subscriber feed such as pubsub.TelemetryHub.
+    """
+
+    def __init__(self, engine, rate_hz, open_sink=None, snapshot_rows=SNAPSHOT_QUEUE_ROWS, metrics=None,
+                 publish=None):
+        self.engine = engine
+        self.rate_hz = rate_hz
+        self.clock = SimClock(rate_hz)
+        self.open_sink = open_sink
+        self.sink = None
+        self.publish = publish
+        self.snapshots = deque(maxlen=snapshot_rows)
+        self.dropped_snapshots = 0
+        self.late_ticks = 0  # Ticks skipped because the simulation itself could not keep up
+        self.ticks_total = 0
+        self.running = False
+        self._batch_seconds = self._lag_seconds = None
+        if metrics is not None:
+            self._batch_seconds = metrics.histogram("tick_batch_seconds", "Time spent running the ticks due at one wake-up")
+            self._lag_seconds = metrics.histogram("tick_lag_seconds", "How late each wake-up started its first due tick")
+            metrics.callback("ticks_total", "Simulation ticks run", lambda: self.ticks_total, "counter")
+            metrics.callback("late_ticks_total", "Ticks skipped because the simulation fell behind",
+                             lambda: self.late_ticks, "counter")
+            metrics.callback("snapshots_dropped_total", "Rows the UI did not drain in time",
+                             lambda: self.dropped_snapshots, "counter")
+            metrics.callback("snapshots_queued", "Rows waiting for the UI", lambda: len(self.snapshots))
+            metrics.callback("rate_hz", "Configured tick rate", lambda: self.rate_hz)
+        self._commands = queue.SimpleQueue()
+        self._origin = time.perf_counter()
+        self._ticks = 0
+        self._stopped = False
+        self._thread = threading.Thread(target=self._loop, name="SimulationWorker", daemon=True)
+        self._thread.start()
+
+    def post(self, function, *args):
+        """Run function(*args) on the worker thread before its next tick"""
+        self._commands.put((function, args))
+
+    def set(self, name, value):
+        """Change an engine control attribute (car_on, speed, selected_fault, ...)"""
+        self.post(setattr, self.engine, name, value)
+
+    def set_rate(self, rate_hz):
+        self.post(self._set_rate, rate_hz)
+
+    def resume(self):
+        self.post(self._resume)
+
+    def pause(self):
+        self.post(setattr, self, "running", False)
+
+    def drain(self):
+        """Pop every snapshot produced since the last call, oldest first"""
+        snapshots = self.snapshots
+        rows = []
+        while snapshots:
+            rows.append(snapshots.popleft())
+        return rows
+
+    def stop(self):
+        """Stop the thread and close the log sink"""
+        self.post(setattr, self, "_stopped", True)
+        self._thread.join()
+        if self.sink is not None:
+            self.sink.close()
+
+    def _set_rate(self, rate_hz):
+        # Keep the simulated clock continuous across the change
+        self.rate_hz = rate_hz
+        self.engine.dt = 1 / rate_hz
+        self.clock = SimClock(rate_hz, start_ms=self.clock.now_ms)
+        self._anchor()
+
+    def _resume(self):
+        if not self.running:
+            self.running = True
+            self.clock = SimClock(self.rate_hz)
+            self._anchor()
+
+    def _anchor(self):
+        self._origin = time.perf_counter()
+        self._ticks = 0
+
+    def _loop(self):
+        timeout = None
+        while not self._stopped:
+            try:
+                function, args = self._commands.get(timeout=timeout)
+                function(*args)
+                timeout = 0  # Apply every queued command before ticking
+                continue
+            except queue.Empty:
+                pass
+            if not self.running:
+                timeout = None  # Sleep until a command arrives
+                continue
+            self._run_due_ticks()
+            timeout = max(0.0, self._origin + (self._ticks + 1) / self.rate_hz - time.perf_counter())
+
+    def _run_due_ticks(self):
+        started = time.perf_counter()
+        due = int((started - self._origin) * self.rate_hz) - self._ticks
+        if due > 0 and self._lag_seconds is not None:
+            self._lag_seconds.observe(started - self._origin - (self._ticks + 1) / self.rate_hz)
+        if due > self.rate_hz * MAX_CATCHUP_S:
+            self.late_ticks += due - 1
+            self._origin += (due - 1) / self.rate_hz
+            due = 1
+        if due <= 0:
+            return
+        if self.sink is None and self.open_sink is not None:
+            self.sink = self.open_sink()
+            self.open_sink = None
+        engine, clock, sink, snapshots, publish = self.engine, self.clock, self.sink, self.snapshots, self.publish
+        for _ in range(due):
+            engine.step()
+            row = engine.row(clock.now_ms)
+            if len(snapshots) == snapshots.maxlen:
+                self.dropped_snapshots += 1
+            snapshots.append(row)
+            if sink is not None:
+                sink.append(row)
+            if publish is not None:
+                publish(row)
+            clock.advance()
+        self._ticks += due
+        self.ticks_total += due
+        if self._batch_seconds is not None:
+            self._batch_seconds.observe(time.perf_counter() - started)